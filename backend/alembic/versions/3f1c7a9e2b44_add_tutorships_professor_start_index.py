@@ -0,0 +1,31 @@
+"""add tutorships professor start index
+
+Revision ID: 3f1c7a9e2b44
+Revises: 72ec008d0670
+Create Date: 2026-10-18 18:12:07.431560
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c7a9e2b44'
+down_revision: Union[str, None] = '72ec008d0670'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_tutorships_professor_start', 'tutorships',
+        ['professor_id', sa.text('start_time DESC'), sa.text('id DESC')], unique=False, if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tutorships_professor_start', table_name='tutorships', if_exists=True)
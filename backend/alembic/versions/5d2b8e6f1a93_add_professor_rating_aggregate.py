@@ -0,0 +1,52 @@
+"""add professor rating aggregate
+
+Revision ID: 5d2b8e6f1a93
+Revises: 8c4e19b7d2a6
+Create Date: 2026-10-18 20:31:05.114902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2b8e6f1a93'
+down_revision: Union[str, None] = '8c4e19b7d2a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Valores por defecto de app/ratings.py al crear esta revisión, fijos para que
+# la migración dé siempre el mismo resultado; con otro prior configurado,
+# `python -m app.manage recompute-ratings` recalcula el ranking
+RATING_PRIOR_MEAN = 3.0
+RATING_PRIOR_WEIGHT = 5
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('professors', sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False), if_not_exists=True)
+    op.add_column('professors', sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False), if_not_exists=True)
+    # Agregado inicial desde las reseñas existentes; después lo mantiene cada flush de Review
+    op.execute(
+        "UPDATE professors SET "
+        "rating_count = (SELECT COUNT(reviews.rating) FROM reviews WHERE reviews.professor_id = professors.id), "
+        "rating_sum = (SELECT COALESCE(SUM(reviews.rating), 0) FROM reviews WHERE reviews.professor_id = professors.id)"
+    )
+    op.execute(sa.text(
+        "UPDATE professors SET ranking = (:weight * :mean + rating_sum) / (:weight + rating_count)"
+    ).bindparams(weight=float(RATING_PRIOR_WEIGHT), mean=RATING_PRIOR_MEAN))
+    op.alter_column('professors', 'ranking', existing_type=sa.Float(), nullable=False)
+    op.create_index(
+        'ix_professors_ranking_id', 'professors',
+        [sa.text('ranking DESC'), sa.text('id DESC')], unique=False, if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_professors_ranking_id', table_name='professors', if_exists=True)
+    op.alter_column('professors', 'ranking', existing_type=sa.Float(), nullable=True)
+    op.drop_column('professors', 'rating_sum', if_exists=True)
+    op.drop_column('professors', 'rating_count', if_exists=True)
@@ -0,0 +1,43 @@
+"""add media blobs for content addressed storage
+
+Revision ID: 5da24377abc6
+Revises: be67e0b6a80d
+Create Date: 2026-10-18 13:05:47.881920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5da24377abc6'
+down_revision: Union[str, None] = 'be67e0b6a80d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('media_blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=True),
+    sa.Column('storage_path', sa.String(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('sha256'),
+    if_not_exists=True
+    )
+    # Los archivos existentes quedan con content_hash NULL y conservan su ruta propia
+    op.add_column('teacher_media_files', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_teacher_media_files_content_hash'), 'teacher_media_files', ['content_hash'], unique=False)
+    op.create_foreign_key('teacher_media_files_content_hash_fkey', 'teacher_media_files', 'media_blobs', ['content_hash'], ['sha256'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('teacher_media_files_content_hash_fkey', 'teacher_media_files', type_='foreignkey')
+    op.drop_index(op.f('ix_teacher_media_files_content_hash'), table_name='teacher_media_files')
+    op.drop_column('teacher_media_files', 'content_hash')
+    op.drop_table('media_blobs')
@@ -0,0 +1,44 @@
+"""add media upload sessions
+
+Revision ID: 72ec008d0670
+Revises: d9a81b58159f
+Create Date: 2026-10-18 15:20:04.551730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '72ec008d0670'
+down_revision: Union[str, None] = 'd9a81b58159f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('media_upload_sessions',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('teacher_id', sa.Integer(), nullable=False),
+    sa.Column('original_filename', sa.String(), nullable=False),
+    sa.Column('mime_type', sa.String(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('upload_length', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['teacher_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_index(op.f('ix_media_upload_sessions_teacher_id'), 'media_upload_sessions', ['teacher_id'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_media_upload_sessions_expires_at'), 'media_upload_sessions', ['expires_at'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_media_upload_sessions_expires_at'), table_name='media_upload_sessions', if_exists=True)
+    op.drop_index(op.f('ix_media_upload_sessions_teacher_id'), table_name='media_upload_sessions', if_exists=True)
+    op.drop_table('media_upload_sessions', if_exists=True)
@@ -0,0 +1,55 @@
+"""add admin filter and sort indexes
+
+Revision ID: 8c4e19b7d2a6
+Revises: a7d52e0c9f13
+Create Date: 2026-10-18 19:47:12.508832
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4e19b7d2a6'
+down_revision: Union[str, None] = 'a7d52e0c9f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filtros y orden de las vistas de sqladmin
+    op.create_index(op.f('ix_tutorships_status'), 'tutorships', ['status'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_tutorships_start_time'), 'tutorships', ['start_time'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_tutorships_end_time'), 'tutorships', ['end_time'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_payments_tutorship_id'), 'payments', ['tutorship_id'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_payments_timestamp'), 'payments', ['timestamp'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_payments_status'), 'payments', ['status'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_reviews_tutorship_id'), 'reviews', ['tutorship_id'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_reviews_rating'), 'reviews', ['rating'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_teacher_media_files_mime_type'), 'teacher_media_files', ['mime_type'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_teacher_media_files_uploaded_at'), 'teacher_media_files', ['uploaded_at'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_resources_tutorship_id'), 'resources', ['tutorship_id'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_resources_uploaded_at'), 'resources', ['uploaded_at'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_live_sessions_tutorship_id'), 'live_sessions', ['tutorship_id'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_live_sessions_start_time'), 'live_sessions', ['start_time'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_live_sessions_start_time'), table_name='live_sessions', if_exists=True)
+    op.drop_index(op.f('ix_live_sessions_tutorship_id'), table_name='live_sessions', if_exists=True)
+    op.drop_index(op.f('ix_resources_uploaded_at'), table_name='resources', if_exists=True)
+    op.drop_index(op.f('ix_resources_tutorship_id'), table_name='resources', if_exists=True)
+    op.drop_index(op.f('ix_teacher_media_files_uploaded_at'), table_name='teacher_media_files', if_exists=True)
+    op.drop_index(op.f('ix_teacher_media_files_mime_type'), table_name='teacher_media_files', if_exists=True)
+    op.drop_index(op.f('ix_reviews_rating'), table_name='reviews', if_exists=True)
+    op.drop_index(op.f('ix_reviews_tutorship_id'), table_name='reviews', if_exists=True)
+    op.drop_index(op.f('ix_payments_status'), table_name='payments', if_exists=True)
+    op.drop_index(op.f('ix_payments_timestamp'), table_name='payments', if_exists=True)
+    op.drop_index(op.f('ix_payments_tutorship_id'), table_name='payments', if_exists=True)
+    op.drop_index(op.f('ix_tutorships_end_time'), table_name='tutorships', if_exists=True)
+    op.drop_index(op.f('ix_tutorships_start_time'), table_name='tutorships', if_exists=True)
+    op.drop_index(op.f('ix_tutorships_status'), table_name='tutorships', if_exists=True)
@@ -0,0 +1,39 @@
+"""null safe media listing index
+
+Revision ID: a3c5e7f90b12
+Revises: e4a7c2d19b55
+Create Date: 2026-10-19 11:20:43.502817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c5e7f90b12'
+down_revision: Union[str, None] = 'e4a7c2d19b55'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # El listado ordena por coalesce(uploaded_at, '1970-01-01 ...'): los registros
+    # sin fecha quedan al final en vez de cortar la paginación por cursor
+    op.drop_index('ix_teacher_media_files_teacher_uploaded', table_name='teacher_media_files', if_exists=True)
+    op.create_index(
+        'ix_teacher_media_files_teacher_uploaded', 'teacher_media_files',
+        ['teacher_id', sa.text("coalesce(uploaded_at, '1970-01-01 00:00:00.000000') DESC"), sa.text('id DESC')],
+        unique=False, if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_teacher_media_files_teacher_uploaded', table_name='teacher_media_files', if_exists=True)
+    op.create_index(
+        'ix_teacher_media_files_teacher_uploaded', 'teacher_media_files',
+        ['teacher_id', sa.text('uploaded_at DESC'), sa.text('id DESC')], unique=False, if_not_exists=True
+    )
@@ -0,0 +1,86 @@
+"""add review listing and star histogram
+
+Revision ID: b61f3d0a8e27
+Revises: 5d2b8e6f1a93
+Create Date: 2026-10-18 21:12:40.603517
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b61f3d0a8e27'
+down_revision: Union[str, None] = '5d2b8e6f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Notas válidas al crear esta revisión (app.ratings.RATING_STARS), fijas aquí
+STARS = range(1, 6)
+
+# Deduplicación sugerida: conservar la reseña más reciente (mayor id) de cada tutoría
+DEDUP_REVIEWS_SQL = (
+    "DELETE FROM reviews r USING reviews newer "
+    "WHERE r.tutorship_id = newer.tutorship_id AND r.id < newer.id"
+)
+
+
+def check_duplicate_reviews() -> None:
+    """Frenar la migración si alguna tutoría tiene más de una reseña.
+
+    Cuál conservar es una decisión del negocio (y cambia el ranking del
+    profesor), así que no se borra nada: se listan las tutorías para
+    resolverlas a mano y volver a migrar. Si alcanza con quedarse con la
+    más reciente de cada una, DEDUP_REVIEWS_SQL lo hace en un paso.
+    """
+    if context.is_offline_mode():
+        return
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT tutorship_id, COUNT(*) FROM reviews WHERE tutorship_id IS NOT NULL "
+        "GROUP BY tutorship_id HAVING COUNT(*) > 1 ORDER BY tutorship_id LIMIT 20"
+    )).all()
+    if duplicates:
+        listed = ", ".join(f"{tutorship_id} ({count} reseñas)" for tutorship_id, count in duplicates)
+        raise RuntimeError(
+            "Hay tutorías con más de una reseña y el índice único ix_reviews_tutorship_id no se puede crear. "
+            "Dejar una reseña por tutoría y volver a migrar; luego `python -m app.manage recompute-ratings`. "
+            f"Para conservar la más reciente de cada tutoría: {DEDUP_REVIEWS_SQL}; "
+            f"Tutorías: {listed}"
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('reviews', sa.Column('created_at', sa.DateTime(), nullable=True), if_not_exists=True)
+    # Reseñas de un docente paginadas por cursor
+    op.create_index(
+        'ix_reviews_professor_id_id', 'reviews',
+        ['professor_id', sa.text('id DESC')], unique=False, if_not_exists=True
+    )
+    # Una reseña por tutoría
+    check_duplicate_reviews()
+    op.drop_index(op.f('ix_reviews_tutorship_id'), table_name='reviews', if_exists=True)
+    op.create_index(op.f('ix_reviews_tutorship_id'), 'reviews', ['tutorship_id'], unique=True)
+
+    for stars in STARS:
+        op.add_column('professors', sa.Column(f'stars_{stars}', sa.Integer(), server_default='0', nullable=False), if_not_exists=True)
+    # Histograma inicial desde las reseñas existentes; después lo mantiene cada flush de Review
+    op.execute(
+        "UPDATE professors SET " + ", ".join(
+            f"stars_{stars} = (SELECT COUNT(*) FROM reviews "
+            f"WHERE reviews.professor_id = professors.id AND reviews.rating = {stars})"
+            for stars in STARS
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for stars in STARS:
+        op.drop_column('professors', f'stars_{stars}', if_exists=True)
+    op.drop_index(op.f('ix_reviews_tutorship_id'), table_name='reviews', if_exists=True)
+    op.create_index(op.f('ix_reviews_tutorship_id'), 'reviews', ['tutorship_id'], unique=False)
+    op.drop_index('ix_reviews_professor_id_id', table_name='reviews', if_exists=True)
+    op.drop_column('reviews', 'created_at', if_exists=True)
@@ -0,0 +1,29 @@
+"""add keyset pagination indexes
+
+Revision ID: be67e0b6a80d
+Revises: fd85e7e350c1
+Create Date: 2026-10-18 11:40:02.517388
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'be67e0b6a80d'
+down_revision: Union[str, None] = 'fd85e7e350c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Listado de docentes por cursor: WHERE role = 'teacher' AND (name, id) > (...) ORDER BY name, id
+    op.create_index('ix_users_role_name_id', 'users', ['role', 'name', 'id'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_role_name_id', table_name='users', if_exists=True)
@@ -0,0 +1,50 @@
+"""add media jobs queue and previews
+
+Revision ID: c65fb4d04a31
+Revises: 5da24377abc6
+Create Date: 2026-10-18 14:02:11.418203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c65fb4d04a31'
+down_revision: Union[str, None] = '5da24377abc6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('media_blobs', sa.Column('thumbnail_path', sa.String(), nullable=True), if_not_exists=True)
+    op.add_column('media_blobs', sa.Column('preview_status', sa.String(length=16), nullable=True), if_not_exists=True)
+    op.create_table('media_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('kind', sa.String(length=32), nullable=False),
+    sa.Column('mime_type', sa.String(), nullable=True),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['content_hash'], ['media_blobs.sha256'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_index(op.f('ix_media_jobs_content_hash'), 'media_jobs', ['content_hash'], unique=False, if_not_exists=True)
+    op.create_index('ix_media_jobs_status_run_after', 'media_jobs', ['status', 'run_after'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_media_jobs_status_run_after', table_name='media_jobs', if_exists=True)
+    op.drop_index(op.f('ix_media_jobs_content_hash'), table_name='media_jobs', if_exists=True)
+    op.drop_table('media_jobs', if_exists=True)
+    op.drop_column('media_blobs', 'preview_status', if_exists=True)
+    op.drop_column('media_blobs', 'thumbnail_path', if_exists=True)
@@ -0,0 +1,39 @@
+"""null safe tutorship listing index
+
+Revision ID: c8d1f4a6e3b7
+Revises: a3c5e7f90b12
+Create Date: 2026-10-19 11:52:07.114926
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8d1f4a6e3b7'
+down_revision: Union[str, None] = 'a3c5e7f90b12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # El listado ordena por coalesce(start_time, '1970-01-01 ...'): las tutorías
+    # sin fecha quedan al final en vez de cortar la paginación por cursor
+    op.drop_index('ix_tutorships_professor_start', table_name='tutorships', if_exists=True)
+    op.create_index(
+        'ix_tutorships_professor_start', 'tutorships',
+        ['professor_id', sa.text("coalesce(start_time, '1970-01-01 00:00:00.000000') DESC"), sa.text('id DESC')],
+        unique=False, if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tutorships_professor_start', table_name='tutorships', if_exists=True)
+    op.create_index(
+        'ix_tutorships_professor_start', 'tutorships',
+        ['professor_id', sa.text('start_time DESC'), sa.text('id DESC')], unique=False, if_not_exists=True
+    )
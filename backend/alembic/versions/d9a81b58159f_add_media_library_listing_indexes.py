@@ -0,0 +1,44 @@
+"""add media library listing indexes
+
+Revision ID: d9a81b58159f
+Revises: c65fb4d04a31
+Create Date: 2026-10-18 14:41:26.903118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a81b58159f'
+down_revision: Union[str, None] = 'c65fb4d04a31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_teacher_media_files_teacher_uploaded', 'teacher_media_files',
+        ['teacher_id', sa.text('uploaded_at DESC'), sa.text('id DESC')], unique=False, if_not_exists=True
+    )
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_teacher_media_files_original_filename_trgm', 'teacher_media_files', ['original_filename'],
+        unique=False, if_not_exists=True,
+        postgresql_using='gin', postgresql_ops={'original_filename': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_teacher_media_files_description_trgm', 'teacher_media_files', ['description'],
+        unique=False, if_not_exists=True,
+        postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_teacher_media_files_description_trgm', table_name='teacher_media_files', if_exists=True)
+    op.drop_index('ix_teacher_media_files_original_filename_trgm', table_name='teacher_media_files', if_exists=True)
+    op.drop_index('ix_teacher_media_files_teacher_uploaded', table_name='teacher_media_files', if_exists=True)
@@ -0,0 +1,46 @@
+"""unique active maintenance job per kind
+
+Revision ID: e2b9d7c4a810
+Revises: c8d1f4a6e3b7
+Create Date: 2026-10-19 12:26:38.640215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b9d7c4a810'
+down_revision: Union[str, None] = 'c8d1f4a6e3b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Antes del índice único: de las tareas activas de un mismo tipo queda solo la más reciente
+    op.execute("""
+        UPDATE maintenance_jobs
+        SET status = 'failed', finished_at = CURRENT_TIMESTAMP,
+            last_error = 'Cerrada al migrar: había otra tarea activa del mismo tipo'
+        WHERE status IN ('pending', 'running')
+          AND EXISTS (
+            SELECT 1 FROM maintenance_jobs newer
+            WHERE newer.kind = maintenance_jobs.kind
+              AND newer.status IN ('pending', 'running')
+              AND (newer.created_at > maintenance_jobs.created_at
+                   OR (newer.created_at = maintenance_jobs.created_at AND newer.id > maintenance_jobs.id))
+          )
+    """)
+    op.create_index(
+        'ix_maintenance_jobs_active_kind', 'maintenance_jobs', ['kind'], unique=True, if_not_exists=True,
+        postgresql_where=sa.text("status IN ('pending', 'running')"),
+        sqlite_where=sa.text("status IN ('pending', 'running')")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_maintenance_jobs_active_kind', table_name='maintenance_jobs', if_exists=True)
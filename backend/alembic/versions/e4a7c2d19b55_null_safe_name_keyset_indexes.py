@@ -0,0 +1,40 @@
+"""null safe name keyset indexes
+
+Revision ID: e4a7c2d19b55
+Revises: b61f3d0a8e27
+Create Date: 2026-10-19 10:05:21.380114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c2d19b55'
+down_revision: Union[str, None] = 'b61f3d0a8e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Los listados por nombre ordenan por coalesce(name, ''): los nombres NULL
+    # quedan primero en vez de cortar la paginación por cursor
+    op.drop_index('ix_users_role_name_id', table_name='users', if_exists=True)
+    op.create_index(
+        'ix_users_role_name_id', 'users',
+        ['role', sa.text("coalesce(name, '')"), 'id'], unique=False, if_not_exists=True
+    )
+    op.create_index(
+        'ix_subjects_name_id', 'subjects',
+        [sa.text("coalesce(name, '')"), 'id'], unique=False, if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_subjects_name_id', table_name='subjects', if_exists=True)
+    op.drop_index('ix_users_role_name_id', table_name='users', if_exists=True)
+    op.create_index('ix_users_role_name_id', 'users', ['role', 'name', 'id'], unique=False, if_not_exists=True)
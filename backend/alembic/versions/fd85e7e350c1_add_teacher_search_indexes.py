@@ -0,0 +1,45 @@
+"""add teacher search indexes
+
+Revision ID: fd85e7e350c1
+Revises: 2e1dcffebdd5
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fd85e7e350c1'
+down_revision: Union[str, None] = '2e1dcffebdd5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Índices trigram para ILIKE '%texto%' sobre nombres de docentes y materias
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_users_name_trgm', 'users', ['name'], unique=False, if_not_exists=True,
+        postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_subjects_name_trgm', 'subjects', ['name'], unique=False, if_not_exists=True,
+        postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}
+    )
+    # Filtro por nivel (igualdad) y semijoin docente -> materias
+    op.create_index(op.f('ix_subjects_level'), 'subjects', ['level'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_professor_subjects_professor_id'), 'professor_subjects', ['professor_id'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_professor_subjects_subject_id'), 'professor_subjects', ['subject_id'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_professor_subjects_subject_id'), table_name='professor_subjects', if_exists=True)
+    op.drop_index(op.f('ix_professor_subjects_professor_id'), table_name='professor_subjects', if_exists=True)
+    op.drop_index(op.f('ix_subjects_level'), table_name='subjects', if_exists=True)
+    op.drop_index('ix_subjects_name_trgm', table_name='subjects', if_exists=True)
+    op.drop_index('ix_users_name_trgm', table_name='users', if_exists=True)
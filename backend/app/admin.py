@@ -1,13 +1,65 @@
-from sqladmin import Admin, ModelView
+from sqladmin import Admin, ModelView, action
+from sqladmin.filters import AllUniqueStringValuesFilter, OperationColumnFilter, StaticValuesFilter
+from sqlalchemy import select, text
+from sqlalchemy.orm import joinedload, selectinload
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import RedirectResponse
 from wtforms.fields import SelectField, DateTimeField
-from .database import engine
+from .crud import delete_teacher_media_file, ensure_professor_profile
+from .database import async_engine, SessionLocal
+from .maintenance import start_job, run_professor_profiles_job, PROFESSOR_PROFILES_JOB
+from .user_cache import evict as evict_cached_user
+import os
 from .models import (
     User, Professor, Subject, ProfessorSubject,
-    Tutorship, Payment, Review, Resource, LiveSession, TeacherMediaFile,
+    Tutorship, Payment, Review, Resource, LiveSession, TeacherMediaFile, MaintenanceJob,
     UserRole, SubjectLevel, TutorshipStatus
 )
 
-class UserAdmin(ModelView, model=User):
+# A partir de este tamaño el listado sin filtros muestra el total estimado por
+# PostgreSQL (pg_class.reltuples) en lugar de un COUNT(*) sobre toda la tabla
+ADMIN_COUNT_ESTIMATE_THRESHOLD = int(os.getenv("ADMIN_COUNT_ESTIMATE_THRESHOLD", "100000"))
+
+def enum_filter(column, enum_class):
+    # Valores fijos: no hace falta un SELECT DISTINCT sobre la tabla para armar el filtro
+    return StaticValuesFilter(column, [(value.value, value.value.capitalize()) for value in enum_class])
+
+class ListView(ModelView):
+    """Vista con el listado optimizado para tablas grandes.
+
+    sqladmin ya trae con selectinload las relaciones de `column_list`;
+    `list_loader_options` repite esas mismas opciones y agrega las relaciones
+    anidadas que usan los __str__ de los objetos relacionados (p. ej. el
+    nombre del profesor), así la página cuesta un número fijo de consultas sin
+    importar cuántas filas muestra.
+    """
+    list_loader_options = ()
+
+    def list_query(self, request):
+        return select(self.model).options(*self.list_loader_options)
+
+    def _is_filtered(self, request) -> bool:
+        params = request.query_params
+        return bool(params.get("search")) or any(
+            params.get(filter_.parameter_name) not in (None, "", "__all") for filter_ in self.get_filters()
+        )
+
+    async def count(self, request, stmt=None):
+        bind = self.session_maker.kw.get("bind")
+        if stmt is not None and bind is not None and bind.dialect.name == "postgresql" and not self._is_filtered(request):
+            rows = await self._run_arbitrary_query(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)").bindparams(
+                    table=self.model.__tablename__
+                )
+            )
+            estimate = rows[0][0] if rows else None
+            # reltuples es -1 si la tabla nunca se analizó
+            if estimate is not None and estimate >= ADMIN_COUNT_ESTIMATE_THRESHOLD:
+                return estimate
+        return await super().count(request, stmt)
+
+class UserAdmin(ListView, model=User):
     name = "Usuario"
     name_plural = "Usuarios"
     icon = "fa-solid fa-users"
@@ -16,7 +68,7 @@ class UserAdmin(ModelView, model=User):
     column_list = [User.id, User.name, User.email, User.role]
     column_searchable_list = [User.name, User.email]
     column_sortable_list = [User.id, User.name, User.email, User.role]
-    column_filters = [User.role]
+    column_filters = [enum_filter(User.role, UserRole)]
     column_details_list = [User.id, User.name, User.email, User.role, "professor_profile", "student_tutorships"]
 
     form_columns = [User.name, User.email, User.password, User.role]
@@ -34,43 +86,76 @@ class UserAdmin(ModelView, model=User):
     can_edit = True
     can_delete = True
 
-class ProfessorAdmin(ModelView, model=Professor):
+    # Invalidar la caché de autenticación cuando el admin modifica o elimina un usuario
+    async def after_model_change(self, data, model, is_created, request):
+        if not is_created:
+            evict_cached_user(model.id)
+        # Igual que crud.create_user/update_user: un teacher siempre tiene perfil de profesor
+        await run_in_threadpool(_ensure_professor_profile, model.id)
+
+    async def after_model_delete(self, model, request):
+        evict_cached_user(model.id)
+
+class ProfessorAdmin(ListView, model=Professor):
     name = "Profesor"
     name_plural = "Profesores"
     icon = "fa-solid fa-chalkboard-teacher"
     category = "Gestión de Usuarios"
 
-    column_list = [Professor.id, Professor.ranking, "user", "subjects"]
-    column_details_list = [Professor.id, Professor.abstract, Professor.picture, Professor.ranking, "user", "subjects"]
+    column_list = [Professor.id, Professor.ranking, Professor.rating_count, "user", "subjects"]
+    column_sortable_list = [Professor.id, Professor.ranking, Professor.rating_count]
+    list_loader_options = (
+        selectinload(Professor.user),
+        selectinload(Professor.subjects).options(
+            joinedload(ProfessorSubject.subject), joinedload(ProfessorSubject.professor).joinedload(Professor.user)
+        ),
+    )
+    column_details_list = [
+        Professor.id, Professor.abstract, Professor.picture,
+        Professor.ranking, Professor.rating_count, Professor.rating_sum, "user", "subjects"
+    ]
 
-    form_columns = [Professor.abstract, Professor.picture, Professor.ranking]
-    
-    # Sobrescribir el método para crear perfiles faltantes automáticamente
-    async def list(self, request):
-        # Crear perfiles de profesor faltantes antes de mostrar la lista
-        from .crud import create_missing_professor_profiles
-        from .database import SessionLocal
-        
-        db = SessionLocal()
-        try:
-            created_count = create_missing_professor_profiles(db)
-            if created_count > 0:
-                print(f"Se crearon {created_count} perfiles de profesor faltantes")
-        except Exception as e:
-            print(f"Error creando perfiles de profesor: {e}")
-        finally:
-            db.close()
-        
-        return await super().list(request)
-
-class SubjectAdmin(ModelView, model=Subject):
+    # ranking y el agregado se calculan desde las reseñas
+    form_columns = [Professor.abstract, Professor.picture]
+
+    # Los perfiles se crean junto con el usuario (o el cambio de rol); para datos
+    # anteriores la reconciliación corre en segundo plano y no al listar
+    @action(
+        name="reconcile_profiles",
+        label="Crear perfiles faltantes",
+        confirmation_message="¿Crear en segundo plano los perfiles de profesor que falten?",
+        add_in_detail=False,
+    )
+    async def reconcile_profiles(self, request):
+        job, created = await run_in_threadpool(_start_profiles_job)
+        url = request.url_for("admin:details", identity=MaintenanceJobAdmin.identity, pk=job.id)
+        background = BackgroundTask(run_professor_profiles_job, job.id) if created else None
+        return RedirectResponse(url, status_code=302, background=background)
+
+def _start_profiles_job():
+    db = SessionLocal()
+    try:
+        return start_job(db, PROFESSOR_PROFILES_JOB, None)
+    finally:
+        db.close()
+
+def _ensure_professor_profile(user_id: int):
+    db = SessionLocal()
+    try:
+        db_user = db.get(User, user_id)
+        if db_user and ensure_professor_profile(db, db_user):
+            db.commit()
+    finally:
+        db.close()
+
+class SubjectAdmin(ListView, model=Subject):
     name = "Materia"
     name_plural = "Materias"
     icon = "fa-solid fa-book"
     category = "Contenido Educativo"
 
     column_list = [Subject.id, Subject.name, Subject.level, Subject.credits, Subject.department, Subject.description]
-    column_filters = [Subject.level, Subject.department]
+    column_filters = [enum_filter(Subject.level, SubjectLevel), AllUniqueStringValuesFilter(Subject.department)]
     column_searchable_list = [Subject.name, Subject.description, Subject.department]
 
     form_columns = [Subject.name, Subject.description, Subject.level, Subject.credits, Subject.department]
@@ -83,18 +168,22 @@ class SubjectAdmin(ModelView, model=Subject):
         }
     }
 
-class ProfessorSubjectAdmin(ModelView, model=ProfessorSubject):
+class ProfessorSubjectAdmin(ListView, model=ProfessorSubject):
     name = "Asignación"
     name_plural = "Asignaciones Profesor-Materia"
     icon = "fa-solid fa-user-graduate"
     category = "Contenido Educativo"
 
     column_list = [ProfessorSubject.id, "professor", "subject"]
+    list_loader_options = (
+        selectinload(ProfessorSubject.professor).joinedload(Professor.user),
+        selectinload(ProfessorSubject.subject),
+    )
     column_details_list = [ProfessorSubject.id, "professor", "subject"]
 
     form_columns = [ProfessorSubject.professor, ProfessorSubject.subject]
 
-class TutorshipAdmin(ModelView, model=Tutorship):
+class TutorshipAdmin(ListView, model=Tutorship):
     name = "Tutoría"
     name_plural = "Tutorías"
     icon = "fa-solid fa-chalkboard"
@@ -106,8 +195,15 @@ class TutorshipAdmin(ModelView, model=Tutorship):
         Tutorship.end_time, Tutorship.price_usdt, Tutorship.platform_fee_pct
     ]
     column_filters = [
-        Tutorship.status, Tutorship.start_time, Tutorship.end_time
+        enum_filter(Tutorship.status, TutorshipStatus),
+        OperationColumnFilter(Tutorship.start_time), OperationColumnFilter(Tutorship.end_time)
     ]
+    column_sortable_list = [Tutorship.id, Tutorship.status, Tutorship.start_time, Tutorship.end_time]
+    list_loader_options = (
+        selectinload(Tutorship.professor).joinedload(Professor.user),
+        selectinload(Tutorship.student),
+        selectinload(Tutorship.subject),
+    )
     column_details_list = [
         Tutorship.id, "professor", "student", "subject", 
         Tutorship.status, Tutorship.start_time, Tutorship.end_time, 
@@ -138,7 +234,7 @@ class TutorshipAdmin(ModelView, model=Tutorship):
         # Personalizar la actualización si es necesario
         return await super().update(request, pk, obj)
 
-class PaymentAdmin(ModelView, model=Payment):
+class PaymentAdmin(ListView, model=Payment):
     name = "Pago"
     name_plural = "Pagos"
     icon = "fa-solid fa-dollar-sign"
@@ -148,7 +244,8 @@ class PaymentAdmin(ModelView, model=Payment):
         Payment.id, Payment.tutorship_id, Payment.transaction_hash,
         Payment.amount_usdt, Payment.timestamp, Payment.status
     ]
-    column_filters = [Payment.status, Payment.timestamp]
+    column_filters = [OperationColumnFilter(Payment.status), OperationColumnFilter(Payment.timestamp)]
+    column_sortable_list = [Payment.id, Payment.timestamp, Payment.amount_usdt]
 
     form_columns = [
         Payment.tutorship_id, Payment.transaction_hash,
@@ -158,7 +255,7 @@ class PaymentAdmin(ModelView, model=Payment):
         Payment.timestamp: DateTimeField,
     }
 
-class ReviewAdmin(ModelView, model=Review):
+class ReviewAdmin(ListView, model=Review):
     name = "Reseña"
     name_plural = "Reseñas"
     icon = "fa-solid fa-star"
@@ -166,16 +263,16 @@ class ReviewAdmin(ModelView, model=Review):
 
     column_list = [
         Review.id, Review.student_id, Review.professor_id, 
-        Review.tutorship_id, Review.rating, Review.comment
+        Review.tutorship_id, Review.rating, Review.comment, Review.created_at
     ]
-    column_filters = [Review.rating]
+    column_filters = [OperationColumnFilter(Review.rating)]
 
     form_columns = [
         Review.student_id, Review.professor_id, Review.tutorship_id,
         Review.rating, Review.comment
     ]
 
-class TeacherMediaFileAdmin(ModelView, model=TeacherMediaFile):
+class TeacherMediaFileAdmin(ListView, model=TeacherMediaFile):
     name = "Archivo de Medios"
     name_plural = "Archivos de Medios"
     icon = "fa-solid fa-file-upload"
@@ -187,8 +284,9 @@ class TeacherMediaFileAdmin(ModelView, model=TeacherMediaFile):
         TeacherMediaFile.uploaded_at, TeacherMediaFile.description
     ]
     column_filters = [
-        TeacherMediaFile.mime_type, TeacherMediaFile.uploaded_at
+        OperationColumnFilter(TeacherMediaFile.mime_type), OperationColumnFilter(TeacherMediaFile.uploaded_at)
     ]
+    list_loader_options = (selectinload(TeacherMediaFile.teacher),)
     column_searchable_list = [
         TeacherMediaFile.original_filename, TeacherMediaFile.description
     ]
@@ -220,7 +318,7 @@ class TeacherMediaFileAdmin(ModelView, model=TeacherMediaFile):
     # Configuración de permisos
     can_create = False  # Los archivos se crean a través de la API
     can_edit = True     # Solo se puede editar la descripción
-    can_delete = True   # Los admins pueden eliminar archivos
+    can_delete = True   # Los admins pueden eliminar archivos (ver delete_model)
     can_view_details = True
 
     # Paginación
@@ -230,7 +328,21 @@ class TeacherMediaFileAdmin(ModelView, model=TeacherMediaFile):
     # Ordenamiento por defecto (más recientes primero)
     column_default_sort = [(TeacherMediaFile.uploaded_at, True)]
 
-class ResourceAdmin(ModelView, model=Resource):
+    # Borrar como la API: descontar la referencia del blob y purgar el
+    # contenido del almacenamiento después del commit
+    async def delete_model(self, request, pk):
+        await run_in_threadpool(_delete_media_file, int(pk))
+
+def _delete_media_file(file_id: int):
+    db = SessionLocal()
+    try:
+        db_file = db.get(TeacherMediaFile, file_id)
+        if db_file:
+            delete_teacher_media_file(db, file_id, db_file.teacher_id)
+    finally:
+        db.close()
+
+class ResourceAdmin(ListView, model=Resource):
     name = "Recurso"
     name_plural = "Recursos"
     icon = "fa-solid fa-folder"
@@ -240,7 +352,7 @@ class ResourceAdmin(ModelView, model=Resource):
         Resource.id, Resource.tutorship_id, Resource.title, Resource.uploaded_at
     ]
     column_filters = [
-        Resource.tutorship_id, Resource.uploaded_at
+        OperationColumnFilter(Resource.tutorship_id), OperationColumnFilter(Resource.uploaded_at)
     ]
     column_searchable_list = [Resource.title]
     column_sortable_list = [Resource.id, Resource.title, Resource.uploaded_at]
@@ -266,7 +378,7 @@ class ResourceAdmin(ModelView, model=Resource):
     # Ordenamiento por defecto (más recientes primero)
     column_default_sort = [(Resource.uploaded_at, True)]
 
-class LiveSessionAdmin(ModelView, model=LiveSession):
+class LiveSessionAdmin(ListView, model=LiveSession):
     name = "Sesión en Vivo"
     name_plural = "Sesiones en Vivo"
     icon = "fa-solid fa-video"
@@ -276,7 +388,7 @@ class LiveSessionAdmin(ModelView, model=LiveSession):
         LiveSession.id, LiveSession.tutorship_id, LiveSession.start_time,
         LiveSession.end_time, LiveSession.session_url, LiveSession.whiteboard_url
     ]
-    column_filters = [LiveSession.tutorship_id, LiveSession.start_time]
+    column_filters = [OperationColumnFilter(LiveSession.tutorship_id), OperationColumnFilter(LiveSession.start_time)]
 
     form_columns = [
         LiveSession.tutorship_id, LiveSession.start_time, LiveSession.end_time,
@@ -287,7 +399,25 @@ class LiveSessionAdmin(ModelView, model=LiveSession):
         LiveSession.end_time: DateTimeField,
     }
 
-def setup_admin(app):
+class MaintenanceJobAdmin(ModelView, model=MaintenanceJob):
+    name = "Tarea de mantenimiento"
+    name_plural = "Tareas de mantenimiento"
+    icon = "fa-solid fa-screwdriver-wrench"
+    category = "Sistema"
+
+    column_list = [
+        MaintenanceJob.kind, MaintenanceJob.status, MaintenanceJob.processed, MaintenanceJob.total,
+        MaintenanceJob.changed, MaintenanceJob.created_at, MaintenanceJob.updated_at
+    ]
+    column_details_list = column_list + [MaintenanceJob.id, MaintenanceJob.last_error, MaintenanceJob.finished_at]
+    column_default_sort = (MaintenanceJob.created_at, True)
+
+    can_create = False
+    can_edit = False
+    can_delete = False
+
+def setup_admin(app, engine=async_engine):
+    # Motor async: las consultas del panel no ocupan hilos del threadpool
     admin = Admin(app=app, engine=engine)
 
     admin.add_view(UserAdmin)
@@ -300,23 +430,6 @@ def setup_admin(app):
     admin.add_view(TeacherMediaFileAdmin)
     admin.add_view(ResourceAdmin)
     admin.add_view(LiveSessionAdmin)
+    admin.add_view(MaintenanceJobAdmin)
 
     return admin
-
-# Función para arreglar perfiles de profesor faltantes al iniciar
-def fix_missing_professor_profiles():
-    """Crear perfiles de profesor para usuarios teacher que no los tienen"""
-    from .database import SessionLocal
-    from .crud import create_missing_professor_profiles
-    
-    db = SessionLocal()
-    try:
-        created_count = create_missing_professor_profiles(db)
-        if created_count > 0:
-            print(f"✅ Se crearon {created_count} perfiles de profesor faltantes")
-        else:
-            print("✅ Todos los profesores ya tienen sus perfiles")
-    except Exception as e:
-        print(f"❌ Error creando perfiles de profesor: {e}")
-    finally:
-        db.close()
@@ -3,18 +3,22 @@ from typing import Optional
 from jose import JWTError, jwt
 from fastapi import HTTPException, Depends, Cookie
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from . import crud
-from .database import SessionLocal, get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import crud_async
+from .database import get_async_db
+from .user_cache import user_cache, UserSnapshot, AUTH_CLAIMS_MAX_AGE_SECONDS
+from .schemas import UserRole
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
+import time
 
 # Configuración
 SECRET_KEY = os.getenv("SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")  # Adding default value
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "240"))
+# Si está activo, se confía en los claims firmados del token (id, nombre, rol)
+# y no se consulta la base de datos para autenticar, pero solo durante
+# AUTH_CLAIMS_MAX_AGE_SECONDS desde la emisión (ver user_cache.py)
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() in ("1", "true", "yes")
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -23,23 +27,56 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str):
+def create_user_access_token(user, expires_delta: Optional[timedelta] = None):
+    """Crear un token con los claims necesarios para autenticar sin consultar la base de datos"""
+    return create_access_token(
+        data={
+            "sub": user.email,
+            "uid": user.id,
+            "name": user.name,
+            "role": user.role.value if hasattr(user.role, "value") else user.role
+        },
+        expires_delta=expires_delta
+    )
+
+def decode_token(token: str):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+        if payload.get("sub") is None:
             return None
-        return email
+        return payload
     except JWTError:
         return None
 
+def verify_token(token: str):
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    return payload.get("sub")
+
+def _snapshot_from_claims(payload: dict):
+    """Construir el usuario a partir de los claims firmados, si están completos y vigentes"""
+    user_id = payload.get("uid")
+    if user_id is None or payload.get("role") is None or payload.get("name") is None:
+        return None
+    issued_at = payload.get("iat", 0)
+    # Claims viejos: otro worker pudo haber cambiado el rol o dado de baja al usuario
+    if time.time() - issued_at > AUTH_CLAIMS_MAX_AGE_SECONDS:
+        return None
+    if user_cache.invalidated_since(user_id, issued_at):
+        return None
+    try:
+        return UserSnapshot(id=user_id, name=payload["name"], email=payload["sub"], role=UserRole(payload["role"]))
+    except ValueError:
+        return None
+
 async def get_current_user(
     access_token: Optional[str] = Cookie(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not access_token:
         raise HTTPException(
@@ -47,18 +84,35 @@ async def get_current_user(
             detail="No autenticado"
         )
     
-    email = verify_token(access_token)
-    if not email:
+    payload = decode_token(access_token)
+    if not payload:
         raise HTTPException(
             status_code=401,
             detail="Token inválido o expirado"
         )
     
-    user = crud.get_user_by_email(db, email)
+    # Camino rápido: claims firmados, sin acceso a la base de datos
+    if AUTH_TRUST_TOKEN_CLAIMS:
+        snapshot = _snapshot_from_claims(payload)
+        if snapshot:
+            return snapshot
+    
+    user_id = payload.get("uid")
+    if user_id is not None:
+        snapshot = user_cache.get(user_id)
+        if snapshot:
+            return snapshot
+        user = await crud_async.get_user(db, user_id)
+    else:
+        # Tokens emitidos antes de incluir el ID del usuario
+        user = await crud_async.get_user_by_email(db, payload["sub"])
+    
     if not user:
         raise HTTPException(
             status_code=401,
             detail="Usuario no encontrado"
         )
     
-    return user
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.set(snapshot)
+    return snapshot
@@ -1,25 +1,65 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import String
+from sqlalchemy.orm import Session, joinedload, selectinload, contains_eager
+from sqlalchemy import select, insert, update, delete, false, or_, and_, func
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
-from . import models, schemas
+from fastapi.concurrency import run_in_threadpool
+from . import models, schemas, slots
+from .ratings import RATING_STARS, bayesian_average
+from .user_cache import evict as evict_cached_user
+from .pagination import apply_keyset, coalesce_key, UNDATED, UNDATED_SQL
+from .storage import get_media_storage
+from .worker import enqueue_preview
 from .schemas import UserRole
-from werkzeug.security import generate_password_hash, check_password_hash
+from .passwords import hash_password, check_password, check_password_async
 from datetime import timedelta
 import logging
+import os
+import time
+import uuid
 from datetime import datetime, timedelta
+from collections import defaultdict
+from pathlib import Path
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Log de diagnóstico de búsquedas (desactivado en producción); logger propio
+# para no habilitar el nivel DEBUG del resto del módulo
+SEARCH_DEBUG_LOGGING = os.getenv("SEARCH_DEBUG_LOGGING", "false").lower() in ("1", "true", "yes")
+search_logger = logging.getLogger(f"{__name__}.search")
+if SEARCH_DEBUG_LOGGING:
+    search_logger.setLevel(logging.DEBUG)
+
+SUBJECT_LEVELS_CACHE_TTL = float(os.getenv("SUBJECT_LEVELS_CACHE_TTL", "300"))
+_subject_levels_cache = {"levels": None, "expires_at": 0.0}
+
 def get_user(db: Session, user_id: int):
     return db.query(models.User).filter(models.User.id == user_id).first()
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+# Claves de orden (sort_key, id) para la paginación por cursor; los nombres
+# pueden ser NULL, así que se ordena por coalesce(name, '') (ver coalesce_key)
+USER_ORDER = (models.User.id,)
+TEACHER_ORDER = (coalesce_key(models.User.name), models.User.id)
+SUBJECT_ORDER = (coalesce_key(models.Subject.name), models.Subject.id)
+# Atributos del cursor correspondientes a esas claves
+NAME_CURSOR = (lambda item: item.name or "", "id")
+REVIEW_ORDER = (models.Review.id,)
+# Mejor calificados primero, sobre ix_professors_ranking_id
+TEACHER_RATING_ORDER = (models.Professor.ranking, models.Professor.id)
+
+# Orden de la búsqueda de docentes: columnas, si es descendente y atributos
+# del usuario devuelto que forman el cursor de la página siguiente
+TEACHER_SORTS = {
+    "name": (TEACHER_ORDER, False, NAME_CURSOR),
+    "rating": (TEACHER_RATING_ORDER, True, ("professor_profile.ranking", "id")),
+}
+
+def get_users(db: Session, skip: int = 0, limit: int = 100, cursor: str = None):
+    return apply_keyset(db.query(models.User), USER_ORDER, cursor, skip, limit).all()
 
 def create_user(db: Session, user: schemas.UserCreate):
     if not user.password or len(user.password) < 6:
@@ -29,7 +69,7 @@ def create_user(db: Session, user: schemas.UserCreate):
     if not user.role:
         logger.error(f"User role missing for {user.email}")
         raise HTTPException(status_code=400, detail="El campo 'role' es obligatorio")    # Generar hash de la contraseña
-    hashed_password = generate_password_hash(user.password)
+    hashed_password = hash_password(user.password)
     
     db_user = models.User(
         name=user.name,
@@ -38,44 +78,88 @@ def create_user(db: Session, user: schemas.UserCreate):
         role=user.role
     )
     db.add(db_user)
+    db.flush()
+    
+    # Si el usuario es un teacher, el perfil de profesor se crea en la misma transacción
+    ensure_professor_profile(db, db_user)
     db.commit()
     db.refresh(db_user)
     
-    # Si el usuario es un teacher, crear automáticamente el perfil de profesor
-    if user.role == 'teacher':
-        db_professor = models.Professor(
-            id=db_user.id,
-            abstract="",
-            picture="",
-            ranking=0.0
-        )
-        db.add(db_professor)
-        db.commit()
-        db.refresh(db_professor)
-    
     return db_user
 
-def create_missing_professor_profiles(db: Session):
-    """Crear perfiles de profesor para usuarios con rol teacher que no los tienen"""
-    # Obtener usuarios con rol teacher que no tienen perfil de profesor
-    teachers_without_profile = db.query(models.User).filter(
-        models.User.role == 'teacher',
-        ~db.query(models.Professor).filter(models.Professor.id == models.User.id).exists()
-    ).all()
-    
-    created_count = 0
-    for teacher in teachers_without_profile:
-        professor = models.Professor(
-            id=teacher.id,
-            abstract="",
-            picture="",
-            ranking=0.0
-        )
-        db.add(professor)
-        created_count += 1
-    
+def ensure_professor_profile(db: Session, db_user: models.User) -> bool:
+    """Agregar el perfil de profesor de un teacher si todavía no existe (sin commit)"""
+    if db_user.role != 'teacher' or db.get(models.Professor, db_user.id) is not None:
+        return False
+    db.add(models.Professor(id=db_user.id, abstract="", picture=""))
+    return True
+
+PROFILE_RECONCILE_BATCH_SIZE = 1000
+
+def create_missing_professor_profiles(db: Session, batch_size: int = PROFILE_RECONCILE_BATCH_SIZE, on_progress=None):
+    """Crear perfiles de profesor para usuarios con rol teacher que no los tienen.
+
+    Recorre los teachers por id en lotes, con un commit por lote, así que no
+    retiene locks ni memoria proporcionales a la tabla de usuarios.
+    `on_progress(processed, created)` se llama después de cada lote.
+    """
+    processed = created = 0
+    last_id = 0
+    while True:
+        teacher_ids = db.execute(
+            select(models.User.id).where(
+                models.User.role == 'teacher', models.User.id > last_id
+            ).order_by(models.User.id).limit(batch_size)
+        ).scalars().all()
+        if not teacher_ids:
+            return created
+        existing = set(db.execute(
+            select(models.Professor.id).where(models.Professor.id.in_(teacher_ids))
+        ).scalars().all())
+        missing = [teacher_id for teacher_id in teacher_ids if teacher_id not in existing]
+        db.add_all(models.Professor(id=teacher_id, abstract="", picture="") for teacher_id in missing)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Otro request creó alguno de estos perfiles mientras tanto: repetir el lote
+            db.rollback()
+            continue
+        processed += len(teacher_ids)
+        created += len(missing)
+        last_id = teacher_ids[-1]
+        if on_progress:
+            on_progress(processed, created)
+
+def count_teachers(db: Session) -> int:
+    return db.execute(select(func.count()).select_from(models.User).where(models.User.role == 'teacher')).scalar_one()
+
+def recompute_professor_ratings(db: Session) -> int:
+    """Recalcular desde reviews el agregado de calificaciones de todos los profesores.
+
+    En el uso normal el agregado se mantiene en cada flush de Review; esto es
+    para después de cambios masivos sobre reviews o de cambiar el prior.
+    """
+    own_reviews = models.Review.professor_id == models.Professor.id
+    result = db.execute(
+        update(models.Professor).values(
+            rating_count=select(func.count(models.Review.rating)).where(own_reviews).scalar_subquery(),
+            rating_sum=select(func.coalesce(func.sum(models.Review.rating), 0)).where(own_reviews).scalar_subquery(),
+            **{
+                f"stars_{stars}": select(func.count()).where(own_reviews, models.Review.rating == stars).scalar_subquery()
+                for stars in RATING_STARS
+            },
+        ),
+        execution_options={"synchronize_session": False}
+    )
+    # En una segunda pasada, ya con el agregado nuevo
+    db.execute(
+        update(models.Professor).values(
+            ranking=bayesian_average(models.Professor.rating_count, models.Professor.rating_sum)
+        ),
+        execution_options={"synchronize_session": False}
+    )
     db.commit()
-    return created_count
+    return result.rowcount
 
 def update_user(db: Session, user_id: int, user: schemas.UserCreate):
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
@@ -91,15 +175,18 @@ def update_user(db: Session, user_id: int, user: schemas.UserCreate):
         raise HTTPException(status_code=400, detail="El campo 'role' es obligatorio")
 
     # Generar hash de la nueva contraseña
-    hashed_password = generate_password_hash(user.password)
+    hashed_password = hash_password(user.password)
 
     db_user.name = user.name
     db_user.email = user.email
     db_user.password = hashed_password
     db_user.role = user.role 
+    # Al pasar a teacher, el perfil se crea junto con el cambio de rol
+    ensure_professor_profile(db, db_user)
 
     db.commit()
     db.refresh(db_user)
+    evict_cached_user(user_id)
     return db_user
 
 def delete_user(db: Session, user_id: int):
@@ -107,26 +194,205 @@ def delete_user(db: Session, user_id: int):
     if db_user:
         db.delete(db_user)
         db.commit()
+        evict_cached_user(user_id)
     return db_user
 
 def verify_password(db: Session, email: str, password: str) -> bool:
     user = get_user_by_email(db, email)
     if not user:
         return False
-    return check_password_hash(user.password, password)
+    return check_password(user.password, password)
+
+async def authenticate_user(db: Session, email: str, password: str):
+    """Devolver el usuario si las credenciales son válidas, sin bloquear el event loop"""
+    user = await run_in_threadpool(get_user_by_email, db, email)
+    if not user:
+        return None
+    if not await check_password_async(user.password, password):
+        return None
+    return user
 
 # CRUD para archivos de medios del docente
-def create_teacher_media_file(db: Session, media_file: schemas.TeacherMediaFileCreate):
-    db_media_file = models.TeacherMediaFile(**media_file.dict())
+def _acquire_media_blob(db: Session, content_hash: str, size: int, staged_path: Path, storage_key: str, mime_type: str = None):
+    """Sumar una referencia al blob, creándolo (y guardando el archivo) si es nuevo.
+
+    Un blob nuevo encola su miniatura en la misma transacción (ver app/worker.py).
+
+    Devuelve True si el archivo se guardó en `storage_key` en esta llamada.
+    El bloqueo de la fila serializa esta operación con `_release_media_blob`.
+    """
+    for _ in range(2):
+        blob = db.query(models.MediaBlob).filter(
+            models.MediaBlob.sha256 == content_hash
+        ).with_for_update().first()
+        if blob:
+            blob.ref_count += 1
+            # Contenido ya almacenado: descartar la copia recibida
+            if staged_path and staged_path.exists():
+                os.remove(staged_path)
+            return False
+        try:
+            with db.begin_nested():
+                blob = models.MediaBlob(
+                    sha256=content_hash,
+                    size=size,
+                    storage_path=storage_key,
+                    ref_count=1,
+                    created_at=datetime.now()
+                )
+                db.add(blob)
+                enqueue_preview(db, blob, mime_type)
+        except IntegrityError:
+            # Otra subida del mismo contenido creó el blob en paralelo
+            continue
+        get_media_storage().put(staged_path, storage_key)
+        return True
+    raise HTTPException(status_code=409, detail="No se pudo registrar el archivo, intente nuevamente")
+
+def _release_media_blob(db: Session, content_hash: str, references: int = 1):
+    """Restar referencias al blob; si eran las últimas, borrar la fila (sin commit).
+
+    Devuelve las claves de almacenamiento a borrar con `_purge_media_blob`
+    después del commit, o None si el contenido sigue en uso.
+    """
+    blob = db.query(models.MediaBlob).filter(
+        models.MediaBlob.sha256 == content_hash
+    ).with_for_update().first()
+    if not blob:
+        return None
+    blob.ref_count -= references
+    if blob.ref_count > 0:
+        return None
+    storage_keys = [key for key in (blob.storage_path, blob.thumbnail_path) if key]
+    db.query(models.MediaJob).filter(models.MediaJob.content_hash == content_hash).delete()
+    db.delete(blob)
+    db.flush()
+    return storage_keys
+
+def _purge_media_blob(db: Session, content_hash: str, storage_keys):
+    """Borrar del almacenamiento el contenido de un blob eliminado, ya confirmado el commit.
+
+    Si el commit falla las filas vuelven y el archivo tiene que seguir ahí, por
+    eso no se borra antes. Mientras se borra, una fila provisional ocupa el hash
+    en media_blobs: una subida concurrente del mismo contenido (misma clave de
+    almacenamiento) espera en su INSERT en vez de guardar un archivo que después
+    se borraría. Si otra subida ya recreó el blob, el contenido no se toca.
+    """
+    try:
+        db.execute(insert(models.MediaBlob).values(
+            sha256=content_hash, size=0, storage_path=storage_keys[0], ref_count=0, created_at=datetime.now()
+        ))
+    except IntegrityError:
+        db.rollback()
+        return
+    try:
+        for storage_key in storage_keys:
+            get_media_storage().delete(storage_key)
+    finally:
+        db.execute(delete(models.MediaBlob).where(
+            models.MediaBlob.sha256 == content_hash, models.MediaBlob.ref_count == 0
+        ))
+        db.commit()
+
+def _purge_media_content(db: Session, released_blobs, legacy_keys=()):
+    """Borrar el contenido liberado por una transacción ya confirmada"""
+    for content_hash, storage_keys in sorted(released_blobs.items()):
+        if storage_keys:
+            _purge_media_blob(db, content_hash, storage_keys)
+    for storage_key in legacy_keys:
+        get_media_storage().delete(storage_key)
+
+def create_teacher_media_file(db: Session, media_file: schemas.TeacherMediaFileCreate, staged_path: Path = None):
+    """Registrar un archivo; si trae content_hash, se deduplica contra los blobs existentes"""
+    placed = False
+    if media_file.content_hash:
+        placed = _acquire_media_blob(
+            db, media_file.content_hash, media_file.file_size, staged_path, media_file.file_path,
+            media_file.mime_type
+        )
+    db_media_file = models.TeacherMediaFile(**media_file.dict(), uploaded_at=datetime.now())
     db.add(db_media_file)
-    db.commit()
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        if placed:
+            get_media_storage().delete(media_file.file_path)
+        raise
     db.refresh(db_media_file)
     return db_media_file
 
-def get_teacher_media_files(db: Session, teacher_id: int):
+# Más recientes primero: ORDER BY uploaded_at DESC, id DESC (índice ix_teacher_media_files_teacher_uploaded).
+# Los registros viejos sin uploaded_at se ordenan como UNDATED y quedan al final
+MEDIA_ORDER = (coalesce_key(models.TeacherMediaFile.uploaded_at, UNDATED_SQL), models.TeacherMediaFile.id)
+MEDIA_CURSOR = (lambda item: item.uploaded_at or UNDATED, "id")
+
+# Categorías del filtro `type` (las mismas que ofrece el frontend)
+MEDIA_TYPE_PATTERNS = {
+    "image": ("image/%",),
+    "video": ("video/%",),
+    "audio": ("audio/%",),
+    "document": ("application/pdf", "application/msword", "application/vnd.ms-%",
+                 "application/vnd.openxmlformats-officedocument.%", "text/%"),
+}
+
+def build_media_files_query(teacher_id: int, file_type: str = None, mime_type: str = None, search: str = None):
+    query = select(models.TeacherMediaFile).where(models.TeacherMediaFile.teacher_id == teacher_id)
+    if file_type:
+        patterns = MEDIA_TYPE_PATTERNS.get(file_type.lower())
+        if patterns is None:
+            raise HTTPException(status_code=400, detail=f"Tipo de archivo inválido. Opciones: {', '.join(MEDIA_TYPE_PATTERNS)}")
+        query = query.where(or_(*(models.TeacherMediaFile.mime_type.like(pattern) for pattern in patterns)))
+    if mime_type:
+        # "image/" filtra por prefijo; "image/png" por igualdad
+        if mime_type.endswith("/"):
+            query = query.where(models.TeacherMediaFile.mime_type.startswith(mime_type, autoescape=True))
+        else:
+            query = query.where(models.TeacherMediaFile.mime_type == mime_type)
+    if search and search.strip():
+        pattern = _contains_pattern(search)
+        query = query.where(or_(
+            models.TeacherMediaFile.original_filename.ilike(pattern, escape="\\"),
+            models.TeacherMediaFile.description.ilike(pattern, escape="\\")
+        ))
+    return query
+
+def get_teacher_media_files(db: Session, teacher_id: int, skip: int = 0, limit: int = 100, cursor: str = None,
+                            file_type: str = None, mime_type: str = None, search: str = None):
+    """Listar la biblioteca de un docente, paginada y con filtros opcionales"""
+    query = build_media_files_query(teacher_id, file_type=file_type, mime_type=mime_type, search=search)
+    query = apply_keyset(query, MEDIA_ORDER, cursor, skip, limit, descending=True)
+    return db.execute(query).scalars().all()
+
+def create_teacher_media_files(db: Session, items):
+    """Registrar varios archivos `(TeacherMediaFileCreate, staged_path)` en una sola transacción"""
+    placed = []
+    try:
+        # Bloquear los blobs siempre en el mismo orden evita deadlocks entre lotes concurrentes
+        for media_file, staged_path in sorted(items, key=lambda item: item[0].content_hash):
+            if _acquire_media_blob(
+                db, media_file.content_hash, media_file.file_size, staged_path, media_file.file_path,
+                media_file.mime_type
+            ):
+                placed.append(media_file.file_path)
+        now = datetime.now()
+        db_media_files = [models.TeacherMediaFile(**media_file.dict(), uploaded_at=now) for media_file, _ in items]
+        db.add_all(db_media_files)
+        db.commit()
+    except Exception:
+        db.rollback()
+        for storage_key in placed:
+            get_media_storage().delete(storage_key)
+        raise
+    for db_media_file in db_media_files:
+        db.refresh(db_media_file)
+    return db_media_files
+
+def get_teacher_media_files_by_ids(db: Session, teacher_id: int, file_ids):
     return db.query(models.TeacherMediaFile).filter(
-        models.TeacherMediaFile.teacher_id == teacher_id
-    ).order_by(models.TeacherMediaFile.uploaded_at.desc()).all()
+        models.TeacherMediaFile.teacher_id == teacher_id,
+        models.TeacherMediaFile.id.in_(file_ids)
+    ).order_by(models.TeacherMediaFile.id).all()
 
 def get_teacher_media_file(db: Session, file_id: int, teacher_id: int):
     return db.query(models.TeacherMediaFile).filter(
@@ -135,12 +401,92 @@ def get_teacher_media_file(db: Session, file_id: int, teacher_id: int):
     ).first()
 
 def delete_teacher_media_file(db: Session, file_id: int, teacher_id: int):
+    """Eliminar el registro; el contenido se borra solo al irse su última referencia"""
     db_file = get_teacher_media_file(db, file_id, teacher_id)
     if db_file:
+        content_hash = db_file.content_hash
+        file_key = db_file.file_path
         db.delete(db_file)
+        db.flush()
+        released_blobs, legacy_keys = {}, []
+        if content_hash:
+            released_blobs[content_hash] = _release_media_blob(db, content_hash)
+        else:
+            # Archivos anteriores al almacenamiento por hash
+            legacy_keys.append(file_key)
         db.commit()
+        # El almacenamiento se toca solo con el commit confirmado
+        _purge_media_content(db, released_blobs, legacy_keys)
     return db_file
 
+def delete_teacher_media_files(db: Session, teacher_id: int, file_ids):
+    """Eliminar varios archivos en una sola transacción; devuelve los ids eliminados"""
+    db_files = get_teacher_media_files_by_ids(db, teacher_id, file_ids)
+    released = defaultdict(int)
+    legacy_keys = []
+    for db_file in db_files:
+        if db_file.content_hash:
+            released[db_file.content_hash] += 1
+        else:
+            legacy_keys.append(db_file.file_path)
+        db.delete(db_file)
+    db.flush()
+    released_blobs = {
+        content_hash: _release_media_blob(db, content_hash, released[content_hash])
+        for content_hash in sorted(released)
+    }
+    deleted_ids = [db_file.id for db_file in db_files]
+    db.commit()
+    # El almacenamiento se toca solo con el commit confirmado
+    _purge_media_content(db, released_blobs, legacy_keys)
+    return deleted_ids
+
+def create_upload_session(db: Session, teacher_id: int, data: schemas.UploadSessionCreate, ttl: timedelta):
+    now = datetime.now()
+    session = models.MediaUploadSession(
+        id=str(uuid.uuid4()),
+        teacher_id=teacher_id,
+        original_filename=data.filename,
+        mime_type=data.mime_type or "application/octet-stream",
+        description=data.description or "",
+        upload_length=data.size,
+        created_at=now,
+        expires_at=now + ttl
+    )
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    return session
+
+def get_upload_session(db: Session, upload_id: str, teacher_id: int):
+    return db.query(models.MediaUploadSession).filter(
+        models.MediaUploadSession.id == upload_id,
+        models.MediaUploadSession.teacher_id == teacher_id,
+        models.MediaUploadSession.expires_at > datetime.now()
+    ).first()
+
+def complete_upload_session(db: Session, session: models.MediaUploadSession, media_file: schemas.TeacherMediaFileCreate, staged_path: Path):
+    """Crear el TeacherMediaFile y cerrar la sesión en la misma transacción.
+
+    Devuelve None si otro request ya completó o canceló la subida: el DELETE
+    condicional va primero y solo una de las llamadas concurrentes borra la
+    fila (las demás esperan su bloqueo y no encuentran nada), así que solo esa
+    toca el archivo recibido y registra el archivo.
+    """
+    claimed = db.execute(
+        delete(models.MediaUploadSession).where(models.MediaUploadSession.id == session.id)
+    ).rowcount
+    if not claimed:
+        db.rollback()
+        return None
+    return create_teacher_media_file(db, media_file, staged_path)
+
+def delete_upload_session(db: Session, session: models.MediaUploadSession, staged_path: Path):
+    db.delete(session)
+    db.commit()
+    if staged_path.exists():
+        os.remove(staged_path)
+
 def update_teacher_media_file_description(db: Session, file_id: int, teacher_id: int, description: str):
     db_file = get_teacher_media_file(db, file_id, teacher_id)
     if db_file:
@@ -150,104 +496,191 @@ def update_teacher_media_file_description(db: Session, file_id: int, teacher_id:
     return db_file
 
 # CRUD para tutorías
-def get_teacher_tutorships(db: Session, teacher_id: int):
-    """Obtener todas las tutorías de un profesor específico con información relacionada"""
+
+# Relaciones que serializa TutorshipDetailOut. Para una sola fila alcanza con un
+# JOIN; en los listados selectinload trae cada estudiante/materia una sola vez
+# (una consulta IN por relación) en lugar de repetirlos en cada fila.
+TUTORSHIP_DETAIL_JOINS = (joinedload(models.Tutorship.student), joinedload(models.Tutorship.subject))
+TUTORSHIP_DETAIL_SELECTS = (selectinload(models.Tutorship.student), selectinload(models.Tutorship.subject))
+
+# Más recientes primero; el índice ix_tutorships_professor_start resuelve
+# filtro, ventana de fechas y cursor sin ordenar en memoria. Las tutorías viejas
+# sin start_time se ordenan como UNDATED y quedan al final
+TUTORSHIP_ORDER = (coalesce_key(models.Tutorship.start_time, UNDATED_SQL), models.Tutorship.id)
+TUTORSHIP_CURSOR = (lambda item: item.start_time or UNDATED, "id")
+
+def _tutorship_statuses(statuses):
+    try:
+        return [models.TutorshipStatus(status) for status in statuses]
+    except ValueError:
+        options = ", ".join(status.value for status in models.TutorshipStatus)
+        raise HTTPException(status_code=400, detail=f"Estado de tutoría inválido. Opciones: {options}")
+
+def build_teacher_tutorships_query(columns, teacher_id: int, statuses=None, start: datetime = None, end: datetime = None):
+    """Tutorías de un docente con estado en `statuses` y start_time en [start, end)"""
     # El teacher_id es el mismo que el user_id y también el professor_id
     # porque en el modelo Professor, id = ForeignKey("users.id")
-    return db.query(models.Tutorship).options(
-        joinedload(models.Tutorship.student),
-        joinedload(models.Tutorship.subject)
-    ).filter(
-        models.Tutorship.professor_id == teacher_id
-    ).order_by(models.Tutorship.start_time.desc()).all()
-
-def get_tutorship_by_id(db: Session, tutorship_id: int):
-    """Obtener una tutoría específica por ID"""
-    return db.query(models.Tutorship).filter(models.Tutorship.id == tutorship_id).first()
-
-def update_tutorship_status(db: Session, tutorship_id: int, status: str):
-    """Actualizar el estado de una tutoría"""
-    db_tutorship = get_tutorship_by_id(db, tutorship_id)
-    if db_tutorship:
-        db_tutorship.status = status
-        db.commit()
-        db.refresh(db_tutorship)
-        
-        # Recargar con datos relacionados para la respuesta
-        return db.query(models.Tutorship).options(
-            joinedload(models.Tutorship.student),
-            joinedload(models.Tutorship.subject)
-        ).filter(models.Tutorship.id == tutorship_id).first()
-    return db_tutorship
-
-def get_teachers(db: Session, skip: int = 0, limit: int = 100):
+    query = select(*columns).where(models.Tutorship.professor_id == teacher_id)
+    if statuses:
+        query = query.where(models.Tutorship.status.in_(_tutorship_statuses(statuses)))
+    # La ventana se filtra sobre la misma clave del índice; las tutorías sin fecha no entran en ninguna
+    start_key = TUTORSHIP_ORDER[0]
+    if start:
+        query = query.where(start_key >= start)
+    if end:
+        query = query.where(start_key < end, models.Tutorship.start_time.isnot(None))
+    return query
+
+def get_teacher_tutorships(db: Session, teacher_id: int, skip: int = 0, limit: int = 100, cursor: str = None,
+                           statuses=None, start: datetime = None, end: datetime = None):
+    """Obtener las tutorías de un profesor con información relacionada, paginadas y filtradas"""
+    query = build_teacher_tutorships_query((models.Tutorship,), teacher_id, statuses, start, end)
+    query = apply_keyset(query, TUTORSHIP_ORDER, cursor, skip, limit, descending=True)
+    return db.execute(query.options(*TUTORSHIP_DETAIL_SELECTS)).scalars().all()
+
+def summarize_tutorships(rows) -> dict:
+    """Armar el resumen a partir de filas (status, cantidad)"""
+    by_status = {status.value: 0 for status in models.TutorshipStatus}
+    for status, count in rows:
+        by_status[models.TutorshipStatus(status).value] += count
+    return {"total": sum(by_status.values()), "by_status": by_status}
+
+def get_teacher_tutorships_summary(db: Session, teacher_id: int, start: datetime = None, end: datetime = None):
+    """Cantidad de tutorías por estado, sin cargar las filas"""
+    query = build_teacher_tutorships_query(
+        (models.Tutorship.status, func.count()), teacher_id, start=start, end=end
+    ).group_by(models.Tutorship.status)
+    return summarize_tutorships(db.execute(query).all())
+
+def get_tutorship_by_id(db: Session, tutorship_id: int, with_details: bool = False):
+    """Obtener una tutoría específica por ID (con estudiante y materia si with_details)"""
+    query = db.query(models.Tutorship)
+    if with_details:
+        query = query.options(*TUTORSHIP_DETAIL_JOINS)
+    return query.filter(models.Tutorship.id == tutorship_id).first()
+
+def update_tutorship_status(db: Session, db_tutorship: models.Tutorship, status: str):
+    """Actualizar el estado de una tutoría ya cargada y devolverla con sus relaciones"""
+    tutorship_id = db_tutorship.id
+    db_tutorship.status = status
+    db.commit()
+    # El commit expira la instancia: una sola consulta la recarga con estudiante y materia
+    return get_tutorship_by_id(db, tutorship_id, with_details=True)
+
+def get_teachers(db: Session, skip: int = 0, limit: int = 100, cursor: str = None):
     """Obtener lista de usuarios con rol teacher"""
+    query = db.query(models.User).filter(models.User.role == 'teacher')
+    return apply_keyset(query, TEACHER_ORDER, cursor, skip, limit).all()
+
+def get_teachers_by_ids(db: Session, teacher_ids: list[int]):
+    """Obtener los usuarios con rol teacher cuyos IDs están en la lista"""
     return db.query(models.User).filter(
-        models.User.role == 'teacher'
-    ).offset(skip).limit(limit).all()
+        models.User.role == 'teacher',
+        models.User.id.in_(teacher_ids)
+    ).order_by(models.User.id).all()
 
-def search_teachers(db: Session, skip: int = 0, limit: int = 100, name: str = None, subject: str = None, level: str = None):
-    """Buscar docentes con filtros opcionales"""
-    try:
-        logging.info(f"Búsqueda de profesores - name: '{name}', subject: '{subject}', level: '{level}'")
-        
-        # Empezar con consulta básica de usuarios con rol teacher
-        query = db.query(models.User).filter(
-            models.User.role == 'teacher'
-        )
-        
-        # Filtro por nombre
-        if name and name.strip():
-            query = query.filter(models.User.name.ilike(f"%{name}%"))
-            logging.info(f"Aplicado filtro por nombre: {name}")
-        
-        # Si se especifica filtro por materia o nivel, necesitamos hacer JOIN
-        if (subject and subject.strip()) or (level and level.strip()):
-            logging.info("Aplicando JOINs para filtros de materia/nivel")
-            # JOIN con Professor y ProfessorSubject y Subject
-            query = query.join(models.Professor, models.User.id == models.Professor.id)\
-                         .join(models.ProfessorSubject, models.Professor.id == models.ProfessorSubject.professor_id)\
-                         .join(models.Subject, models.ProfessorSubject.subject_id == models.Subject.id)
-            
-            # Filtro por materia (buscar en el nombre de la materia)
-            if subject and subject.strip():
-                query = query.filter(models.Subject.name.ilike(f"%{subject}%"))
-                logging.info(f"Aplicado filtro por materia: {subject}")
-            
-            # Filtro por nivel - buscar en el enum level como string
-            if level and level.strip():
-                level_lower = level.strip().lower()
-                logging.info(f"Aplicando filtro por nivel: '{level}' -> '{level_lower}'")
-                
-                # Primero, obtener los niveles disponibles para debug
-                available_levels = db.query(models.Subject.level).distinct().all()
-                logging.info(f"Niveles disponibles en DB: {[l[0] for l in available_levels]}")
-                
-                # Buscar por coincidencia exacta o parcial en el enum
-                query = query.filter(
-                    models.Subject.level.cast(String).ilike(f"%{level_lower}%")
-                )
+# Alias aceptados para el filtro de nivel (el frontend envía "Primario", "Universitario", etc.)
+SUBJECT_LEVEL_ALIASES = {
+    "primaria": models.SubjectLevel.primaria,
+    "primario": models.SubjectLevel.primaria,
+    "secundaria": models.SubjectLevel.secundaria,
+    "secundario": models.SubjectLevel.secundaria,
+    "terciaria": models.SubjectLevel.terciaria,
+    "terciario": models.SubjectLevel.terciaria,
+    "universitario": models.SubjectLevel.terciaria,
+    "universitaria": models.SubjectLevel.terciaria,
+}
+
+def parse_subject_level(level: str):
+    """Convertir el texto del filtro de nivel al valor del enum (None si no es válido)"""
+    value = level.strip().lower()
+    if value in SUBJECT_LEVEL_ALIASES:
+        return SUBJECT_LEVEL_ALIASES[value]
+    # Aceptar prefijos no ambiguos ("prim", "sec", "univ")
+    matches = {level_enum for alias, level_enum in SUBJECT_LEVEL_ALIASES.items() if alias.startswith(value)}
+    return matches.pop() if len(matches) == 1 else None
+
+def _contains_pattern(text: str) -> str:
+    """Patrón ILIKE '%texto%' escapando los comodines ingresados por el usuario"""
+    escaped = text.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def build_teacher_search_query(name: str = None, subject: str = None, level: str = None, sort: str = "name"):
+    """Construir la consulta de búsqueda de docentes (compartida por la versión sync y la async)"""
+    # El perfil trae la calificación en la misma consulta; para ordenar por
+    # calificación el JOIN deja afuera a los docentes sin perfil
+    query = select(models.User).join(
+        models.Professor, models.Professor.id == models.User.id, isouter=sort != "rating"
+    ).options(contains_eager(models.User.professor_profile)).where(models.User.role == 'teacher')
+    
+    # Filtro por nombre (ILIKE respaldado por el índice trigram ix_users_name_trgm)
+    if name and name.strip():
+        query = query.where(models.User.name.ilike(_contains_pattern(name), escape="\\"))
+    
+    # Filtros por materia o nivel: EXISTS sobre las materias del docente,
+    # sin JOIN + DISTINCT sobre la tabla de usuarios
+    if (subject and subject.strip()) or (level and level.strip()):
+        teacher_subjects = select(models.ProfessorSubject.id).join(
+            models.Subject, models.ProfessorSubject.subject_id == models.Subject.id
+        ).where(models.ProfessorSubject.professor_id == models.User.id)
         
-        # Aplicar distinct para evitar duplicados cuando hay JOINs
-        if (subject and subject.strip()) or (level and level.strip()):
-            query = query.distinct()
+        # Filtro por materia (ILIKE respaldado por el índice trigram ix_subjects_name_trgm)
+        if subject and subject.strip():
+            teacher_subjects = teacher_subjects.where(
+                models.Subject.name.ilike(_contains_pattern(subject), escape="\\")
+            )
         
-        result = query.offset(skip).limit(limit).all()
-        logging.info(f"Búsqueda completada, encontrados {len(result)} profesores")
-        return result
+        # Filtro por nivel: igualdad sobre el enum
+        if level and level.strip():
+            subject_level = parse_subject_level(level)
+            if subject_level is None:
+                return query.where(false())
+            teacher_subjects = teacher_subjects.where(models.Subject.level == subject_level)
         
-    except Exception as e:
-        # Si hay error, hacer log detallado y usar la función simple
-        logging.error(f"Error en search_teachers: {str(e)}")
-        logging.error(f"Tipo de error: {type(e).__name__}")
-        logging.error(f"Filtros aplicados - name: {name}, subject: {subject}, level: {level}")
-        import traceback
-        logging.error(f"Traceback: {traceback.format_exc()}")
-        return get_teachers(db, skip, limit)
-
-def get_subjects(db: Session, skip: int = 0, limit: int = 100):
+        query = query.where(teacher_subjects.exists())
+    
+    return query
+
+def log_teacher_search(name: str, subject: str, level: str, result_count: int, elapsed_ms: float):
+    """Log estructurado de una búsqueda, solo si SEARCH_DEBUG_LOGGING está activo"""
+    if SEARCH_DEBUG_LOGGING:
+        # Los campos van en el mensaje (el formato de basicConfig no muestra `extra`)
+        # y también en `extra`, para handlers que los serializan
+        search_logger.debug(
+            "teacher_search name=%r subject=%r level=%r result_count=%d elapsed_ms=%.2f",
+            name, subject, level, result_count, elapsed_ms,
+            extra={
+                "search_name": name,
+                "search_subject": subject,
+                "search_level": level,
+                "result_count": result_count,
+                "elapsed_ms": round(elapsed_ms, 2)
+            }
+        )
+
+def search_teachers(db: Session, skip: int = 0, limit: int = 100, name: str = None, subject: str = None, level: str = None,
+                    cursor: str = None, sort: str = "name"):
+    """Buscar docentes con filtros opcionales (una sola consulta, sin consultas de diagnóstico)"""
+    started = time.perf_counter()
+    try:
+        query = build_teacher_search_query(name=name, subject=subject, level=level, sort=sort)
+        order, descending, _ = TEACHER_SORTS[sort]
+        query = apply_keyset(query, order, cursor, skip, limit, descending=descending)
+        result = db.execute(query).scalars().all()
+    except HTTPException:
+        raise
+    except Exception:
+        # Si hay error, hacer log y usar la función simple
+        logger.exception(f"Error en search_teachers - name: {name}, subject: {subject}, level: {level}")
+        db.rollback()
+        return get_teachers(db, skip, limit, cursor)
+    
+    log_teacher_search(name, subject, level, len(result), (time.perf_counter() - started) * 1000)
+    return result
+
+def get_subjects(db: Session, skip: int = 0, limit: int = 100, cursor: str = None):
     """Obtener lista de materias disponibles"""
-    return db.query(models.Subject).offset(skip).limit(limit).all()
+    return apply_keyset(db.query(models.Subject), SUBJECT_ORDER, cursor, skip, limit).all()
 
 def get_subject_by_id(db: Session, subject_id: int):
     """Obtener una materia por su ID"""
@@ -259,30 +692,61 @@ def create_subject(db: Session, subject_data: dict):
     db.add(db_subject)
     db.commit()
     db.refresh(db_subject)
+    invalidate_subject_levels_cache()
     return db_subject
 
 def create_tutorship(db: Session, tutorship: schemas.TutorshipCreate):
     """Crear una nueva tutoría"""
     db_tutorship = models.Tutorship(**tutorship.dict())
     db.add(db_tutorship)
+    db.flush()
+    tutorship_id = db_tutorship.id
     db.commit()
-    db.refresh(db_tutorship)
     
-    # Recargar con datos relacionados para la respuesta
-    return db.query(models.Tutorship).options(
-        joinedload(models.Tutorship.student),
-        joinedload(models.Tutorship.subject),
-        joinedload(models.Tutorship.professor).joinedload(models.Professor.user)
-    ).filter(models.Tutorship.id == db_tutorship.id).first()
+    # Recargar con datos relacionados para la respuesta (una sola consulta)
+    return get_tutorship_by_id(db, tutorship_id, with_details=True)
+
+def get_review_by_tutorship(db: Session, tutorship_id: int):
+    return db.query(models.Review).filter(models.Review.tutorship_id == tutorship_id).first()
+
+def create_review(db: Session, db_tutorship: models.Tutorship, review: schemas.ReviewCreate):
+    """Crear la reseña de una tutoría; None si la tutoría ya tenía una.
+
+    El agregado del profesor (ranking e histograma) se actualiza en el mismo
+    commit, desde el flush de Review (tutorships.professor_id apunta a
+    professors, así que el perfil del profesor ya existe).
+    """
+    db_review = models.Review(
+        student_id=db_tutorship.student_id,
+        professor_id=db_tutorship.professor_id,
+        tutorship_id=db_tutorship.id,
+        rating=review.rating,
+        comment=review.comment,
+        created_at=datetime.now()
+    )
+    db.add(db_review)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        # Otra reseña de la misma tutoría ganó la carrera (índice único); cualquier otra violación sigue
+        if get_review_by_tutorship(db, db_review.tutorship_id) is None:
+            raise
+        return None
+    return db_review
 
 # CRUD para disponibilidad de profesores
+def _availability_range(availability):
+    """Inicio y fin del horario como desplazamientos del día ("24:00" cierra el día)"""
+    try:
+        return slots.parse_hhmm(availability.start_time), slots.parse_hhmm(availability.end_time)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Formato de hora inválido. Use HH:MM (00:00 a 24:00)")
+
 def create_teacher_availability(db: Session, availability: schemas.TeacherAvailabilityCreate):
     """Crear disponibilidad horaria para un profesor con validaciones"""
-    from datetime import datetime, time
-    
     # Validar que la hora de fin sea posterior a la de inicio
-    start_time = datetime.strptime(availability.start_time, "%H:%M").time()
-    end_time = datetime.strptime(availability.end_time, "%H:%M").time()
+    start_time, end_time = _availability_range(availability)
     
     if end_time <= start_time:
         raise HTTPException(
@@ -297,8 +761,7 @@ def create_teacher_availability(db: Session, availability: schemas.TeacherAvaila
     ).all()
     
     for slot in existing_slots:
-        slot_start = datetime.strptime(slot.start_time, "%H:%M").time()
-        slot_end = datetime.strptime(slot.end_time, "%H:%M").time()
+        slot_start, slot_end = _availability_range(slot)
         
         # Verificar solapamiento
         if not (end_time <= slot_start or start_time >= slot_end):
@@ -321,11 +784,8 @@ def get_teacher_availability(db: Session, teacher_id: int):
 
 def update_teacher_availability(db: Session, availability_id: int, availability: schemas.TeacherAvailabilityCreate):
     """Actualizar disponibilidad horaria con validaciones"""
-    from datetime import datetime, time
-    
     # Validar que la hora de fin sea posterior a la de inicio
-    start_time = datetime.strptime(availability.start_time, "%H:%M").time()
-    end_time = datetime.strptime(availability.end_time, "%H:%M").time()
+    start_time, end_time = _availability_range(availability)
     
     if end_time <= start_time:
         raise HTTPException(
@@ -341,8 +801,7 @@ def update_teacher_availability(db: Session, availability_id: int, availability:
     ).all()
     
     for slot in existing_slots:
-        slot_start = datetime.strptime(slot.start_time, "%H:%M").time()
-        slot_end = datetime.strptime(slot.end_time, "%H:%M").time()
+        slot_start, slot_end = _availability_range(slot)
         
         # Verificar solapamiento
         if not (end_time <= slot_start or start_time >= slot_end):
@@ -426,34 +885,73 @@ def delete_teacher_schedule(db: Session, schedule_id: int):
         return True
     return False
 
+def get_teachers_busy_intervals(db: Session, teacher_ids: list[int], start_date: datetime, end_date: datetime, duration_minutes: int = 60):
+    """Obtener los intervalos ocupados (eventos bloqueados y tutorías no canceladas) agrupados por profesor"""
+    busy = defaultdict(list)
+    if not teacher_ids:
+        return busy
+
+    blocked_events = db.query(
+        models.TeacherSchedule.teacher_id,
+        models.TeacherSchedule.start_datetime,
+        models.TeacherSchedule.end_datetime
+    ).filter(
+        models.TeacherSchedule.teacher_id.in_(teacher_ids),
+        models.TeacherSchedule.is_blocked == True,
+        models.TeacherSchedule.start_datetime < end_date,
+        models.TeacherSchedule.end_datetime > start_date
+    ).all()
+    for event in blocked_events:
+        busy[event.teacher_id].append((event.start_datetime, event.end_datetime))
+
+    tutorships = db.query(
+        models.Tutorship.professor_id,
+        models.Tutorship.start_time,
+        models.Tutorship.end_time
+    ).filter(
+        models.Tutorship.professor_id.in_(teacher_ids),
+        models.Tutorship.status != models.TutorshipStatus.canceled,
+        models.Tutorship.start_time.isnot(None),
+        models.Tutorship.start_time < end_date,
+        # Solo las que se superponen con el rango, no todo el historial del profesor;
+        # sin hora de fin se asume la duración solicitada
+        or_(
+            models.Tutorship.end_time > start_date,
+            and_(
+                models.Tutorship.end_time.is_(None),
+                models.Tutorship.start_time > start_date - timedelta(minutes=duration_minutes)
+            )
+        )
+    ).all()
+    for tutorship in tutorships:
+        tutorship_end = tutorship.end_time or tutorship.start_time + timedelta(minutes=duration_minutes)
+        busy[tutorship.professor_id].append((tutorship.start_time, tutorship_end))
+
+    return busy
+
+def get_teachers_available_slots(db: Session, teacher_ids: list[int], start_date: datetime, end_date: datetime, duration_minutes: int = 60):
+    """Obtener slots disponibles de varios profesores con un número fijo de consultas"""
+    availability = defaultdict(list)
+    if teacher_ids:
+        rows = db.query(models.TeacherAvailability).filter(
+            models.TeacherAvailability.teacher_id.in_(teacher_ids)
+        ).all()
+        for row in rows:
+            availability[row.teacher_id].append(row)
+
+    busy = get_teachers_busy_intervals(db, teacher_ids, start_date, end_date, duration_minutes)
+
+    return {
+        teacher_id: slots.compute_available_slots(
+            availability.get(teacher_id, []), busy.get(teacher_id, []),
+            start_date, end_date, duration_minutes
+        )
+        for teacher_id in teacher_ids
+    }
+
 def get_teacher_available_slots(db: Session, teacher_id: int, start_date: datetime, end_date: datetime, duration_minutes: int = 60):
     """Obtener slots disponibles de un profesor en un rango de fechas"""
-    # Esta es una implementación básica - en una app real sería más compleja
-    # Por ahora devuelve slots de ejemplo
-    available_slots = []
-    
-    # Obtener disponibilidad del profesor
-    availability = get_teacher_availability(db, teacher_id)
-    
-    # Obtener eventos bloqueados
-    blocked_events = get_teacher_schedule(db, teacher_id, start_date, end_date)
-    
-    # Generar slots disponibles (implementación simplificada)
-    current_date = start_date
-    while current_date < end_date:
-        # Agregar un slot de ejemplo por día
-        slot_start = current_date.replace(hour=14, minute=0, second=0, microsecond=0)
-        slot_end = slot_start + timedelta(minutes=duration_minutes)
-        
-        available_slots.append({
-            "start_datetime": slot_start,
-            "end_datetime": slot_end,
-            "duration_minutes": duration_minutes
-        })
-        
-        current_date += timedelta(days=1)
-    
-    return available_slots
+    return get_teachers_available_slots(db, [teacher_id], start_date, end_date, duration_minutes)[teacher_id]
 
 # CRUD para materias del docente
 def get_teacher_subjects(db: Session, teacher_id: int):
@@ -523,11 +1021,20 @@ def remove_subject_from_teacher(db: Session, teacher_id: int, subject_id: int):
     return False
 
 def get_subject_levels(db: Session):
-    """Obtener lista de niveles disponibles en las materias"""
+    """Obtener lista de niveles disponibles en las materias (cacheada SUBJECT_LEVELS_CACHE_TTL segundos)"""
+    now = time.monotonic()
+    if _subject_levels_cache["levels"] is not None and _subject_levels_cache["expires_at"] > now:
+        return _subject_levels_cache["levels"]
     try:
         # Obtener todos los niveles únicos de las materias
         levels = db.query(models.Subject.level).distinct().all()
-        return [level[0] for level in levels if level[0]]
+        levels = [level[0] for level in levels if level[0]]
     except Exception as e:
         logging.error(f"Error obteniendo niveles: {str(e)}")
         return ["primaria", "secundaria", "terciaria"]  # Valores por defecto
+    _subject_levels_cache["levels"] = levels
+    _subject_levels_cache["expires_at"] = now + SUBJECT_LEVELS_CACHE_TTL
+    return levels
+
+def invalidate_subject_levels_cache():
+    _subject_levels_cache["levels"] = None
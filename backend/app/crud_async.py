@@ -0,0 +1,78 @@
+"""
+Lecturas asíncronas (AsyncSession) para los endpoints más consultados.
+
+Reutilizan las mismas consultas que `crud` pero se ejecutan con asyncpg, sin
+ocupar hilos del threadpool. Las relaciones que se serializan en la respuesta
+se cargan de forma explícita, porque en modo async no hay lazy loading.
+"""
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from datetime import datetime
+import logging
+import time
+
+from . import models
+from .crud import (
+    build_teacher_search_query, log_teacher_search, TEACHER_ORDER, TEACHER_SORTS, SUBJECT_ORDER,
+    build_teacher_tutorships_query, summarize_tutorships, TUTORSHIP_ORDER, REVIEW_ORDER,
+)
+from .pagination import apply_keyset
+
+logger = logging.getLogger(__name__)
+
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.get(models.User, user_id)
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
+
+async def get_teachers(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: str = None):
+    """Obtener lista de usuarios con rol teacher"""
+    query = select(models.User).where(models.User.role == 'teacher').options(selectinload(models.User.professor_profile))
+    result = await db.execute(apply_keyset(query, TEACHER_ORDER, cursor, skip, limit))
+    return result.scalars().all()
+
+async def search_teachers(db: AsyncSession, skip: int = 0, limit: int = 100, name: str = None, subject: str = None, level: str = None,
+                          cursor: str = None, sort: str = "name"):
+    """Buscar docentes con filtros opcionales, con su calificación"""
+    started = time.perf_counter()
+    query = build_teacher_search_query(name=name, subject=subject, level=level, sort=sort)
+    order, descending, _ = TEACHER_SORTS[sort]
+    result = (await db.execute(apply_keyset(query, order, cursor, skip, limit, descending=descending))).scalars().all()
+    log_teacher_search(name, subject, level, len(result), (time.perf_counter() - started) * 1000)
+    return result
+
+async def get_subjects(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: str = None):
+    """Obtener lista de materias disponibles"""
+    result = await db.execute(apply_keyset(select(models.Subject), SUBJECT_ORDER, cursor, skip, limit))
+    return result.scalars().all()
+
+async def get_teacher_tutorships(db: AsyncSession, teacher_id: int, skip: int = 0, limit: int = 100, cursor: str = None,
+                                 statuses=None, start: datetime = None, end: datetime = None):
+    """Tutorías de un profesor con estudiante y materia, paginadas (3 consultas, sin N+1)"""
+    query = build_teacher_tutorships_query((models.Tutorship,), teacher_id, statuses, start, end)
+    query = apply_keyset(query, TUTORSHIP_ORDER, cursor, skip, limit, descending=True).options(
+        selectinload(models.Tutorship.student),
+        selectinload(models.Tutorship.subject)
+    )
+    result = await db.execute(query)
+    return result.scalars().all()
+
+async def get_teacher_tutorships_summary(db: AsyncSession, teacher_id: int, start: datetime = None, end: datetime = None):
+    """Cantidad de tutorías por estado, sin cargar las filas"""
+    query = build_teacher_tutorships_query(
+        (models.Tutorship.status, func.count()), teacher_id, start=start, end=end
+    ).group_by(models.Tutorship.status)
+    return summarize_tutorships((await db.execute(query)).all())
+
+async def get_teacher_reviews(db: AsyncSession, teacher_id: int, skip: int = 0, limit: int = 20, cursor: str = None):
+    """Reseñas de un docente, más recientes primero (sobre ix_reviews_professor_id_id)"""
+    query = select(models.Review).where(models.Review.professor_id == teacher_id)
+    result = await db.execute(apply_keyset(query, REVIEW_ORDER, cursor, skip, limit, descending=True))
+    return result.scalars().all()
+
+async def get_professor(db: AsyncSession, teacher_id: int):
+    """Perfil del docente, con el agregado y el histograma de sus reseñas"""
+    return await db.get(models.Professor, teacher_id)
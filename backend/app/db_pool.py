@@ -0,0 +1,114 @@
+"""
+Configuración y métricas del pool de conexiones.
+
+Los parámetros del pool se leen de variables de entorno para poder ajustarlos
+según la cantidad de workers de uvicorn. Los pools registran cuánto tarda cada
+checkout (espera en la cola más apertura de la conexión) en un histograma
+acumulado, expuesto por `pool_stats`.
+"""
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+import os
+import threading
+import time
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # segundos, -1 para desactivar
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Límites superiores de los buckets del histograma de espera, en milisegundos
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+def pool_options():
+    """Argumentos de `create_engine`/`create_async_engine` para el pool"""
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+class WaitHistogram:
+    def __init__(self, buckets=WAIT_BUCKETS_MS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._count = 0
+        self._timeouts = 0
+        self._lock = threading.Lock()
+
+    def observe(self, elapsed_ms: float):
+        index = len(self.buckets)
+        for i, upper in enumerate(self.buckets):
+            if elapsed_ms <= upper:
+                index = i
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum_ms += elapsed_ms
+            self._max_ms = max(self._max_ms, elapsed_ms)
+
+    def timeout(self):
+        with self._lock:
+            self._timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            total, sum_ms, max_ms, timeouts = self._count, self._sum_ms, self._max_ms, self._timeouts
+        # Buckets acumulativos, al estilo Prometheus
+        cumulative, running = {}, 0
+        for upper, count in zip([str(b) for b in self.buckets] + ["+Inf"], counts):
+            running += count
+            cumulative[upper] = running
+        return {
+            "count": total,
+            "sum_ms": round(sum_ms, 3),
+            "max_ms": round(max_ms, 3),
+            "timeouts": timeouts,
+            "buckets_ms": cumulative,
+        }
+
+class _TimedPoolMixin:
+    """Mide el tiempo de cada checkout del pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_histogram = WaitHistogram()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.wait_histogram.timeout()
+            raise
+        self.wait_histogram.observe((time.perf_counter() - started) * 1000)
+        return connection
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def pool_stats(pool):
+    """Estado actual del pool y el histograma de esperas"""
+    stats = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    if isinstance(pool, _TimedPoolMixin):
+        stats["checkout_wait"] = pool.wait_histogram.snapshot()
+    return stats
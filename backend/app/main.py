@@ -1,78 +1,96 @@
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Form
+from fastapi import FastAPI, APIRouter, BackgroundTasks, HTTPException, Depends, File, UploadFile, Form, Query, Request, Response
 from sqlalchemy.orm import Session
-from . import models, schemas, crud
-from .database import engine, get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models, schemas, crud, crud_async, maintenance, slots
+from .database import engine, async_engine, get_db, get_async_db
+from .admin import setup_admin
+from .db_pool import pool_stats
+from .pagination import next_cursor, NEXT_CURSOR_HEADER
+from .media import save_upload, staging_path, blob_key, UploadTooLargeError, UploadSizeLimitMiddleware, MEDIA_MAX_UPLOAD_BYTES, MEDIA_MAX_BATCH_FILES
+from .zipstream import zip_stream
+from .query_counter import QueryCountMiddleware, SQL_QUERY_COUNT_HEADER, QUERY_COUNT_HEADER
+from .storage import get_media_storage, MEDIA_ROOT
+from .resumable import (
+    RESUMABLE_MAX_UPLOAD_BYTES, RESUMABLE_UPLOAD_TTL_HOURS, OFFSET_HEADER, LENGTH_HEADER, CHUNK_CONTENT_TYPE,
+    UploadOffsetConflict, UploadLocked, resumable_path, current_offset, append_chunk, upload_digest, hash_states
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
-from .auth import get_current_user, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from fastapi.responses import JSONResponse, StreamingResponse
+from contextlib import asynccontextmanager
+from .auth import get_current_user, create_access_token, create_user_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from datetime import timedelta, datetime
 from .schemas import UserRole
 import os
-import uuid
-import shutil
 from pathlib import Path
+from typing import Literal, Optional
 
 import logging
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-
-# Crear tablas
-models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI()
-from app.admin import setup_admin, fix_missing_professor_profiles
-setup_admin(app)
+router = APIRouter()
 
-# Arreglar perfiles de profesor faltantes al iniciar
-fix_missing_professor_profiles()
+def set_next_cursor(response: Response, items, order_attributes, limit: int):
+    """Enviar el cursor de la página siguiente en la cabecera X-Next-Cursor"""
+    cursor = next_cursor(items, order_attributes, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:5173"],
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE"],
-    allow_headers=["Content-Type", "Set-Cookie", "Authorization"],
-    expose_headers=["Set-Cookie"]
-)
-
-@app.get("/users/check-email/{email}")
+@router.get("/users/check-email/{email}")
 def check_email(email: str, db: Session = Depends(get_db)):
     db_user = crud.get_user_by_email(db, email)
     return {"exists": db_user is not None}
 
-@app.get("/users", response_model=list[schemas.UserOut])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_users(db, skip=skip, limit=limit)
+@router.get("/users", response_model=list[schemas.UserOut])
+def read_users(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    users = crud.get_users(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, users, ("id",), limit)
+    return users
 
-@app.get("/teachers", response_model=list[schemas.UserOut])
-def get_teachers(
+@router.get("/teachers", response_model=list[schemas.TeacherSearchOut])
+async def get_teachers(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     name: str = None,
     subject: str = None,
     level: str = None,
+    sort: Literal["name", "rating"] = "name",
     current_user = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Obtener lista de docentes disponibles con filtros opcionales"""
+    """Obtener lista de docentes disponibles con filtros opcionales.
+
+    Con sort=rating se ordenan de mejor a peor calificación (promedio bayesiano
+    materializado en el perfil, sin leer las reseñas).
+    """
     try:
         # Usar función de búsqueda simplificada
-        return crud.search_teachers(db, skip=skip, limit=limit, name=name, subject=subject, level=level)
+        teachers = await crud_async.search_teachers(
+            db, skip=skip, limit=limit, name=name, subject=subject, level=level, cursor=cursor, sort=sort
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         # Log del error y usar función básica como fallback
         logging.error(f"Error en endpoint get_teachers: {str(e)}")
-        return crud.get_teachers(db, skip=skip, limit=limit)
+        await db.rollback()
+        # Un cursor mal formado ya se rechazó con 400 antes de consultar (ver
+        # pagination.apply_keyset), así que el reintento no repite ese error
+        teachers = await crud_async.get_teachers(db, skip=skip, limit=limit, cursor=cursor if sort == "name" else None)
+        sort = "name"
+    
+    set_next_cursor(response, teachers, crud.TEACHER_SORTS[sort][2], limit)
+    return teachers
 
-@app.get("/subjects", response_model=list[schemas.SubjectOut])
-def get_subjects(skip: int = 0, limit: int = 100, current_user = Depends(get_current_user), db: Session = Depends(get_db)):
+@router.get("/subjects", response_model=list[schemas.SubjectOut])
+async def get_subjects(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, current_user = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Obtener lista de materias disponibles"""
-    return crud.get_subjects(db, skip=skip, limit=limit)
+    subjects = await crud_async.get_subjects(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, subjects, crud.NAME_CURSOR, limit)
+    return subjects
 
-@app.get("/users/{user_id}", response_model=schemas.UserOut)
+@router.get("/users/{user_id}", response_model=schemas.UserOut)
 def read_user(user_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
     db_user = crud.get_user(db, user_id)
     if not db_user:
@@ -94,7 +112,7 @@ def read_user(user_id: int, db: Session = Depends(get_db), current_user = Depend
             detail="No tienes permisos para ver este perfil"
         )
 
-@app.post("/users", response_model=schemas.UserOut)
+@router.post("/users", response_model=schemas.UserOut)
 def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     print(">>>>> role recibido:", user.role, type(user.role))  # DEBUG
     if not user.role:
@@ -119,34 +137,62 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
 
     return crud.create_user(db, user)
 
-@app.put("/users/{user_id}", response_model=schemas.UserOut)
+@router.put("/users/{user_id}", response_model=schemas.UserOut)
 def update_user(user_id: int, user: schemas.UserCreate, db: Session = Depends(get_db)):
     updated = crud.update_user(db, user_id, user)
     if not updated:
         raise HTTPException(status_code=404, detail="User not found")
     return updated
 
-@app.delete("/users/{user_id}")
+@router.delete("/users/{user_id}")
 def delete_user(user_id: int, db: Session = Depends(get_db)):
     deleted = crud.delete_user(db, user_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="User not found")
     return {"detail": "User deleted"}
 
-@app.post("/admin/migrate-professor-profiles")
+@router.post("/admin/migrate-professor-profiles", status_code=202, response_model=schemas.MaintenanceJobOut)
 def migrate_professor_profiles(
+    background_tasks: BackgroundTasks,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Crear perfiles de profesor para usuarios con rol teacher que no los tienen"""
+    """Lanzar en segundo plano la creación de perfiles de profesor faltantes"""
     # Solo admins pueden ejecutar esta migración
     if current_user.role != 'admin':
         raise HTTPException(status_code=403, detail="Solo los administradores pueden ejecutar migraciones")
     
-    created_count = crud.create_missing_professor_profiles(db)
+    # Si ya hay una en curso se devuelve esa, para no recorrer la tabla dos veces
+    job, created = maintenance.start_job(db, maintenance.PROFESSOR_PROFILES_JOB, current_user.id)
+    if created:
+        background_tasks.add_task(maintenance.run_professor_profiles_job, job.id)
+    return job
+
+@router.get("/admin/jobs/{job_id}", response_model=schemas.MaintenanceJobOut)
+def get_maintenance_job(
+    job_id: str,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Progreso de una tarea de mantenimiento"""
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Solo los administradores pueden ver las tareas")
+    
+    job = maintenance.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    return job
+
+@router.get("/admin/db-pool")
+def get_db_pool_metrics(current_user = Depends(get_current_user)):
+    """Métricas en vivo de los pools de conexiones de este worker"""
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Solo los administradores pueden ver las métricas")
+    
     return {
-        "message": f"Se crearon {created_count} perfiles de profesor",
-        "created_count": created_count
+        "pid": os.getpid(),
+        "sync": pool_stats(engine.pool),
+        "async": pool_stats(async_engine.sync_engine.pool)
     }
 
 from datetime import timedelta
@@ -154,24 +200,20 @@ from fastapi.security import OAuth2PasswordRequestForm
 from .auth import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, get_current_user
 from fastapi.responses import JSONResponse
 
-@app.post("/login")
+@router.post("/login")
 async def login(user_credentials: schemas.UserLogin, db: Session = Depends(get_db)):
     try:
-        # Verificar credenciales
-        if not crud.verify_password(db, user_credentials.email, user_credentials.password):
+        # Verificar credenciales (la consulta y el hash corren fuera del event loop)
+        user = await crud.authenticate_user(db, user_credentials.email, user_credentials.password)
+        if not user:
             raise HTTPException(
                 status_code=401,
                 detail="Credenciales incorrectas"
             )
         
-        # Si las credenciales son correctas, obtener el usuario
-        user = crud.get_user_by_email(db, user_credentials.email)
-        
         # Crear token de acceso
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": user.email}, expires_delta=access_token_expires
-        )
+        access_token = create_user_access_token(user, expires_delta=access_token_expires)
         
         # Crear respuesta con cookie
         response = JSONResponse(content={"user": {
@@ -201,13 +243,13 @@ async def login(user_credentials: schemas.UserLogin, db: Session = Depends(get_d
             detail="Error interno del servidor"
         )
 
-@app.post("/logout")
+@router.post("/logout")
 async def logout():
     response = JSONResponse(content={"message": "Logout successful"})
     response.delete_cookie(key="access_token")
     return response
 
-@app.get("/check-auth")
+@router.get("/check-auth")
 async def check_auth(current_user = Depends(get_current_user)):
     return {
         "authenticated": True,
@@ -219,9 +261,9 @@ async def check_auth(current_user = Depends(get_current_user)):
         }
     }
 
-# Configuración para archivos
-UPLOAD_DIR = Path("uploads/teacher_media")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+# Configuración para archivos: el contenido vive en `get_media_storage()` (disco local o S3);
+# UPLOAD_DIR solo se usa como área temporal para recibir las subidas
+UPLOAD_DIR = MEDIA_ROOT
 
 ALLOWED_EXTENSIONS = {
     'pdf', 'doc', 'docx', 'ppt', 'pptx', 'xls', 'xlsx',
@@ -235,7 +277,7 @@ def is_allowed_file(filename: str) -> bool:
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-@app.post("/teachers/{teacher_id}/media", response_model=schemas.TeacherMediaFileOut)
+@router.post("/teachers/{teacher_id}/media", response_model=schemas.TeacherMediaFileOut)
 async def upload_teacher_media(
     teacher_id: int,
     file: UploadFile = File(...),
@@ -253,48 +295,319 @@ async def upload_teacher_media(
     if not is_allowed_file(file.filename):
         raise HTTPException(status_code=400, detail="Tipo de archivo no permitido")
     
-    # Generar nombre único para el archivo
     file_extension = file.filename.rsplit('.', 1)[1].lower()
-    unique_filename = f"{uuid.uuid4()}.{file_extension}"
-    file_path = UPLOAD_DIR / unique_filename
+    staged_path = staging_path(UPLOAD_DIR)
     
     try:
-        # Guardar archivo
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Obtener información del archivo
-        file_size = os.path.getsize(file_path)
-        
-        # Crear registro en la base de datos
+        # Recibir el archivo por bloques, fuera del event loop y con límite de tamaño
+        file_size, content_hash = await save_upload(file, staged_path)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al subir archivo: {str(e)}")
+    
+    try:
+        # Crear registro en la base de datos; el contenido se guarda una sola vez por hash
         media_file_data = schemas.TeacherMediaFileCreate(
             teacher_id=teacher_id,
-            filename=unique_filename,
+            filename=f"{content_hash}.{file_extension}",
             original_filename=file.filename,
-            file_path=str(file_path),
+            file_path=blob_key(content_hash),
             file_size=file_size,
             mime_type=file.content_type or "application/octet-stream",
-            description=description
+            description=description,
+            content_hash=content_hash
         )
         
-        db_media_file = crud.create_teacher_media_file(db, media_file_data)
-        db_media_file.uploaded_at = datetime.now()
-        db.commit()
-        
-        return db_media_file
+        return await run_in_threadpool(crud.create_teacher_media_file, db, media_file_data, staged_path)
         
     except Exception as e:
-        # Si hay error, eliminar el archivo
-        if file_path.exists():
-            os.remove(file_path)
+        # Si hay error, eliminar la copia temporal (el blob compartido no se toca)
+        if staged_path.exists():
+            os.remove(staged_path)
+        if isinstance(e, HTTPException):
+            raise
         raise HTTPException(status_code=500, detail=f"Error al subir archivo: {str(e)}")
 
-@app.get("/teachers/{teacher_id}/media", response_model=list[schemas.TeacherMediaFileOut])
+def require_media_owner(current_user, teacher_id: int):
+    """Solo el docente dueño de la biblioteca puede subir archivos a ella"""
+    if current_user.role != 'teacher':
+        raise HTTPException(status_code=403, detail="Solo los docentes pueden subir archivos")
+    
+    if current_user.id != teacher_id:
+        raise HTTPException(status_code=403, detail="Solo puedes subir archivos a tu propia biblioteca")
+
+def get_upload_session_or_404(db: Session, upload_id: str, teacher_id: int):
+    session = crud.get_upload_session(db, upload_id, teacher_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Subida no encontrada o expirada")
+    return session
+
+def upload_session_out(session: models.MediaUploadSession, offset: int):
+    return schemas.UploadSessionOut(
+        id=session.id,
+        teacher_id=session.teacher_id,
+        original_filename=session.original_filename,
+        mime_type=session.mime_type,
+        upload_length=session.upload_length,
+        offset=offset,
+        expires_at=session.expires_at
+    )
+
+@router.post("/teachers/{teacher_id}/uploads", response_model=schemas.UploadSessionOut, status_code=201)
+def create_resumable_upload(
+    teacher_id: int,
+    data: schemas.UploadSessionCreate,
+    response: Response,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Iniciar una subida reanudable (ver app/resumable.py)"""
+    require_media_owner(current_user, teacher_id)
+    
+    if not is_allowed_file(data.filename):
+        raise HTTPException(status_code=400, detail="Tipo de archivo no permitido")
+    
+    if data.size <= 0:
+        raise HTTPException(status_code=400, detail="El tamaño del archivo debe ser mayor a cero")
+    
+    if data.size > RESUMABLE_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=str(UploadTooLargeError(RESUMABLE_MAX_UPLOAD_BYTES)))
+    
+    session = crud.create_upload_session(db, teacher_id, data, timedelta(hours=RESUMABLE_UPLOAD_TTL_HOURS))
+    resumable_path(UPLOAD_DIR, session.id).touch()
+    response.headers["Location"] = f"/teachers/{teacher_id}/uploads/{session.id}"
+    response.headers[OFFSET_HEADER] = "0"
+    return upload_session_out(session, 0)
+
+@router.api_route("/teachers/{teacher_id}/uploads/{upload_id}", methods=["GET", "HEAD"], response_model=schemas.UploadSessionOut)
+def get_resumable_upload(
+    teacher_id: int,
+    upload_id: str,
+    response: Response,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Estado de la subida: el cliente retoma desde Upload-Offset"""
+    require_media_owner(current_user, teacher_id)
+    session = get_upload_session_or_404(db, upload_id, teacher_id)
+    offset = current_offset(resumable_path(UPLOAD_DIR, upload_id))
+    response.headers[OFFSET_HEADER] = str(offset)
+    response.headers[LENGTH_HEADER] = str(session.upload_length)
+    response.headers["Cache-Control"] = "no-store"
+    return upload_session_out(session, offset)
+
+@router.patch("/teachers/{teacher_id}/uploads/{upload_id}", status_code=204)
+async def upload_resumable_chunk(
+    teacher_id: int,
+    upload_id: str,
+    request: Request,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Agregar bytes a la subida a partir del offset indicado en Upload-Offset"""
+    require_media_owner(current_user, teacher_id)
+    
+    if request.headers.get("content-type", "").split(";")[0].strip() != CHUNK_CONTENT_TYPE:
+        raise HTTPException(status_code=415, detail=f"El cuerpo debe ser {CHUNK_CONTENT_TYPE}")
+    
+    upload_offset = request.headers.get(OFFSET_HEADER, "")
+    if not upload_offset.isdigit():
+        raise HTTPException(status_code=400, detail=f"Falta la cabecera {OFFSET_HEADER}")
+    
+    session = await run_in_threadpool(get_upload_session_or_404, db, upload_id, teacher_id)
+    
+    try:
+        offset = await append_chunk(
+            upload_id, resumable_path(UPLOAD_DIR, upload_id), int(upload_offset),
+            request.stream(), session.upload_length
+        )
+    except UploadOffsetConflict as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={OFFSET_HEADER: str(e.offset)})
+    except UploadLocked:
+        raise HTTPException(status_code=423, detail="Hay otra parte de esta subida en curso")
+    except UploadTooLargeError:
+        raise HTTPException(status_code=413, detail="Los datos superan el tamaño declarado al crear la subida")
+    
+    return Response(status_code=204, headers={OFFSET_HEADER: str(offset)})
+
+@router.post("/teachers/{teacher_id}/uploads/{upload_id}/complete", response_model=schemas.TeacherMediaFileOut)
+async def complete_resumable_upload(
+    teacher_id: int,
+    upload_id: str,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Cerrar la subida y registrar el archivo en la biblioteca"""
+    require_media_owner(current_user, teacher_id)
+    session = await run_in_threadpool(get_upload_session_or_404, db, upload_id, teacher_id)
+    
+    path = resumable_path(UPLOAD_DIR, upload_id)
+    offset = current_offset(path)
+    if offset != session.upload_length:
+        raise HTTPException(
+            status_code=409,
+            detail=f"La subida está incompleta ({offset} de {session.upload_length} bytes)",
+            headers={OFFSET_HEADER: str(offset)}
+        )
+    
+    try:
+        content_hash = await upload_digest(upload_id, path, session.upload_length)
+    except FileNotFoundError:
+        # Otro /complete de la misma subida ya movió el archivo al almacenamiento
+        raise HTTPException(status_code=404, detail="Subida no encontrada o expirada")
+    file_extension = session.original_filename.rsplit('.', 1)[1].lower()
+    media_file_data = schemas.TeacherMediaFileCreate(
+        teacher_id=teacher_id,
+        filename=f"{content_hash}.{file_extension}",
+        original_filename=session.original_filename,
+        file_path=blob_key(content_hash),
+        file_size=session.upload_length,
+        mime_type=session.mime_type or "application/octet-stream",
+        description=session.description,
+        content_hash=content_hash
+    )
+    
+    try:
+        # El archivo recibido pasa directo al almacenamiento, sin copiarlo
+        media_file = await run_in_threadpool(crud.complete_upload_session, db, session, media_file_data, path)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al subir archivo: {str(e)}")
+    if media_file is None:
+        raise HTTPException(status_code=404, detail="Subida no encontrada o expirada")
+    hash_states.discard(upload_id)
+    return media_file
+
+@router.delete("/teachers/{teacher_id}/uploads/{upload_id}", status_code=204)
+def cancel_resumable_upload(
+    teacher_id: int,
+    upload_id: str,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    require_media_owner(current_user, teacher_id)
+    session = get_upload_session_or_404(db, upload_id, teacher_id)
+    crud.delete_upload_session(db, session, resumable_path(UPLOAD_DIR, upload_id))
+    hash_states.discard(upload_id)
+    return Response(status_code=204)
+
+@router.post("/teachers/{teacher_id}/media/batch", response_model=list[schemas.TeacherMediaFileOut])
+async def upload_teacher_media_batch(
+    teacher_id: int,
+    files: list[UploadFile] = File(...),
+    descriptions: list[str] = Form([]),
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Subir varios archivos en un solo request; se registran todos o ninguno"""
+    require_media_owner(current_user, teacher_id)
+    
+    if len(files) > MEDIA_MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"Se pueden subir hasta {MEDIA_MAX_BATCH_FILES} archivos por vez")
+    
+    rejected = [file.filename for file in files if not is_allowed_file(file.filename)]
+    if rejected:
+        raise HTTPException(status_code=400, detail=f"Tipo de archivo no permitido: {', '.join(rejected)}")
+    
+    staged_paths = []
+    try:
+        items = []
+        for index, file in enumerate(files):
+            staged_path = staging_path(UPLOAD_DIR)
+            staged_paths.append(staged_path)
+            try:
+                file_size, content_hash = await save_upload(file, staged_path)
+            except UploadTooLargeError as e:
+                raise HTTPException(status_code=413, detail=f"{file.filename}: {str(e)}")
+            file_extension = file.filename.rsplit('.', 1)[1].lower()
+            items.append((schemas.TeacherMediaFileCreate(
+                teacher_id=teacher_id,
+                filename=f"{content_hash}.{file_extension}",
+                original_filename=file.filename,
+                file_path=blob_key(content_hash),
+                file_size=file_size,
+                mime_type=file.content_type or "application/octet-stream",
+                description=descriptions[index] if index < len(descriptions) else "",
+                content_hash=content_hash
+            ), staged_path))
+        
+        return await run_in_threadpool(crud.create_teacher_media_files, db, items)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al subir archivos: {str(e)}")
+    finally:
+        # Las copias temporales que no pasaron al almacenamiento
+        for staged_path in staged_paths:
+            if staged_path.exists():
+                os.remove(staged_path)
+
+@router.post("/teachers/{teacher_id}/media/batch-delete", response_model=schemas.MediaBatchDeleteOut)
+def delete_teacher_media_batch(
+    teacher_id: int,
+    data: schemas.MediaBatchDelete,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Eliminar varios archivos en una sola transacción"""
+    if current_user.role != 'teacher':
+        raise HTTPException(status_code=403, detail="Solo los docentes pueden eliminar archivos")
+    
+    if current_user.id != teacher_id:
+        raise HTTPException(status_code=403, detail="Solo puedes eliminar archivos de tu propia biblioteca")
+    
+    file_ids = list(dict.fromkeys(data.ids))
+    if len(file_ids) > MEDIA_MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"Se pueden eliminar hasta {MEDIA_MAX_BATCH_FILES} archivos por vez")
+    
+    deleted = crud.delete_teacher_media_files(db, teacher_id, file_ids)
+    return {"deleted": deleted, "not_found": [file_id for file_id in file_ids if file_id not in set(deleted)]}
+
+@router.get("/teachers/{teacher_id}/media/export")
+def export_teacher_media(
+    teacher_id: int,
+    ids: list[int] = Query(...),
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Descargar los archivos seleccionados en un zip generado al vuelo"""
+    if current_user.role not in ['teacher', 'student', 'alumno']:
+        raise HTTPException(status_code=403, detail="Sin permisos para descargar archivos")
+    
+    if current_user.role == 'teacher' and current_user.id != teacher_id:
+        raise HTTPException(status_code=403, detail="Solo puedes acceder a tu propia biblioteca")
+    
+    file_ids = list(dict.fromkeys(ids))
+    if len(file_ids) > MEDIA_MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"Se pueden exportar hasta {MEDIA_MAX_BATCH_FILES} archivos por vez")
+    
+    media_files = crud.get_teacher_media_files_by_ids(db, teacher_id, file_ids)
+    if len(media_files) != len(file_ids):
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    
+    return StreamingResponse(
+        zip_stream(media_files, lambda media_file: get_media_storage().open(media_file.file_path)),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="biblioteca-{teacher_id}.zip"',
+            "Cache-Control": "private, no-store"
+        }
+    )
+
+@router.get("/teachers/{teacher_id}/media", response_model=list[schemas.TeacherMediaFileOut])
 def get_teacher_media_files(
     teacher_id: int,
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    file_type: Optional[str] = Query(None, alias="type"),
+    mime_type: Optional[str] = None,
+    search: Optional[str] = None,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    """Listar la biblioteca (más recientes primero), con filtros por tipo, mime type y texto"""
     # Verificar que el usuario es un docente y es el mismo que el teacher_id
     if current_user.role != 'teacher':
         raise HTTPException(status_code=403, detail="Solo los docentes pueden acceder a sus archivos")
@@ -302,12 +615,18 @@ def get_teacher_media_files(
     if current_user.id != teacher_id:
         raise HTTPException(status_code=403, detail="Solo puedes acceder a tu propia biblioteca")
     
-    return crud.get_teacher_media_files(db, teacher_id)
+    media_files = crud.get_teacher_media_files(
+        db, teacher_id, skip=skip, limit=limit, cursor=cursor,
+        file_type=file_type, mime_type=mime_type, search=search
+    )
+    set_next_cursor(response, media_files, crud.MEDIA_CURSOR, limit)
+    return media_files
 
-@app.get("/teachers/{teacher_id}/media/{file_id}")
+@router.get("/teachers/{teacher_id}/media/{file_id}")
 def download_teacher_media_file(
     teacher_id: int,
     file_id: int,
+    request: Request,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -324,17 +643,45 @@ def download_teacher_media_file(
     if not media_file:
         raise HTTPException(status_code=404, detail="Archivo no encontrado")
     
-    file_path = Path(media_file.file_path)
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Archivo no encontrado en el servidor")
-    
-    return FileResponse(
-        path=file_path,
+    return get_media_storage().download_response(
+        request.headers,
+        media_file.file_path,
         filename=media_file.original_filename,
-        media_type=media_file.mime_type
+        mime_type=media_file.mime_type,
+        content_hash=media_file.content_hash
+    )
+
+@router.get("/teachers/{teacher_id}/media/{file_id}/thumbnail")
+def get_teacher_media_thumbnail(
+    teacher_id: int,
+    file_id: int,
+    request: Request,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Miniatura JPEG generada en segundo plano (ver preview_status en el listado)"""
+    if current_user.role not in ['teacher', 'student', 'alumno']:
+        raise HTTPException(status_code=403, detail="Sin permisos para descargar archivos")
+    
+    if current_user.role == 'teacher' and current_user.id != teacher_id:
+        raise HTTPException(status_code=403, detail="Solo puedes acceder a tu propia biblioteca")
+    
+    media_file = crud.get_teacher_media_file(db, file_id, teacher_id)
+    if not media_file:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    
+    if media_file.preview_status != "ready":
+        raise HTTPException(status_code=404, detail="Vista previa no disponible")
+    
+    return get_media_storage().download_response(
+        request.headers,
+        media_file.blob.thumbnail_path,
+        filename=f"{Path(media_file.original_filename).stem}.jpg",
+        mime_type="image/jpeg",
+        content_hash=f"{media_file.content_hash}-thumb"
     )
 
-@app.delete("/teachers/{teacher_id}/media/{file_id}")
+@router.delete("/teachers/{teacher_id}/media/{file_id}")
 def delete_teacher_media_file(
     teacher_id: int,
     file_id: int,
@@ -352,17 +699,12 @@ def delete_teacher_media_file(
     if not media_file:
         raise HTTPException(status_code=404, detail="Archivo no encontrado")
     
-    # Eliminar archivo del sistema
-    file_path = Path(media_file.file_path)
-    if file_path.exists():
-        os.remove(file_path)
-    
-    # Eliminar registro de la base de datos
+    # Eliminar el registro; el archivo se borra cuando no quedan referencias a su contenido
     crud.delete_teacher_media_file(db, file_id, teacher_id)
     
     return {"detail": "Archivo eliminado exitosamente"}
 
-@app.put("/teachers/{teacher_id}/media/{file_id}/description")
+@router.put("/teachers/{teacher_id}/media/{file_id}/description")
 def update_media_file_description(
     teacher_id: int,
     file_id: int,
@@ -383,22 +725,62 @@ def update_media_file_description(
     
     return updated_file
 
-@app.get("/teachers/{teacher_id}/tutorships", response_model=list[schemas.TutorshipDetailOut])
-def get_teacher_tutorships(
-    teacher_id: int,
-    current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+def parse_date_window(start_date: Optional[str], end_date: Optional[str]):
+    """Convertir fechas YYYY-MM-DD en el intervalo [inicio, fin + 1 día); ambas son opcionales"""
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
+        end = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1) if end_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD")
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="start_date debe ser anterior o igual a end_date")
+    return start, end
+
+def require_own_tutorships(current_user, teacher_id: int):
     # Verificar que el usuario es un docente y es el mismo que el teacher_id
     if current_user.role != 'teacher':
         raise HTTPException(status_code=403, detail="Solo los docentes pueden ver sus tutorías")
     
     if current_user.id != teacher_id:
         raise HTTPException(status_code=403, detail="Solo puedes ver tus propias tutorías")
+
+@router.get("/teachers/{teacher_id}/tutorships", response_model=list[schemas.TutorshipDetailOut])
+async def get_teacher_tutorships(
+    teacher_id: int,
+    response: Response,
+    status: Optional[list[str]] = Query(None),
+    start_date: Optional[str] = None,  # Formato: YYYY-MM-DD (inclusive)
+    end_date: Optional[str] = None,    # Formato: YYYY-MM-DD (inclusive)
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Listar las tutorías del docente (más recientes primero) por estado y rango de fechas"""
+    require_own_tutorships(current_user, teacher_id)
+    start, end = parse_date_window(start_date, end_date)
     
-    return crud.get_teacher_tutorships(db, teacher_id)
+    tutorships = await crud_async.get_teacher_tutorships(
+        db, teacher_id, skip=skip, limit=limit, cursor=cursor, statuses=status, start=start, end=end
+    )
+    set_next_cursor(response, tutorships, crud.TUTORSHIP_CURSOR, limit)
+    return tutorships
 
-@app.put("/teachers/{teacher_id}/tutorships/{tutorship_id}/status", response_model=schemas.TutorshipDetailOut)
+@router.get("/teachers/{teacher_id}/tutorships/summary", response_model=schemas.TutorshipSummaryOut)
+async def get_teacher_tutorships_summary(
+    teacher_id: int,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Cantidad de tutorías por estado, para el panel del docente sin descargar el listado"""
+    require_own_tutorships(current_user, teacher_id)
+    start, end = parse_date_window(start_date, end_date)
+    return await crud_async.get_teacher_tutorships_summary(db, teacher_id, start=start, end=end)
+
+@router.put("/teachers/{teacher_id}/tutorships/{tutorship_id}/status", response_model=schemas.TutorshipDetailOut)
 def update_tutorship_status(
     teacher_id: int,
     tutorship_id: int,
@@ -422,13 +804,13 @@ def update_tutorship_status(
         raise HTTPException(status_code=403, detail="Esta tutoría no te pertenece")
     
     # Actualizar el estado
-    updated_tutorship = crud.update_tutorship_status(db, tutorship_id, status_update.status)
+    updated_tutorship = crud.update_tutorship_status(db, tutorship, status_update.status)
     if not updated_tutorship:
         raise HTTPException(status_code=400, detail="No se pudo actualizar el estado de la tutoría")
     
     return updated_tutorship
 
-@app.post("/tutorships", response_model=schemas.TutorshipDetailOut)
+@router.post("/tutorships", response_model=schemas.TutorshipDetailOut)
 def create_tutorship(
     tutorship: schemas.TutorshipCreate,
     current_user = Depends(get_current_user),
@@ -455,9 +837,65 @@ def create_tutorship(
     
     return crud.create_tutorship(db, tutorship)
 
+# Reseñas: las escribe el estudiante de una tutoría terminada y se leen en la ficha del docente
+
+@router.post("/tutorships/{tutorship_id}/review", response_model=schemas.ReviewOut, status_code=201)
+def create_tutorship_review(
+    tutorship_id: int,
+    review: schemas.ReviewCreate,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Calificar una tutoría terminada (una sola reseña por tutoría)"""
+    tutorship = crud.get_tutorship_by_id(db, tutorship_id)
+    if not tutorship:
+        raise HTTPException(status_code=404, detail="Tutoría no encontrada")
+    
+    if tutorship.student_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Solo el estudiante de la tutoría puede calificarla")
+    
+    if tutorship.status != models.TutorshipStatus.finished:
+        raise HTTPException(status_code=400, detail="Solo se pueden calificar tutorías terminadas")
+    
+    if crud.get_review_by_tutorship(db, tutorship_id):
+        raise HTTPException(status_code=409, detail="Esta tutoría ya fue calificada")
+    
+    db_review = crud.create_review(db, tutorship, review)
+    if db_review is None:
+        raise HTTPException(status_code=409, detail="Esta tutoría ya fue calificada")
+    
+    return db_review
+
+@router.get("/teachers/{teacher_id}/reviews", response_model=list[schemas.ReviewOut])
+async def get_teacher_reviews(
+    teacher_id: int,
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Reseñas de un docente, más recientes primero (paginadas por cursor)"""
+    reviews = await crud_async.get_teacher_reviews(db, teacher_id, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, reviews, ("id",), limit)
+    return reviews
+
+@router.get("/teachers/{teacher_id}/reviews/summary", response_model=schemas.TeacherReviewSummaryOut)
+async def get_teacher_reviews_summary(
+    teacher_id: int,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Calificación e histograma de estrellas del docente, leídos del perfil sin recorrer las reseñas"""
+    professor = await crud_async.get_professor(db, teacher_id)
+    if not professor:
+        raise HTTPException(status_code=404, detail="Docente no encontrado")
+    return professor
+
 # Endpoints para el sistema de agenda de docentes
 
-@app.post("/teachers/{teacher_id}/availability", response_model=schemas.TeacherAvailabilityOut)
+@router.post("/teachers/{teacher_id}/availability", response_model=schemas.TeacherAvailabilityOut)
 def create_teacher_availability(
     teacher_id: int,
     availability: schemas.TeacherAvailabilityBase,
@@ -479,7 +917,7 @@ def create_teacher_availability(
     
     return crud.create_teacher_availability(db, availability_data)
 
-@app.get("/teachers/{teacher_id}/availability", response_model=list[schemas.TeacherAvailabilityOut])
+@router.get("/teachers/{teacher_id}/availability", response_model=list[schemas.TeacherAvailabilityOut])
 def get_teacher_availability(
     teacher_id: int,
     current_user = Depends(get_current_user),
@@ -488,7 +926,7 @@ def get_teacher_availability(
     """Obtener la disponibilidad horaria de un docente"""
     return crud.get_teacher_availability(db, teacher_id)
 
-@app.put("/teachers/{teacher_id}/availability/{availability_id}", response_model=schemas.TeacherAvailabilityOut)
+@router.put("/teachers/{teacher_id}/availability/{availability_id}", response_model=schemas.TeacherAvailabilityOut)
 def update_teacher_availability(
     teacher_id: int,
     availability_id: int,
@@ -515,7 +953,7 @@ def update_teacher_availability(
     
     return updated_availability
 
-@app.delete("/teachers/{teacher_id}/availability/{availability_id}")
+@router.delete("/teachers/{teacher_id}/availability/{availability_id}")
 def delete_teacher_availability(
     teacher_id: int,
     availability_id: int,
@@ -536,7 +974,66 @@ def delete_teacher_availability(
     
     return {"message": "Disponibilidad eliminada correctamente"}
 
-@app.get("/teachers/{teacher_id}/available-slots", response_model=schemas.TeacherAvailabilityResponse)
+def parse_slots_window(start_date: str, end_date: str, duration: int):
+    """Rango [inicio, fin] de un pedido de slots, acotado en días y en duración mínima"""
+    try:
+        start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
+        end_datetime = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD")
+    if end_datetime < start_datetime:
+        raise HTTPException(status_code=400, detail="start_date debe ser anterior o igual a end_date")
+    if (end_datetime.date() - start_datetime.date()).days >= slots.SLOTS_MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"El rango puede abarcar como máximo {slots.SLOTS_MAX_RANGE_DAYS} días")
+    if not slots.SLOTS_MIN_DURATION_MINUTES <= duration <= slots.SLOTS_MAX_DURATION_MINUTES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"La duración debe estar entre {slots.SLOTS_MIN_DURATION_MINUTES} y {slots.SLOTS_MAX_DURATION_MINUTES} minutos"
+        )
+    return start_datetime, end_datetime
+
+@router.get("/teachers/available-slots", response_model=list[schemas.TeacherAvailabilityResponse])
+def get_teachers_available_slots(
+    start_date: str,  # Formato: YYYY-MM-DD
+    end_date: str,    # Formato: YYYY-MM-DD
+    duration: int = 60,  # Duración en minutos
+    teacher_ids: Optional[list[int]] = Query(None),
+    name: str = None,
+    subject: str = None,
+    level: str = None,
+    skip: int = 0,
+    limit: int = Query(50, ge=1, le=100),
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Obtener slots disponibles de varios docentes en una sola llamada"""
+    # Mismos límites que para un docente: el tamaño de la respuesta crece además con `limit`
+    start_datetime, end_datetime = parse_slots_window(start_date, end_date, duration)
+    
+    # Los IDs explícitos también respetan el límite de docentes por llamada
+    if teacher_ids and len(teacher_ids) > limit:
+        raise HTTPException(status_code=400, detail=f"Se pueden pedir como máximo {limit} docentes por llamada")
+    
+    # Por IDs explícitos o con los mismos filtros que la búsqueda de docentes
+    if teacher_ids:
+        teachers = crud.get_teachers_by_ids(db, teacher_ids)
+    else:
+        teachers = crud.search_teachers(db, skip=skip, limit=limit, name=name, subject=subject, level=level)
+    
+    slots_by_teacher = crud.get_teachers_available_slots(
+        db, [teacher.id for teacher in teachers], start_datetime, end_datetime, duration
+    )
+    
+    return [
+        schemas.TeacherAvailabilityResponse(
+            teacher_id=teacher.id,
+            teacher_name=teacher.name,
+            available_slots=[schemas.AvailableSlot(**slot) for slot in slots_by_teacher[teacher.id]]
+        )
+        for teacher in teachers
+    ]
+
+@router.get("/teachers/{teacher_id}/available-slots", response_model=schemas.TeacherAvailabilityResponse)
 def get_teacher_available_slots(
     teacher_id: int,
     start_date: str,  # Formato: YYYY-MM-DD
@@ -545,11 +1042,7 @@ def get_teacher_available_slots(
     db: Session = Depends(get_db)
 ):
     """Obtener slots disponibles de un docente en un rango de fechas"""
-    try:
-        start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
-        end_datetime = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Formato de fecha inválido. Use YYYY-MM-DD")
+    start_datetime, end_datetime = parse_slots_window(start_date, end_date, duration)
     
     # Obtener información del docente
     teacher = crud.get_user(db, teacher_id)
@@ -565,7 +1058,7 @@ def get_teacher_available_slots(
         available_slots=[schemas.AvailableSlot(**slot) for slot in available_slots]
     )
 
-@app.post("/teachers/{teacher_id}/schedule", response_model=schemas.TeacherScheduleOut)
+@router.post("/teachers/{teacher_id}/schedule", response_model=schemas.TeacherScheduleOut)
 def create_teacher_schedule(
     teacher_id: int,
     schedule: schemas.TeacherScheduleBase,
@@ -587,7 +1080,7 @@ def create_teacher_schedule(
     
     return crud.create_teacher_schedule(db, schedule_data)
 
-@app.get("/teachers/{teacher_id}/schedule", response_model=list[schemas.TeacherScheduleOut])
+@router.get("/teachers/{teacher_id}/schedule", response_model=list[schemas.TeacherScheduleOut])
 def get_teacher_schedule(
     teacher_id: int,
     start_date: str,  # Formato: YYYY-MM-DD
@@ -604,7 +1097,7 @@ def get_teacher_schedule(
     
     return crud.get_teacher_schedule(db, teacher_id, start_datetime, end_datetime)
 
-@app.put("/teachers/{teacher_id}/schedule/{schedule_id}", response_model=schemas.TeacherScheduleOut)
+@router.put("/teachers/{teacher_id}/schedule/{schedule_id}", response_model=schemas.TeacherScheduleOut)
 def update_teacher_schedule(
     teacher_id: int,
     schedule_id: int,
@@ -635,7 +1128,7 @@ def update_teacher_schedule(
     
     return crud.update_teacher_schedule(db, schedule_id, schedule_data)
 
-@app.delete("/teachers/{teacher_id}/schedule/{schedule_id}")
+@router.delete("/teachers/{teacher_id}/schedule/{schedule_id}")
 def delete_teacher_schedule(
     teacher_id: int,
     schedule_id: int,
@@ -665,7 +1158,7 @@ def delete_teacher_schedule(
     return {"message": "Evento eliminado exitosamente"}
 
 # Endpoints para materias del docente
-@app.get("/teachers/{teacher_id}/subjects", response_model=list[schemas.TeacherSubjectOut])
+@router.get("/teachers/{teacher_id}/subjects", response_model=list[schemas.TeacherSubjectOut])
 def get_teacher_subjects(
     teacher_id: int,
     current_user = Depends(get_current_user),
@@ -685,7 +1178,7 @@ def get_teacher_subjects(
     
     return crud.get_teacher_subjects(db, teacher_id)
 
-@app.post("/teachers/{teacher_id}/subjects", response_model=schemas.TeacherSubjectOut)
+@router.post("/teachers/{teacher_id}/subjects", response_model=schemas.TeacherSubjectOut)
 def add_subject_to_teacher(
     teacher_id: int,
     subject_data: schemas.TeacherSubjectCreate,
@@ -716,7 +1209,7 @@ def add_subject_to_teacher(
     
     return teacher_subject
 
-@app.delete("/teachers/{teacher_id}/subjects/{subject_id}")
+@router.delete("/teachers/{teacher_id}/subjects/{subject_id}")
 def remove_subject_from_teacher(
     teacher_id: int,
     subject_id: int,
@@ -737,7 +1230,59 @@ def remove_subject_from_teacher(
     
     return {"message": "Materia eliminada exitosamente"}
 
-@app.get("/subjects/levels")
+@router.get("/subjects/levels")
 def get_subject_levels(current_user = Depends(get_current_user), db: Session = Depends(get_db)):
     """Obtener lista de niveles disponibles"""
-    return crud.get_subject_levels(db)
\ No newline at end of file
+    return crud.get_subject_levels(db)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Arranque y apagado de cada worker.
+
+    El arranque no toca la base de datos: el esquema y los arreglos de datos se
+    aplican una sola vez con `python -m app.manage setup` antes de levantar los
+    workers, y las conexiones del pool se abren con el primer request.
+    """
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    # Una configuración de almacenamiento inválida debe fallar al arrancar, no en la primera subida
+    get_media_storage()
+    logging.info("Worker %s listo", os.getpid())
+    yield
+    await async_engine.dispose()
+    engine.dispose()
+
+def create_app() -> FastAPI:
+    """Construir la aplicación (rutas, admin y middlewares) sin efectos secundarios"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(router)
+    setup_admin(app)
+
+    # Cabecera X-SQL-Query-Count para detectar N+1 (SQL_QUERY_COUNT_HEADER=true)
+    if SQL_QUERY_COUNT_HEADER:
+        app.add_middleware(QueryCountMiddleware)
+
+    # Límite de tamaño de las subidas (antes de parsear el multipart)
+    app.add_middleware(UploadSizeLimitMiddleware)
+    app.add_middleware(
+        UploadSizeLimitMiddleware,
+        max_bytes=MEDIA_MAX_UPLOAD_BYTES * MEDIA_MAX_BATCH_FILES,
+        paths=(r"^/teachers/\d+/media/batch$",)
+    )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:5173"],
+        allow_credentials=True,
+        allow_methods=["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE"],
+        allow_headers=["Content-Type", "Set-Cookie", "Authorization", OFFSET_HEADER],
+        expose_headers=["Set-Cookie", NEXT_CURSOR_HEADER, OFFSET_HEADER, LENGTH_HEADER, "Location", QUERY_COUNT_HEADER]
+    )
+    return app
+
+# `uvicorn app.main:app` (o `uvicorn --factory app.main:create_app`)
+app = create_app()
@@ -0,0 +1,101 @@
+"""
+Tareas de mantenimiento lanzadas desde el panel de administración.
+
+El request que dispara la tarea solo crea la fila en `maintenance_jobs` y
+responde 202; el trabajo corre después como tarea en segundo plano del mismo
+worker y va guardando el progreso (processed/total/changed) en esa fila, así
+que `GET /admin/jobs/{id}` lo informa aunque lo atienda otro worker. Solo
+puede haber una tarea activa por tipo (lo garantiza el índice único parcial
+ix_maintenance_jobs_active_kind). Las tareas son idempotentes: si el worker se
+reinicia a mitad de camino, basta con lanzarla de nuevo.
+"""
+from datetime import datetime, timedelta
+import logging
+import os
+import uuid
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+from .crud import count_teachers, create_missing_professor_profiles
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+PROFESSOR_PROFILES_JOB = "professor_profiles"
+# Una tarea que no informa progreso en este tiempo se considera abandonada
+MAINTENANCE_JOB_TIMEOUT_SECONDS = int(os.getenv("MAINTENANCE_JOB_TIMEOUT_SECONDS", "900"))
+
+def get_job(db: Session, job_id: str):
+    return db.get(models.MaintenanceJob, job_id)
+
+def _active_job(db: Session, kind: str):
+    return db.query(models.MaintenanceJob).filter(
+        models.MaintenanceJob.kind == kind,
+        models.MaintenanceJob.status.in_(models.MAINTENANCE_JOB_ACTIVE_STATUSES)
+    ).first()
+
+def start_job(db: Session, kind: str, user_id: int):
+    """Crear la tarea, o devolver la que ya está en curso; el bool indica si es nueva"""
+    now = datetime.now()
+    active = _active_job(db, kind)
+    if active and active.updated_at >= now - timedelta(seconds=MAINTENANCE_JOB_TIMEOUT_SECONDS):
+        return active, False
+    if active:
+        # Abandonada: se cierra para liberar el lugar de la tarea activa
+        active.status = "failed"
+        active.last_error = f"Sin progreso en {MAINTENANCE_JOB_TIMEOUT_SECONDS} segundos"
+        active.finished_at = now
+        active.updated_at = now
+    job = models.MaintenanceJob(
+        id=str(uuid.uuid4()),
+        kind=kind,
+        status="pending",
+        processed=0,
+        changed=0,
+        created_by=user_id,
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Otro request creó la tarea entre la consulta y el INSERT
+        db.rollback()
+        active = _active_job(db, kind)
+        if active is None:
+            raise
+        return active, False
+    db.refresh(job)
+    return job, True
+
+def _update(job_id: str, **values):
+    # Sesión propia: el progreso queda visible aunque la tarea falle después
+    db = SessionLocal()
+    try:
+        db.query(models.MaintenanceJob).filter(models.MaintenanceJob.id == job_id).update(
+            {**values, "updated_at": datetime.now()}
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def run_professor_profiles_job(job_id: str):
+    """Crear los perfiles de profesor faltantes informando el avance por lote"""
+    db = SessionLocal()
+    try:
+        _update(job_id, status="running", total=count_teachers(db))
+        created = create_missing_professor_profiles(
+            db, on_progress=lambda processed, changed: _update(job_id, processed=processed, changed=changed)
+        )
+    except Exception as e:
+        logger.exception("Falló la tarea de mantenimiento %s", job_id)
+        db.rollback()
+        _update(job_id, status="failed", last_error=str(e), finished_at=datetime.now())
+        return
+    finally:
+        db.close()
+    _update(job_id, status="finished", finished_at=datetime.now())
+    logger.info("Tarea %s terminada: %s perfiles de profesor creados", job_id, created)
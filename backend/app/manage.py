@@ -0,0 +1,140 @@
+"""
+Tareas de mantenimiento que antes corrían al importar `app.main`.
+
+Se ejecutan una sola vez por despliegue (en docker-compose, el servicio
+`setup` antes de levantar `backend` y `media-worker`), no en cada worker:
+así el arranque de la API no necesita la base de datos y los reinicios
+escalonados no repiten un escaneo de tablas por proceso.
+
+Uso:
+    python -m app.manage setup                   # migrate + fix-professor-profiles (base vacía: create-schema + stamp)
+    python -m app.manage create-schema           # crear las tablas que falten
+    python -m app.manage migrate                 # alembic upgrade head
+    python -m app.manage stamp                   # alembic stamp head (marcar el esquema como migrado)
+    python -m app.manage fix-professor-profiles  # perfiles de profesor faltantes
+    python -m app.manage recompute-ratings       # recalcular el ranking desde las reseñas
+
+Si existe un archivo `.env` se carga antes de leer la configuración.
+"""
+from pathlib import Path
+import argparse
+import logging
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Última migración anterior a `setup`: hasta entonces la API corría create_all
+# al arrancar, así que las bases existentes tienen este esquema pero no la
+# tabla alembic_version
+BASELINE_REVISION = "2e1dcffebdd5"
+
+def create_schema():
+    """Crear las tablas e índices del modelo que todavía no existen"""
+    from . import models
+    from .database import engine
+    models.Base.metadata.create_all(bind=engine)
+    logger.info("Esquema verificado")
+
+def _alembic_config():
+    from alembic.config import Config
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    return config
+
+def _run_alembic(operation, revision: str):
+    # Con la conexión del motor de la app (alembic/env.py la toma de attributes)
+    from .database import engine
+    config = _alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        operation(config, revision)
+
+def migrate():
+    """Aplicar las migraciones de Alembic pendientes"""
+    from alembic import command
+    _run_alembic(command.upgrade, "head")
+
+def stamp(revision: str = "head"):
+    """Marcar la base como migrada hasta `revision` sin ejecutar las migraciones"""
+    from alembic import command
+    _run_alembic(command.stamp, revision)
+
+def database_is_empty() -> bool:
+    from sqlalchemy import inspect
+    from .database import engine
+    return not inspect(engine).get_table_names()
+
+def current_revision():
+    """Revisión registrada en alembic_version, o None si la base no la tiene"""
+    from alembic.runtime.migration import MigrationContext
+    from .database import engine
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+def fix_professor_profiles():
+    """Crear perfiles de profesor para usuarios teacher que no los tienen"""
+    from .crud import create_missing_professor_profiles
+    from .database import SessionLocal
+    db = SessionLocal()
+    try:
+        created_count = create_missing_professor_profiles(db)
+    finally:
+        db.close()
+    if created_count > 0:
+        logger.info("Se crearon %s perfiles de profesor faltantes", created_count)
+    else:
+        logger.info("Todos los profesores ya tienen sus perfiles")
+
+def recompute_ratings():
+    """Recalcular el agregado de calificaciones (tras cambios masivos o del prior)"""
+    from .crud import recompute_professor_ratings
+    from .database import SessionLocal
+    db = SessionLocal()
+    try:
+        updated = recompute_professor_ratings(db)
+    finally:
+        db.close()
+    logger.info("Calificación recalculada para %s profesores", updated)
+
+def setup():
+    """Dejar el esquema en head y completar los perfiles de profesor.
+
+    Una base con tablas recibe las migraciones pendientes (con sus backfills y
+    cambios de columnas, que create_all no aplica); si no tiene alembic_version
+    la creó create_all en una versión anterior y se marca primero en
+    BASELINE_REVISION. Solo una base vacía se crea desde el modelo y se marca
+    como migrada, para que el próximo despliegue aplique únicamente las
+    migraciones nuevas.
+    """
+    if database_is_empty():
+        create_schema()
+        stamp()
+    else:
+        if current_revision() is None:
+            logger.info("Base sin alembic_version: se marca en %s", BASELINE_REVISION)
+            stamp(BASELINE_REVISION)
+        migrate()
+    fix_professor_profiles()
+
+COMMANDS = {
+    "setup": setup,
+    "create-schema": create_schema,
+    "migrate": migrate,
+    "stamp": stamp,
+    "fix-professor-profiles": fix_professor_profiles,
+    "recompute-ratings": recompute_ratings,
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=COMMANDS)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    load_dotenv()
+    COMMANDS[args.command]()
+
+if __name__ == "__main__":
+    main()
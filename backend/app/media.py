@@ -0,0 +1,221 @@
+"""
+Escritura de archivos subidos a la biblioteca de medios.
+
+El contenido se copia por bloques: la lectura del UploadFile es asíncrona y la
+escritura a disco corre en el threadpool, así que el event loop nunca queda
+bloqueado por I/O de archivos. Mientras se copia se calcula el SHA-256 y se
+cuentan los bytes, abortando apenas se supera el límite configurado.
+
+El almacenamiento es direccionado por contenido: cada subida se recibe en un
+área temporal y luego se guarda (una sola vez) bajo su hash en el backend de
+`storage`; ver `crud.create_teacher_media_file`.
+
+Las descargas se sirven con validadores (ETag fuerte derivado del hash,
+Last-Modified), respuestas 304 condicionales, rangos de bytes (206) y una
+política de Cache-Control según el tipo de contenido.
+"""
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+import hashlib
+import os
+import re
+import uuid
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, FileResponse, Response
+
+# Límite por archivo (10 MB por defecto, ver MEDIA_LIBRARY_README.md)
+MEDIA_MAX_UPLOAD_BYTES = int(os.getenv("MEDIA_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Cantidad máxima de archivos por subida múltiple, exportación o borrado en lote
+MEDIA_MAX_BATCH_FILES = int(os.getenv("MEDIA_MAX_BATCH_FILES", "50"))
+# Margen para los campos del formulario y los delimitadores multipart
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+class UploadTooLargeError(Exception):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"El archivo supera el tamaño máximo de {max_bytes / (1024 * 1024):.1f} MB")
+        self.max_bytes = max_bytes
+
+def write_chunk(handle, hasher, chunk: bytes):
+    hasher.update(chunk)
+    handle.write(chunk)
+
+def _discard(handle, path: Path):
+    handle.close()
+    if path.exists():
+        os.remove(path)
+
+async def save_upload(upload: UploadFile, destination: Path, max_bytes: int = MEDIA_MAX_UPLOAD_BYTES):
+    """Guardar el archivo en `destination` y devolver (tamaño en bytes, sha256 hex)"""
+    partial_path = destination.with_name(destination.name + ".part")
+    hasher = hashlib.sha256()
+    size = 0
+
+    handle = await run_in_threadpool(open, partial_path, "wb")
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(max_bytes)
+            await run_in_threadpool(write_chunk, handle, hasher, chunk)
+        await run_in_threadpool(handle.close)
+        # Renombrado atómico: nunca queda un archivo final a medio escribir
+        await run_in_threadpool(os.replace, partial_path, destination)
+    except BaseException:
+        await run_in_threadpool(_discard, handle, partial_path)
+        raise
+
+    return size, hasher.hexdigest()
+
+def blob_key(sha256: str) -> str:
+    """Clave del contenido direccionado por hash en el backend de almacenamiento"""
+    return f"blobs/{sha256[:2]}/{sha256}"
+
+def thumbnail_key(sha256: str) -> str:
+    """Miniatura guardada junto al contenido original"""
+    return f"{blob_key(sha256)}.thumb.jpg"
+
+def staging_path(root: Path) -> Path:
+    """Ruta temporal única para recibir una subida antes de conocer su hash"""
+    staging_dir = root / "staging"
+    staging_dir.mkdir(parents=True, exist_ok=True)
+    return staging_dir / f"{uuid.uuid4()}.upload"
+
+# Las descargas requieren login, así que la caché es siempre privada. El contenido
+# de un archivo no cambia nunca (se sube uno nuevo), por eso los medios pesados
+# se marcan immutable; los documentos se revalidan, lo que cuesta solo un 304.
+MEDIA_CACHE_CONTROL = (
+    ("video/", "private, max-age=604800, immutable"),
+    ("audio/", "private, max-age=604800, immutable"),
+    ("image/", "private, max-age=86400"),
+)
+DEFAULT_MEDIA_CACHE_CONTROL = "private, no-cache"
+
+def cache_control_for(mime_type: str) -> str:
+    for prefix, policy in MEDIA_CACHE_CONTROL:
+        if (mime_type or "").startswith(prefix):
+            return policy
+    return DEFAULT_MEDIA_CACHE_CONTROL
+
+def media_etag(content_hash: str, stat_result: os.stat_result = None) -> str:
+    """ETag fuerte a partir del hash del contenido; débil para archivos sin hash"""
+    if content_hash:
+        return f'"{content_hash}"'
+    etag_base = f"{stat_result.st_mtime}-{stat_result.st_size}"
+    return f'W/"{hashlib.md5(etag_base.encode(), usedforsecurity=False).hexdigest()}"'
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match usa comparación débil (RFC 9110 §13.1.2)
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+def _not_modified_since(if_modified_since: str, mtime: float) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return since is not None and int(mtime) <= since.timestamp()
+
+def is_not_modified(request_headers, etag: str, mtime: float = None) -> bool:
+    """Evaluar If-None-Match / If-Modified-Since contra los validadores del archivo"""
+    # If-None-Match tiene prioridad: If-Modified-Since se ignora si viene un ETag
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request_headers.get("if-modified-since")
+    return mtime is not None and if_modified_since is not None and _not_modified_since(if_modified_since, mtime)
+
+def media_file_response(request_headers, path: Path, filename: str, mime_type: str, content_hash: str = None):
+    """Respuesta de descarga con soporte de 304, Range (206) y Cache-Control"""
+    stat_result = path.stat()
+    headers = {
+        "etag": media_etag(content_hash, stat_result),
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "cache-control": cache_control_for(mime_type),
+    }
+    if is_not_modified(request_headers, headers["etag"], stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse resuelve Range/If-Range contra estos mismos validadores
+    return FileResponse(
+        path=path,
+        filename=filename,
+        media_type=mime_type,
+        headers=headers,
+        stat_result=stat_result,
+    )
+
+class UploadSizeLimitMiddleware:
+    """Cortar las subidas que superan el límite antes de que se termine de recibir el cuerpo
+
+    FastAPI parsea el multipart completo antes de llamar al handler, así que el
+    límite también se aplica aquí: por Content-Length si viene, o contando los
+    bytes recibidos en subidas chunked.
+    """
+
+    def __init__(self, app, max_bytes: int = MEDIA_MAX_UPLOAD_BYTES, paths=(r"^/teachers/\d+/media$",)):
+        self.app = app
+        self.max_body_bytes = max_bytes + MULTIPART_OVERHEAD_BYTES
+        self.max_bytes = max_bytes
+        self.paths = [re.compile(pattern) for pattern in paths]
+
+    def _applies(self, scope) -> bool:
+        return (
+            scope["type"] == "http"
+            and scope["method"] in ("POST", "PUT", "PATCH")
+            and any(pattern.match(scope["path"]) for pattern in self.paths)
+        )
+
+    def _too_large_response(self):
+        return JSONResponse(status_code=413, content={"detail": str(UploadTooLargeError(self.max_bytes))})
+
+    async def __call__(self, scope, receive, send):
+        if not self._applies(scope):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            await self._too_large_response()(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    exceeded = True
+                    raise UploadTooLargeError(self.max_bytes)
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                if exceeded:
+                    # FastAPI convierte el error de lectura del cuerpo en un 400 genérico
+                    response_started = True
+                    await self._too_large_response()(scope, receive, send)
+                    return
+                response_started = True
+            elif exceeded:
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLargeError:
+            if response_started:
+                raise
+            await self._too_large_response()(scope, receive, send)
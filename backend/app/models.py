@@ -1,9 +1,20 @@
 # MODELS.PY COMPLETO
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, Enum, DateTime, Text, Boolean, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, Float, Enum, DateTime, Text, Boolean, Boolean, Index, DDL, event
+from sqlalchemy import update, inspect, func, literal_column
+from sqlalchemy.orm import relationship, column_property, Session
+from sqlalchemy.orm.util import identity_key
 from .database import Base
+from .ratings import RATING_PRIOR_MEAN, RATING_STARS, bayesian_average
+from collections import Counter
 import enum
 
+# Los índices trigram (búsqueda ILIKE '%texto%') necesitan la extensión pg_trgm
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
 class UserRole(str, enum.Enum):
     student = "student"
     teacher = "teacher"
@@ -21,6 +32,12 @@ class User(Base):
 
     professor_profile = relationship("Professor", uselist=False, back_populates="user")
     student_tutorships = relationship("Tutorship", back_populates="student", foreign_keys='Tutorship.student_id')
+
+    __table_args__ = (
+        Index("ix_users_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        # Listado de docentes paginado por cursor: WHERE role = ... ORDER BY coalesce(name, ''), id
+        Index("ix_users_role_name_id", role, func.coalesce(name, literal_column("''")), id),
+    )
     
     def __str__(self):
         return f"{self.name} ({self.email})"
@@ -31,11 +48,33 @@ class Professor(Base):
     id = Column(Integer, ForeignKey("users.id"), primary_key=True)
     abstract = Column(Text)
     picture = Column(String)
-    ranking = Column(Float, default=0.0)
+    # Promedio bayesiano de las reseñas; lo mantiene el flush de Review (ver ratings.py)
+    ranking = Column(Float, default=RATING_PRIOR_MEAN, nullable=False)
+    rating_count = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_sum = Column(Integer, default=0, server_default="0", nullable=False)
+    # Histograma de la ficha del docente: cantidad de reseñas de 1 a 5 estrellas
+    stars_1 = Column(Integer, default=0, server_default="0", nullable=False)
+    stars_2 = Column(Integer, default=0, server_default="0", nullable=False)
+    stars_3 = Column(Integer, default=0, server_default="0", nullable=False)
+    stars_4 = Column(Integer, default=0, server_default="0", nullable=False)
+    stars_5 = Column(Integer, default=0, server_default="0", nullable=False)
 
     user = relationship("User", back_populates="professor_profile")
     subjects = relationship("ProfessorSubject", back_populates="professor")
     tutorships = relationship("Tutorship", back_populates="professor")
+
+    __table_args__ = (
+        # Búsqueda de docentes ordenada por calificación: ORDER BY ranking DESC, id DESC
+        Index("ix_professors_ranking_id", ranking.desc(), id.desc()),
+    )
+
+    @property
+    def rating_average(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+    @property
+    def rating_histogram(self):
+        return {stars: getattr(self, f"stars_{stars}") for stars in RATING_STARS}
     
     def __str__(self):
         try:
@@ -54,9 +93,15 @@ class Subject(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String, unique=True)
     description = Column(Text)
-    level = Column(Enum(SubjectLevel), nullable=False)
+    level = Column(Enum(SubjectLevel), nullable=False, index=True)
     credits = Column(Integer, default=3)
     department = Column(String, default="Sin asignar")
+
+    __table_args__ = (
+        Index("ix_subjects_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        # Listado de materias paginado por cursor: ORDER BY coalesce(name, ''), id
+        Index("ix_subjects_name_id", func.coalesce(name, literal_column("''")), id),
+    )
     
     def __str__(self):
         return f"{self.name} ({self.level})"
@@ -65,8 +110,8 @@ class ProfessorSubject(Base):
     __tablename__ = "professor_subjects"
 
     id = Column(Integer, primary_key=True)
-    professor_id = Column(Integer, ForeignKey("professors.id"))
-    subject_id = Column(Integer, ForeignKey("subjects.id"))
+    professor_id = Column(Integer, ForeignKey("professors.id"), index=True)
+    subject_id = Column(Integer, ForeignKey("subjects.id"), index=True)
 
     professor = relationship("Professor", back_populates="subjects")
     subject = relationship("Subject")
@@ -97,9 +142,9 @@ class Tutorship(Base):
     professor_id = Column(Integer, ForeignKey("professors.id"))
     student_id = Column(Integer, ForeignKey("users.id"))
     subject_id = Column(Integer, ForeignKey("subjects.id"))
-    status = Column(Enum(TutorshipStatus), default=TutorshipStatus.pending)
-    start_time = Column(DateTime)
-    end_time = Column(DateTime)
+    status = Column(Enum(TutorshipStatus), default=TutorshipStatus.pending, index=True)
+    start_time = Column(DateTime, index=True)
+    end_time = Column(DateTime, index=True)
     price_usdt = Column(Float)
     platform_fee_pct = Column(Float, default=5.0)
 
@@ -125,15 +170,24 @@ class Tutorship(Base):
             
         return f"Tutoría #{self.id}: {student_name} - {professor_name} ({subject_name})"
 
+# Tutorías de un docente: WHERE professor_id = ... [AND start_time en ventana]
+# ORDER BY coalesce(start_time, '1970-01-01 ...') DESC, id DESC (ver crud.TUTORSHIP_ORDER)
+Index(
+    "ix_tutorships_professor_start",
+    Tutorship.professor_id,
+    func.coalesce(Tutorship.start_time, literal_column("'1970-01-01 00:00:00.000000'")).desc(),
+    Tutorship.id.desc(),
+)
+
 class Payment(Base):
     __tablename__ = "payments"
 
     id = Column(Integer, primary_key=True)
-    tutorship_id = Column(Integer, ForeignKey("tutorships.id"))
+    tutorship_id = Column(Integer, ForeignKey("tutorships.id"), index=True)
     transaction_hash = Column(String)
     amount_usdt = Column(Float)
-    timestamp = Column(DateTime)
-    status = Column(String)
+    timestamp = Column(DateTime, index=True)
+    status = Column(String, index=True)
     
     def __str__(self):
         return f"Payment #{self.id} - ${self.amount_usdt} USDT ({self.status})"
@@ -143,18 +197,72 @@ class Review(Base):
 
     id = Column(Integer, primary_key=True)
     student_id = Column(Integer, ForeignKey("users.id"))
-    professor_id = Column(Integer, ForeignKey("professors.id"))
-    tutorship_id = Column(Integer, ForeignKey("tutorships.id"))
-    rating = Column(Integer)
+    # active_history: al modificar una reseña se conoce el valor anterior para
+    # descontarlo del agregado del profesor sin volver a leer sus reseñas
+    professor_id = column_property(Column(Integer, ForeignKey("professors.id")), active_history=True)
+    # Una reseña por tutoría
+    tutorship_id = Column(Integer, ForeignKey("tutorships.id"), unique=True, index=True)
+    rating = column_property(Column(Integer, index=True), active_history=True)
     comment = Column(Text)
+    # La fija create_review; las reseñas anteriores a la revisión b61f3d0a8e27 no tienen fecha
+    created_at = Column(DateTime)
+
+    __table_args__ = (
+        # Reseñas de un docente paginadas por cursor: WHERE professor_id = ... ORDER BY id DESC
+        Index("ix_reviews_professor_id_id", "professor_id", id.desc()),
+    )
     
     def __str__(self):
         student_name = f"Student #{self.student_id}"
         professor_name = f"Professor #{self.professor_id}"
         return f"Review #{self.id}: {student_name} → {professor_name} ({self.rating}★)"
 
+class MediaBlob(Base):
+    """Contenido de un archivo de medios, almacenado una sola vez por hash SHA-256"""
+    __tablename__ = "media_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger)
+    storage_path = Column(String, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)  # Cantidad de TeacherMediaFile que lo usan
+    created_at = Column(DateTime)
+    # Vista previa generada por el worker (ver app/worker.py)
+    thumbnail_path = Column(String, nullable=True)
+    preview_status = Column(String(16), nullable=True)  # pending, ready, failed; NULL si no aplica
+
+    def __str__(self):
+        return f"Blob {self.sha256[:12]} ({self.ref_count} refs)"
+
+class MediaJob(Base):
+    """Cola de trabajos en segundo plano sobre los blobs (miniaturas y vistas previas)"""
+    __tablename__ = "media_jobs"
+    __table_args__ = (
+        Index("ix_media_jobs_status_run_after", "status", "run_after"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), ForeignKey("media_blobs.sha256", ondelete="CASCADE"), nullable=False, index=True)
+    kind = Column(String(32), nullable=False)
+    mime_type = Column(String)
+    status = Column(String(16), nullable=False, default="pending")  # pending, running, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    run_after = Column(DateTime)
+    last_error = Column(Text)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+    def __str__(self):
+        return f"Job #{self.id} {self.kind} {self.content_hash[:12]} ({self.status})"
+
 class TeacherMediaFile(Base):
     __tablename__ = "teacher_media_files"
+    __table_args__ = (
+        # Búsqueda ILIKE '%texto%' en el listado de la biblioteca
+        Index("ix_teacher_media_files_original_filename_trgm", "original_filename",
+              postgresql_using="gin", postgresql_ops={"original_filename": "gin_trgm_ops"}),
+        Index("ix_teacher_media_files_description_trgm", "description",
+              postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"}),
+    )
 
     id = Column(Integer, primary_key=True)
     teacher_id = Column(Integer, ForeignKey("users.id"))
@@ -162,24 +270,55 @@ class TeacherMediaFile(Base):
     original_filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
     file_size = Column(Integer)
-    mime_type = Column(String)
-    uploaded_at = Column(DateTime)
+    mime_type = Column(String, index=True)
+    uploaded_at = Column(DateTime, index=True)
     description = Column(Text)
+    content_hash = Column(String(64), ForeignKey("media_blobs.sha256"), nullable=True, index=True)
 
     teacher = relationship("User")
+    blob = relationship("MediaBlob", lazy="joined")
+
+    @property
+    def preview_status(self):
+        return self.blob.preview_status if self.blob else None
     
     def __str__(self):
         return f"Media: {self.original_filename}"
 
+# Listado paginado de la biblioteca: WHERE teacher_id = ...
+# ORDER BY coalesce(uploaded_at, '1970-01-01 ...') DESC, id DESC (ver crud.MEDIA_ORDER)
+Index(
+    "ix_teacher_media_files_teacher_uploaded",
+    TeacherMediaFile.teacher_id,
+    func.coalesce(TeacherMediaFile.uploaded_at, literal_column("'1970-01-01 00:00:00.000000'")).desc(),
+    TeacherMediaFile.id.desc(),
+)
+
+class MediaUploadSession(Base):
+    """Subida reanudable en curso; los bytes recibidos están en MEDIA_ROOT/staging/<id>.resumable"""
+    __tablename__ = "media_upload_sessions"
+
+    id = Column(String(36), primary_key=True)
+    teacher_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    original_filename = Column(String, nullable=False)
+    mime_type = Column(String)
+    description = Column(Text)
+    upload_length = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime)
+    expires_at = Column(DateTime, index=True)
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.original_filename})"
+
 class Resource(Base):
     __tablename__ = "resources"
 
     id = Column(Integer, primary_key=True)
-    tutorship_id = Column(Integer, ForeignKey("tutorships.id"))
+    tutorship_id = Column(Integer, ForeignKey("tutorships.id"), index=True)
     media_file_id = Column(Integer, ForeignKey("teacher_media_files.id"), nullable=True)
     title = Column(String)
     file_url = Column(String)
-    uploaded_at = Column(DateTime)
+    uploaded_at = Column(DateTime, index=True)
 
     media_file = relationship("TeacherMediaFile")
     
@@ -190,8 +329,8 @@ class LiveSession(Base):
     __tablename__ = "live_sessions"
 
     id = Column(Integer, primary_key=True)
-    tutorship_id = Column(Integer, ForeignKey("tutorships.id"))
-    start_time = Column(DateTime)
+    tutorship_id = Column(Integer, ForeignKey("tutorships.id"), index=True)
+    start_time = Column(DateTime, index=True)
     end_time = Column(DateTime)
     session_url = Column(String)
     whiteboard_url = Column(String)
@@ -222,4 +361,94 @@ class TeacherSchedule(Base):
     end_datetime = Column(DateTime)
     is_blocked = Column(Boolean, default=False)  # True para eventos que bloquean tiempo
 
-    teacher = relationship("User")
\ No newline at end of file
+    teacher = relationship("User")
+
+class MaintenanceJob(Base):
+    """Tarea de mantenimiento lanzada por un admin; el progreso se consulta desde cualquier worker"""
+    __tablename__ = "maintenance_jobs"
+    __table_args__ = (
+        Index("ix_maintenance_jobs_kind_status", "kind", "status"),
+    )
+
+    id = Column(String(36), primary_key=True)
+    kind = Column(String(32), nullable=False)
+    status = Column(String(16), nullable=False, default="pending")  # pending, running, finished, failed
+    total = Column(Integer)
+    processed = Column(Integer, nullable=False, default=0)
+    changed = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    def __str__(self):
+        return f"Job {self.kind} {self.id[:8]} ({self.status})"
+
+MAINTENANCE_JOB_ACTIVE_STATUSES = ("pending", "running")
+
+# Una sola tarea activa por tipo, aunque dos requests la lancen a la vez (ver maintenance.start_job)
+Index(
+    "ix_maintenance_jobs_active_kind",
+    MaintenanceJob.kind,
+    unique=True,
+    postgresql_where=MaintenanceJob.status.in_(MAINTENANCE_JOB_ACTIVE_STATUSES),
+    sqlite_where=MaintenanceJob.status.in_(MAINTENANCE_JOB_ACTIVE_STATUSES),
+)
+
+# Agregado de calificaciones: cada flush calcula la variación por profesor de
+# las reseñas nuevas, modificadas y borradas, y la aplica con un UPDATE atómico
+# (rating_count = rating_count + n) en la misma transacción que las reseñas.
+# Los UPDATE/DELETE masivos sobre reviews no pasan por acá: después de uno,
+# correr `python -m app.manage recompute-ratings`.
+_RATING_DELTAS_KEY = "review_rating_deltas"
+
+def _review_rating_deltas(session):
+    deltas = {}
+
+    def add(professor_id, rating, sign):
+        if professor_id is None or rating is None:
+            return
+        delta = deltas.setdefault(professor_id, Counter())
+        delta["rating_count"] += sign
+        delta["rating_sum"] += sign * rating
+        if rating in RATING_STARS:
+            delta[f"stars_{rating}"] += sign
+
+    for obj in session.new:
+        if isinstance(obj, Review):
+            add(obj.professor_id, obj.rating, 1)
+    for obj in session.deleted:
+        if isinstance(obj, Review):
+            add(obj.professor_id, obj.rating, -1)
+    for obj in session.dirty:
+        if isinstance(obj, Review) and session.is_modified(obj):
+            state = inspect(obj)
+            professor_history = state.attrs.professor_id.history
+            rating_history = state.attrs.rating.history
+            if professor_history.has_changes() or rating_history.has_changes():
+                add((professor_history.non_added() or [None])[0], (rating_history.non_added() or [None])[0], -1)
+                add(obj.professor_id, obj.rating, 1)
+    deltas = {professor_id: {column: n for column, n in delta.items() if n} for professor_id, delta in deltas.items()}
+    return {professor_id: delta for professor_id, delta in deltas.items() if delta}
+
+@event.listens_for(Session, "before_flush")
+def _collect_review_ratings(session, flush_context, instances):
+    # Se calcula antes del flush: después, las reseñas borradas ya no se pueden leer
+    session.info[_RATING_DELTAS_KEY] = _review_rating_deltas(session)
+
+@event.listens_for(Session, "after_flush")
+def _apply_review_ratings(session, flush_context):
+    deltas = session.info.pop(_RATING_DELTAS_KEY, None)
+    if not deltas:
+        return
+    professors = Professor.__table__
+    for professor_id, delta in deltas.items():
+        values = {column: professors.c[column] + n for column, n in delta.items()}
+        values["ranking"] = bayesian_average(
+            professors.c.rating_count + delta.get("rating_count", 0), professors.c.rating_sum + delta.get("rating_sum", 0)
+        )
+        session.execute(update(professors).where(professors.c.id == professor_id).values(values))
+        professor = session.identity_map.get(identity_key(Professor, professor_id))
+        if professor is not None:
+            session.expire(professor, list(values))
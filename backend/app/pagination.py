@@ -0,0 +1,100 @@
+"""
+Paginación por cursor (keyset) para los listados.
+
+El cursor es opaco para el cliente: codifica en base64 los valores de la
+clave de orden `(sort_key, id)` de la última fila devuelta. La página
+siguiente se obtiene con `WHERE (sort_key, id) > (:k, :id)` (o `<` en orden
+descendente), que usa el índice y no depende de cuántas filas se saltearon antes.
+"""
+from datetime import datetime
+from operator import attrgetter
+import base64
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import func, literal_column, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    raise TypeError(f"Valor no serializable en el cursor: {type(value).__name__}")
+
+def _decode_value(obj):
+    if set(obj) == {"dt"}:
+        return datetime.fromisoformat(obj["dt"])
+    return obj
+
+def encode_cursor(values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":"), default=_encode_value).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()), object_hook=_decode_value)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return values
+
+# Fecha de orden para filas sin fecha (ver coalesce_key): el literal SQL usa
+# el mismo formato con que SQLite guarda los DateTime para que las
+# comparaciones de texto coincidan
+UNDATED = datetime(1970, 1, 1)
+UNDATED_SQL = "'1970-01-01 00:00:00.000000'"
+
+def _check_values(values, order_columns):
+    """Cada valor del cursor debe ser del tipo Python de su columna de orden.
+
+    Un cursor adulterado (texto donde va un id, un número donde va una fecha)
+    se rechaza con 400 antes de llegar a la base, donde daría un error de tipos.
+    """
+    for value, column in zip(values, order_columns):
+        try:
+            expected = column.type.python_type
+        except NotImplementedError:
+            continue
+        if expected is float:
+            expected = (int, float)
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def coalesce_key(column, empty: str = "''"):
+    """Clave de orden sin NULL para columnas opcionales.
+
+    Con NULL la comparación `(sort_key, id) > (...)` da NULL y esas filas se
+    saltean; el valor vacío va como literal en el SQL para que el planner use
+    el índice de expresión `coalesce(columna, '')`.
+    """
+    return func.coalesce(column, literal_column(empty))
+
+def apply_keyset(query, order_columns, cursor: str = None, skip: int = 0, limit: int = 100, descending: bool = False):
+    """Ordenar por `order_columns` y paginar por cursor, o por skip/limit si no hay cursor"""
+    if descending:
+        query = query.order_by(*(column.desc() for column in order_columns))
+    else:
+        query = query.order_by(*order_columns)
+    if cursor:
+        values = decode_cursor(cursor, len(order_columns))
+        _check_values(values, order_columns)
+        keyset, last = tuple_(*order_columns), tuple_(*values)
+        query = query.where(keyset < last if descending else keyset > last)
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def next_cursor(items, order_attributes, limit: int):
+    """Cursor de la página siguiente, o None si esta página no llenó el límite.
+
+    Los atributos pueden ser rutas con punto ("professor_profile.ranking") o
+    funciones que reciben la fila (para claves calculadas, como coalesce_key).
+    """
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(
+        attribute(last) if callable(attribute) else attrgetter(attribute)(last) for attribute in order_attributes
+    )
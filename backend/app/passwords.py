@@ -0,0 +1,32 @@
+"""
+Hash y verificación de contraseñas en un pool de hilos acotado.
+
+`check_password_hash` y `generate_password_hash` de werkzeug usan un KDF lento
+a propósito. Ejecutarlos directamente en un handler `async` bloquea el event
+loop, y ejecutarlos en el threadpool de Starlette no limita cuántos corren a la
+vez. Este módulo los deriva a un pool propio con un tope configurable
+(`PASSWORD_HASH_WORKERS`). hashlib libera el GIL durante el KDF, así que los
+hilos alcanzan para paralelizar.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+def hash_password(password: str) -> str:
+    """Generar el hash de una contraseña (bloquea al hilo llamador, no al pool)"""
+    return _executor.submit(generate_password_hash, password).result()
+
+def check_password(password_hash: str, password: str) -> bool:
+    """Verificar una contraseña desde código síncrono"""
+    return _executor.submit(check_password_hash, password_hash, password).result()
+
+async def check_password_async(password_hash: str, password: str) -> bool:
+    """Verificar una contraseña sin bloquear el event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, check_password_hash, password_hash, password)
@@ -0,0 +1,87 @@
+"""
+Generación de miniaturas para la biblioteca de medios.
+
+Imágenes con Pillow, primera página de los PDF con `pdftoppm` (poppler-utils) y
+un fotograma de los videos con `ffmpeg`. Todo corre en el worker
+(`python -m app.worker`), nunca en el request de subida.
+"""
+from pathlib import Path
+import os
+import shutil
+import subprocess
+import tempfile
+
+from PIL import Image, ImageOps
+
+THUMBNAIL_SIZE = int(os.getenv("MEDIA_THUMBNAIL_SIZE", "320"))
+THUMBNAIL_QUALITY = 80
+RENDER_TIMEOUT_SECONDS = int(os.getenv("MEDIA_RENDER_TIMEOUT_SECONDS", "60"))
+
+class PreviewError(Exception):
+    pass
+
+def preview_kind(mime_type: str):
+    """Tipo de vista previa para el mime type, o None si no se genera"""
+    mime_type = mime_type or ""
+    if mime_type.startswith("image/"):
+        return "image"
+    if mime_type == "application/pdf":
+        return "pdf"
+    if mime_type.startswith("video/"):
+        return "video"
+    return None
+
+def _save_thumbnail(image: Image.Image, output_path: Path):
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.save(output_path, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+
+def _run(command):
+    try:
+        subprocess.run(command, check=True, capture_output=True, timeout=RENDER_TIMEOUT_SECONDS)
+    except FileNotFoundError:
+        raise PreviewError(f"{command[0]} no está instalado")
+    except subprocess.CalledProcessError as e:
+        raise PreviewError(e.stderr.decode(errors="replace")[-500:])
+    except subprocess.TimeoutExpired:
+        raise PreviewError(f"{command[0]} superó {RENDER_TIMEOUT_SECONDS}s")
+
+def _render_pdf(source: Path, workdir: Path) -> Path:
+    prefix = workdir / "page"
+    _run(["pdftoppm", "-f", "1", "-l", "1", "-singlefile", "-jpeg",
+          "-scale-to", str(THUMBNAIL_SIZE * 2), str(source), str(prefix)])
+    return prefix.with_suffix(".jpg")
+
+def _render_video(source: Path, workdir: Path) -> Path:
+    frame = workdir / "frame.jpg"
+    # Un segundo adentro evita los fundidos a negro; los videos más cortos usan el primer cuadro
+    for offset in ("1", "0"):
+        _run(["ffmpeg", "-y", "-loglevel", "error", "-ss", offset, "-i", str(source),
+              "-frames:v", "1", "-vf", f"scale={THUMBNAIL_SIZE * 2}:-2", str(frame)])
+        if frame.exists() and frame.stat().st_size:
+            return frame
+    raise PreviewError("ffmpeg no devolvió ningún fotograma")
+
+def render_thumbnail(source: Path, mime_type: str, output_path: Path):
+    """Escribir en `output_path` una miniatura JPEG del archivo `source`"""
+    kind = preview_kind(mime_type)
+    if kind is None:
+        raise PreviewError(f"Sin vista previa para {mime_type}")
+    with tempfile.TemporaryDirectory() as tmp:
+        if kind == "image":
+            rendered = source
+        elif kind == "pdf":
+            rendered = _render_pdf(source, Path(tmp))
+        else:
+            rendered = _render_video(source, Path(tmp))
+        try:
+            with Image.open(rendered) as image:
+                _save_thumbnail(image, output_path)
+        except (OSError, Image.DecompressionBombError) as e:
+            raise PreviewError(str(e))
+
+def copy_to_file(stream, destination: Path):
+    with open(destination, "wb") as handle:
+        shutil.copyfileobj(stream, handle, 1024 * 1024)
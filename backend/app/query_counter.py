@@ -0,0 +1,71 @@
+"""
+Conteo de sentencias SQL por request.
+
+Un listener global de SQLAlchemy suma cada sentencia al contador del request
+en curso (un ContextVar con un objeto mutable, así que también cuenta lo que
+corre en el threadpool y en el motor async). Con SQL_QUERY_COUNT_HEADER=true
+el middleware agrega `X-SQL-Query-Count` a cada respuesta, útil para detectar
+N+1 desde el navegador; `count_queries()` sirve para los benchmarks.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SQL_QUERY_COUNT_HEADER = os.getenv("SQL_QUERY_COUNT_HEADER", "false").lower() in ("1", "true", "yes")
+QUERY_COUNT_HEADER = "X-SQL-Query-Count"
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def record(self, statement: str):
+        self.count += 1
+        self.statements.append(statement)
+
+_current_counter: ContextVar = ContextVar("query_counter", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.record(statement)
+
+@contextmanager
+def count_queries():
+    """Contar las sentencias ejecutadas dentro del bloque"""
+    counter = QueryCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+class QueryCountMiddleware:
+    """Agregar a la respuesta la cantidad de sentencias SQL que ejecutó el request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        counter = QueryCounter()
+        token = _current_counter.set(counter)
+
+        async def send_with_count(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((QUERY_COUNT_HEADER.lower().encode(), str(counter.count).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            _current_counter.reset(token)
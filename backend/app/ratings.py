@@ -0,0 +1,30 @@
+"""
+Calificación de los profesores a partir de sus reseñas.
+
+Cada profesor guarda el agregado de sus reseñas (`rating_count`, `rating_sum`
+y el histograma `stars_1`..`stars_5`) y `ranking`, el promedio bayesiano: las
+reseñas se mezclan con RATING_PRIOR_WEIGHT reseñas ficticias de
+RATING_PRIOR_MEAN, así un profesor con una sola reseña de 5 no queda por encima
+de otro con cien reseñas de 4.8.
+El agregado se actualiza en el mismo flush que inserta, modifica o borra la
+reseña (ver models.py), de modo que ordenar por calificación no lee `reviews`.
+
+Si se cambian estos valores, `python -m app.manage recompute-ratings`
+recalcula el ranking de todos los profesores.
+"""
+import os
+
+RATING_PRIOR_MEAN = float(os.getenv("RATING_PRIOR_MEAN", "3.0"))
+RATING_PRIOR_WEIGHT = int(os.getenv("RATING_PRIOR_WEIGHT", "5"))
+# Notas válidas de una reseña; el histograma guarda una columna por cada una
+RATING_STARS = range(1, 6)
+
+# Con peso 0 un profesor sin reseñas dividiría por cero al calcular el ranking
+if RATING_PRIOR_WEIGHT <= 0:
+    raise ValueError(f"RATING_PRIOR_WEIGHT debe ser mayor que cero: {RATING_PRIOR_WEIGHT}")
+if not RATING_STARS[0] <= RATING_PRIOR_MEAN <= RATING_STARS[-1]:
+    raise ValueError(f"RATING_PRIOR_MEAN debe estar entre {RATING_STARS[0]} y {RATING_STARS[-1]}: {RATING_PRIOR_MEAN}")
+
+def bayesian_average(count, total):
+    """Promedio bayesiano; acepta números o expresiones SQL (columnas del agregado)"""
+    return (RATING_PRIOR_WEIGHT * RATING_PRIOR_MEAN + total) / (RATING_PRIOR_WEIGHT + count)
@@ -0,0 +1,136 @@
+"""
+Subidas reanudables (al estilo tus) para archivos grandes de la biblioteca.
+
+Protocolo:
+    POST   /teachers/{id}/uploads                 crear la sesión (nombre, tamaño total)
+    HEAD   /teachers/{id}/uploads/{upload_id}     consultar Upload-Offset
+    PATCH  /teachers/{id}/uploads/{upload_id}     enviar bytes desde Upload-Offset
+    POST   /teachers/{id}/uploads/{upload_id}/complete   crear el TeacherMediaFile
+    DELETE /teachers/{id}/uploads/{upload_id}     cancelar
+
+Cada PATCH agrega los bytes al final de un único archivo en el área temporal,
+así que al completar no hay que concatenar nada: el archivo pasa tal cual al
+almacenamiento por hash. El offset es el tamaño de ese archivo (lo escrito
+antes de un corte es válido), por eso la sesión sobrevive a reinicios del
+worker: los metadatos están en `media_upload_sessions` y los bytes en disco.
+El área temporal (MEDIA_ROOT/staging) debe ser compartida entre réplicas.
+
+El SHA-256 se calcula mientras llegan los bytes; el estado del hash vive en
+memoria del worker y solo si se perdió (reinicio, otra réplica) se vuelve a
+leer la parte ya recibida.
+"""
+from collections import OrderedDict
+from pathlib import Path
+import fcntl
+import hashlib
+import os
+import threading
+
+from fastapi.concurrency import run_in_threadpool
+
+from .media import UPLOAD_CHUNK_SIZE, UploadTooLargeError, write_chunk
+
+RESUMABLE_MAX_UPLOAD_BYTES = int(os.getenv("MEDIA_MAX_RESUMABLE_UPLOAD_BYTES", str(2 * 1024 * 1024 * 1024)))
+RESUMABLE_UPLOAD_TTL_HOURS = int(os.getenv("MEDIA_RESUMABLE_UPLOAD_TTL_HOURS", "24"))
+OFFSET_HEADER = "Upload-Offset"
+LENGTH_HEADER = "Upload-Length"
+CHUNK_CONTENT_TYPE = "application/offset+octet-stream"
+
+class UploadOffsetConflict(Exception):
+    def __init__(self, offset: int):
+        super().__init__(f"El offset actual de la subida es {offset}")
+        self.offset = offset
+
+class UploadLocked(Exception):
+    pass
+
+def resumable_path(root: Path, upload_id: str) -> Path:
+    staging_dir = root / "staging"
+    staging_dir.mkdir(parents=True, exist_ok=True)
+    return staging_dir / f"{upload_id}.resumable"
+
+def current_offset(path: Path) -> int:
+    return path.stat().st_size if path.exists() else 0
+
+class HashStates:
+    """Estado del SHA-256 por subida, válido solo para el offset con el que se guardó"""
+
+    def __init__(self, max_size: int = 256):
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_size = max_size
+
+    def take(self, upload_id: str, offset: int):
+        with self._lock:
+            state = self._states.pop(upload_id, None)
+        if state and state[0] == offset:
+            return state[1]
+        return None
+
+    def store(self, upload_id: str, offset: int, hasher):
+        with self._lock:
+            self._states[upload_id] = (offset, hasher)
+            self._states.move_to_end(upload_id)
+            while len(self._states) > self.max_size:
+                self._states.popitem(last=False)
+
+    def discard(self, upload_id: str):
+        with self._lock:
+            self._states.pop(upload_id, None)
+
+hash_states = HashStates()
+
+def _open_locked(path: Path):
+    handle = open(path, "ab")
+    try:
+        # Un solo PATCH por subida a la vez, aunque lleguen a procesos distintos
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        handle.close()
+        raise UploadLocked()
+    return handle
+
+def _rehash(path: Path, length: int):
+    hasher = hashlib.sha256()
+    remaining = length
+    with open(path, "rb") as handle:
+        while remaining > 0:
+            chunk = handle.read(min(UPLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            remaining -= len(chunk)
+    return hasher
+
+async def append_chunk(upload_id: str, path: Path, offset: int, body, upload_length: int) -> int:
+    """Agregar el cuerpo del PATCH a partir de `offset`; devuelve el nuevo offset"""
+    handle = await run_in_threadpool(_open_locked, path)
+    try:
+        actual = os.fstat(handle.fileno()).st_size
+        if actual != offset:
+            raise UploadOffsetConflict(actual)
+        hasher = hash_states.take(upload_id, offset)
+        if hasher is None:
+            hasher = await run_in_threadpool(_rehash, path, offset)
+        written = offset
+        try:
+            async for chunk in body:
+                if not chunk:
+                    continue
+                if written + len(chunk) > upload_length:
+                    raise UploadTooLargeError(upload_length)
+                await run_in_threadpool(write_chunk, handle, hasher, chunk)
+                written += len(chunk)
+        finally:
+            # Lo escrito hasta un corte de conexión es válido: el cliente retoma desde ahí
+            await run_in_threadpool(handle.flush)
+            hash_states.store(upload_id, written, hasher)
+        return written
+    finally:
+        await run_in_threadpool(handle.close)
+
+async def upload_digest(upload_id: str, path: Path, upload_length: int) -> str:
+    hasher = hash_states.take(upload_id, upload_length)
+    if hasher is None:
+        hasher = await run_in_threadpool(_rehash, path, upload_length)
+    return hasher.hexdigest()
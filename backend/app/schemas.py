@@ -35,10 +35,22 @@ class ProfessorBase(BaseModel):
 class ProfessorOut(ProfessorBase):
     id: int
     ranking: float
+    rating_count: int = 0
     user: UserOut
     class Config:
         from_attributes = True
 
+class TeacherRatingOut(BaseModel):
+    ranking: float  # promedio bayesiano, el que usa sort=rating
+    rating_count: int
+    rating_average: Optional[float] = None  # promedio simple; None sin reseñas
+    class Config:
+        from_attributes = True
+
+class TeacherSearchOut(UserOut):
+    # Se lee del perfil de profesor cargado con la búsqueda
+    rating: Optional[TeacherRatingOut] = Field(None, validation_alias="professor_profile")
+
 class SubjectLevel(str, enum.Enum):
     primaria = "primaria"
     secundaria = "secundaria"
@@ -88,6 +100,24 @@ class ReviewBase(BaseModel):
     rating: int
     comment: Optional[str]
 
+class ReviewCreate(BaseModel):
+    rating: int = Field(..., ge=1, le=5)
+    comment: Optional[str] = Field(None, max_length=2000)
+
+class ReviewOut(ReviewBase):
+    id: int
+    created_at: Optional[datetime] = None
+    class Config:
+        from_attributes = True
+
+class TeacherReviewSummaryOut(BaseModel):
+    ranking: float
+    rating_count: int
+    rating_average: Optional[float] = None
+    rating_histogram: dict[int, int]  # estrellas (1 a 5) -> cantidad de reseñas, con 0 si no hay
+    class Config:
+        from_attributes = True
+
 class TeacherMediaFileBase(BaseModel):
     filename: str
     original_filename: str
@@ -98,11 +128,49 @@ class TeacherMediaFileBase(BaseModel):
 class TeacherMediaFileCreate(TeacherMediaFileBase):
     teacher_id: int
     file_path: str
+    content_hash: Optional[str] = None
 
 class TeacherMediaFileOut(TeacherMediaFileBase):
     id: int
     teacher_id: int
-    uploaded_at: datetime
+    uploaded_at: Optional[datetime] = None
+    preview_status: Optional[str] = None
+    class Config:
+        from_attributes = True
+
+class MediaBatchDelete(BaseModel):
+    ids: list[int]
+
+class MediaBatchDeleteOut(BaseModel):
+    deleted: list[int]
+    not_found: list[int]
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int
+    mime_type: Optional[str] = None
+    description: Optional[str] = ""
+
+class UploadSessionOut(BaseModel):
+    id: str
+    teacher_id: int
+    original_filename: str
+    mime_type: Optional[str] = None
+    upload_length: int
+    offset: int
+    expires_at: datetime
+
+class MaintenanceJobOut(BaseModel):
+    id: str
+    kind: str
+    status: str
+    total: Optional[int] = None
+    processed: int
+    changed: int
+    last_error: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
     class Config:
         from_attributes = True
 
@@ -144,6 +212,10 @@ class TutorshipStatusUpdate(BaseModel):
     class Config:
         from_attributes = True
 
+class TutorshipSummaryOut(BaseModel):
+    total: int
+    by_status: dict[str, int]  # todos los estados, con 0 si no hay tutorías
+
 # Schemas para disponibilidad de profesores
 class TeacherAvailabilityBase(BaseModel):
     day_of_week: int  # 0 = Lunes, 6 = Domingo
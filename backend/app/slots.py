@@ -0,0 +1,126 @@
+"""
+Motor de generación de slots disponibles para docentes.
+
+Trabaja con aritmética de intervalos: ventanas semanales de disponibilidad
+menos eventos bloqueados de la agenda menos tutorías no canceladas. Todas las
+listas se ordenan una sola vez y se recorren con barridos lineales, por lo que
+el costo por docente es O((ventanas + ocupados) log n).
+
+Los pedidos se acotan a SLOTS_MAX_RANGE_DAYS días y a slots de al menos
+SLOTS_MIN_DURATION_MINUTES minutos, así la respuesta tiene un tamaño máximo.
+"""
+from datetime import datetime, timedelta, time
+from collections import defaultdict
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+SLOTS_MAX_RANGE_DAYS = int(os.getenv("SLOTS_MAX_RANGE_DAYS", "31"))
+SLOTS_MIN_DURATION_MINUTES = int(os.getenv("SLOTS_MIN_DURATION_MINUTES", "15"))
+SLOTS_MAX_DURATION_MINUTES = 24 * 60
+
+
+def parse_hhmm(value: str) -> timedelta:
+    """Hora "HH:MM" como desplazamiento desde el inicio del día; "24:00" es el fin del día"""
+    if value == "24:00":
+        return timedelta(hours=24)
+    parsed = datetime.strptime(value, "%H:%M")
+    return timedelta(hours=parsed.hour, minutes=parsed.minute)
+
+
+def merge_intervals(intervals):
+    """Ordenar y fusionar intervalos (inicio, fin) que se solapan o se tocan"""
+    merged = []
+    for start, end in sorted(i for i in intervals if i[0] < i[1]):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def weekly_windows(availability, start_date: datetime, end_date: datetime):
+    """Expandir la disponibilidad semanal a ventanas concretas dentro del rango"""
+    # Agrupar por día de la semana una sola vez (0 = Lunes, 6 = Domingo)
+    by_weekday = defaultdict(list)
+    for slot in availability:
+        if not slot.is_available:
+            continue
+        try:
+            window = (parse_hhmm(slot.start_time), parse_hhmm(slot.end_time))
+        except (TypeError, ValueError):
+            # Un horario mal cargado no debe impedir calcular el resto
+            logger.warning("Disponibilidad %s con horario inválido: %r-%r", slot.id, slot.start_time, slot.end_time)
+            continue
+        by_weekday[slot.day_of_week].append(window)
+
+    windows = []
+    if not by_weekday:
+        return windows
+
+    current_day = start_date.date()
+    last_day = end_date.date()
+    while current_day <= last_day:
+        midnight = datetime.combine(current_day, time())
+        for window_start, window_end in by_weekday.get(current_day.weekday(), ()):
+            start = max(midnight + window_start, start_date)
+            end = min(midnight + window_end, end_date)
+            if start < end:
+                windows.append((start, end))
+        current_day += timedelta(days=1)
+
+    return merge_intervals(windows)
+
+
+def subtract_intervals(windows, busy):
+    """Restar intervalos ocupados a las ventanas (ambas listas ordenadas y fusionadas)"""
+    free = []
+    j = 0
+    for start, end in windows:
+        # Descartar ocupados que terminan antes de esta ventana
+        while j < len(busy) and busy[j][1] <= start:
+            j += 1
+
+        cursor = start
+        k = j
+        while k < len(busy) and busy[k][0] < end:
+            busy_start, busy_end = busy[k]
+            if busy_start > cursor:
+                free.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+            if cursor >= end:
+                break
+            k += 1
+
+        if cursor < end:
+            free.append((cursor, end))
+    return free
+
+
+def split_into_slots(free, duration_minutes: int):
+    """Dividir los intervalos libres en slots de duración fija"""
+    step = timedelta(minutes=duration_minutes)
+    slots = []
+    for start, end in free:
+        slot_start = start
+        while slot_start + step <= end:
+            slots.append({
+                "start_datetime": slot_start,
+                "end_datetime": slot_start + step,
+                "duration_minutes": duration_minutes
+            })
+            slot_start += step
+    return slots
+
+
+def compute_available_slots(availability, busy, start_date: datetime, end_date: datetime, duration_minutes: int = 60):
+    """Calcular los slots libres de un docente a partir de su disponibilidad y sus intervalos ocupados"""
+    if duration_minutes <= 0:
+        return []
+    windows = weekly_windows(availability, start_date, end_date)
+    if not windows:
+        return []
+    free = subtract_intervals(windows, merge_intervals(busy))
+    return split_into_slots(free, duration_minutes)
@@ -0,0 +1,235 @@
+"""
+Backends de almacenamiento para la biblioteca de medios.
+
+Los handlers trabajan con claves (`blobs/ab/abcdef...`) y nunca con rutas del
+disco, así que el contenido puede vivir en el disco local (una sola réplica o
+un volumen compartido) o en un bucket S3 compatible (AWS, MinIO), lo que
+permite correr varias réplicas del backend.
+
+Las subidas siempre se reciben primero en un área temporal local (hace falta
+el hash antes de guardar) y luego se entregan al backend con `put`.
+
+Configuración:
+    MEDIA_STORAGE_BACKEND          local (por defecto) o s3
+    MEDIA_ROOT                     directorio local (y área temporal de subidas)
+    MEDIA_ACCEL_MODE               con el backend local: nginx (X-Accel-Redirect) o
+                                   sendfile (X-Sendfile); vacío para servir desde Python
+    MEDIA_ACCEL_PREFIX             location interna de nginx que apunta a MEDIA_ROOT
+    MEDIA_S3_BUCKET                bucket de destino
+    MEDIA_S3_PREFIX                prefijo opcional para las claves
+    MEDIA_S3_ENDPOINT_URL          para MinIO u otro servicio compatible
+    MEDIA_S3_REGION
+    MEDIA_S3_PRESIGNED_DOWNLOADS   redirigir las descargas a una URL firmada (true)
+    MEDIA_S3_PRESIGN_SECONDS       validez de la URL firmada (300)
+
+Las credenciales de S3 se toman de las variables estándar de AWS.
+"""
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import quote
+import os
+
+from fastapi import HTTPException
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+
+from .media import (
+    UPLOAD_CHUNK_SIZE,
+    cache_control_for,
+    is_not_modified,
+    media_etag,
+    media_file_response,
+)
+
+MEDIA_STORAGE_BACKEND = os.getenv("MEDIA_STORAGE_BACKEND", "local").lower()
+MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT", "uploads/teacher_media"))
+MEDIA_ACCEL_MODE = os.getenv("MEDIA_ACCEL_MODE", "").lower()
+MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/protected-media/")
+ACCEL_MODES = ("", "nginx", "sendfile")
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+class MediaStorage(ABC):
+    """Interfaz común de los backends de almacenamiento"""
+
+    @abstractmethod
+    def put(self, staged_path: Path, key: str):
+        """Guardar el archivo temporal bajo `key`; el archivo temporal deja de existir"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Borrar el contenido de `key` (no falla si ya no existe)"""
+
+    @abstractmethod
+    def open(self, key: str):
+        """Abrir el contenido para lectura binaria"""
+
+    @abstractmethod
+    def download_response(self, request_headers, key: str, filename: str, mime_type: str, content_hash: str = None):
+        """Respuesta HTTP para descargar `key`"""
+
+class LocalStorage(MediaStorage):
+    """Disco local; opcionalmente delega el envío de los bytes al proxy inverso
+
+    En modo `nginx` la respuesta solo lleva `X-Accel-Redirect` con la URI interna
+    del archivo (ej. `location /protected-media/ { internal; alias .../teacher_media/; }`);
+    en modo `sendfile` lleva `X-Sendfile` con la ruta absoluta (Apache, lighttpd).
+    El proxy sirve el archivo con sendfile(2), Range incluido.
+    """
+
+    def __init__(self, root: Path, accel_mode: str = "", accel_prefix: str = MEDIA_ACCEL_PREFIX):
+        if accel_mode not in ACCEL_MODES:
+            raise ValueError(f"MEDIA_ACCEL_MODE desconocido: {accel_mode}")
+        self.root = root
+        self.accel_mode = accel_mode
+        self.accel_prefix = "/" + accel_prefix.strip("/") + "/"
+
+    def path(self, key: str) -> Path:
+        path = Path(key)
+        # Los registros anteriores guardaban la ruta completa (uploads/teacher_media/...)
+        if path.is_absolute() or path.parts[:len(self.root.parts)] == self.root.parts:
+            return path
+        return self.root / path
+
+    def put(self, staged_path: Path, key: str):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(staged_path, path)
+
+    def delete(self, key: str):
+        path = self.path(key)
+        if path.exists():
+            os.remove(path)
+
+    def open(self, key: str):
+        return open(self.path(key), "rb")
+
+    def download_response(self, request_headers, key: str, filename: str, mime_type: str, content_hash: str = None):
+        path = self.path(key)
+        if not path.exists():
+            raise HTTPException(status_code=404, detail="Archivo no encontrado en el servidor")
+        if self.accel_mode:
+            return self._accel_response(request_headers, path, filename, mime_type, content_hash)
+        return media_file_response(request_headers, path, filename, mime_type, content_hash)
+
+    def _accel_response(self, request_headers, path: Path, filename: str, mime_type: str, content_hash: str = None):
+        headers = {
+            "cache-control": cache_control_for(mime_type),
+            "content-disposition": content_disposition(filename),
+        }
+        if content_hash:
+            headers["etag"] = media_etag(content_hash)
+            if is_not_modified(request_headers, headers["etag"]):
+                return Response(status_code=304, headers=headers)
+
+        if self.accel_mode == "sendfile":
+            headers["x-sendfile"] = str(path.resolve())
+        else:
+            try:
+                relative = path.resolve().relative_to(self.root.resolve())
+            except ValueError:
+                # Fuera de MEDIA_ROOT no hay location interna: se sirve desde Python
+                return media_file_response(request_headers, path, filename, mime_type, content_hash)
+            headers["x-accel-redirect"] = self.accel_prefix + quote(relative.as_posix())
+        return Response(media_type=mime_type, headers=headers)
+
+class S3Storage(MediaStorage):
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str = None, region: str = None,
+                 presigned_downloads: bool = True, presign_seconds: int = 300, client=None):
+        if client is None:
+            import boto3
+            client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.presigned_downloads = presigned_downloads
+        self.presign_seconds = presign_seconds
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put(self, staged_path: Path, key: str):
+        self.client.upload_file(str(staged_path), self.bucket, self._object_key(key))
+        os.remove(staged_path)
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def open(self, key: str):
+        return self._get_object(Key=self._object_key(key))["Body"]
+
+    def _get_object(self, **params):
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.get_object(Bucket=self.bucket, **params)
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code in ("NoSuchKey", "404"):
+                raise HTTPException(status_code=404, detail="Archivo no encontrado en el servidor")
+            if code == "InvalidRange":
+                raise HTTPException(status_code=416, detail="Rango no satisfacible")
+            raise
+
+    def download_response(self, request_headers, key: str, filename: str, mime_type: str, content_hash: str = None):
+        disposition = content_disposition(filename)
+        if self.presigned_downloads:
+            # Los bytes van directo de S3 al cliente; S3 resuelve Range y los validadores
+            url = self.client.generate_presigned_url(
+                "get_object",
+                Params={
+                    "Bucket": self.bucket,
+                    "Key": self._object_key(key),
+                    "ResponseContentType": mime_type,
+                    "ResponseContentDisposition": disposition,
+                },
+                ExpiresIn=self.presign_seconds,
+            )
+            return RedirectResponse(url, status_code=307, headers={"cache-control": "private, no-store"})
+
+        headers = {"cache-control": cache_control_for(mime_type), "accept-ranges": "bytes"}
+        if content_hash:
+            headers["etag"] = media_etag(content_hash)
+            if is_not_modified(request_headers, headers["etag"]):
+                return Response(status_code=304, headers=headers)
+
+        params = {"Key": self._object_key(key)}
+        http_range = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if http_range and (if_range is None or if_range == headers.get("etag")):
+            params["Range"] = http_range
+        s3_object = self._get_object(**params)
+
+        headers["content-length"] = str(s3_object["ContentLength"])
+        headers["content-disposition"] = disposition
+        status_code = 200
+        if s3_object.get("ContentRange"):
+            headers["content-range"] = s3_object["ContentRange"]
+            status_code = 206
+
+        def stream_body():
+            try:
+                yield from s3_object["Body"].iter_chunks(UPLOAD_CHUNK_SIZE)
+            finally:
+                s3_object["Body"].close()
+
+        return StreamingResponse(stream_body(), status_code=status_code, media_type=mime_type, headers=headers)
+
+@lru_cache(maxsize=None)
+def get_media_storage() -> MediaStorage:
+    """Backend configurado; se construye con el primer uso y no al importar el módulo"""
+    if MEDIA_STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=os.environ["MEDIA_S3_BUCKET"],
+            prefix=os.getenv("MEDIA_S3_PREFIX", ""),
+            endpoint_url=os.getenv("MEDIA_S3_ENDPOINT_URL") or None,
+            region=os.getenv("MEDIA_S3_REGION") or None,
+            presigned_downloads=os.getenv("MEDIA_S3_PRESIGNED_DOWNLOADS", "true").lower() in ("1", "true", "yes"),
+            presign_seconds=int(os.getenv("MEDIA_S3_PRESIGN_SECONDS", "300")),
+        )
+    if MEDIA_STORAGE_BACKEND != "local":
+        raise ValueError(f"MEDIA_STORAGE_BACKEND desconocido: {MEDIA_STORAGE_BACKEND}")
+    return LocalStorage(MEDIA_ROOT, accel_mode=MEDIA_ACCEL_MODE)
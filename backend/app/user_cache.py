@@ -0,0 +1,103 @@
+"""
+Caché en proceso de usuarios autenticados.
+
+Guarda instantáneas inmutables de `User` por ID con un TTL y un tamaño máximo,
+para que `get_current_user` no tenga que consultar la base de datos en cada
+request. Las modificaciones y bajas de usuarios deben llamar a `evict`.
+
+La caché y las invalidaciones son por proceso: con varios workers, `evict`
+solo afecta al worker que atendió el cambio. Por eso, con
+AUTH_TRUST_TOKEN_CLAIMS los claims firmados solo se aceptan durante
+AUTH_CLAIMS_MAX_AGE_SECONDS desde la emisión del token; pasado ese tiempo
+el usuario se vuelve a leer (caché con TTL o base de datos), así un cambio de
+rol o una baja llega a todos los workers en ese plazo como máximo.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+import os
+import threading
+import time
+
+from .schemas import UserRole
+
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+AUTH_CLAIMS_MAX_AGE_SECONDS = float(os.getenv("AUTH_CLAIMS_MAX_AGE_SECONDS", "300"))
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Copia desacoplada de la sesión con los campos que usan los handlers"""
+    id: int
+    name: str
+    email: str
+    role: UserRole
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(id=user.id, name=user.name, email=user.email, role=UserRole(user.role))
+
+class UserCache:
+    def __init__(self, ttl_seconds: float = USER_CACHE_TTL_SECONDS, max_size: int = USER_CACHE_MAX_SIZE,
+                 invalidation_ttl_seconds: float = AUTH_CLAIMS_MAX_AGE_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.invalidation_ttl_seconds = invalidation_ttl_seconds
+        self._entries = OrderedDict()
+        # Momento de la última invalidación de cada usuario, para rechazar
+        # claims firmados antes de un cambio de rol o una baja. Solo hace falta
+        # recordarla mientras esos claims se aceptan (invalidation_ttl_seconds)
+        self._invalidated_at = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int):
+        if self.ttl_seconds <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            snapshot, expires_at = entry
+            if expires_at <= now:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return snapshot
+
+    def set(self, snapshot: UserSnapshot):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[snapshot.id] = (snapshot, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(snapshot.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def evict(self, user_id: int):
+        now = time.time()
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._invalidated_at.pop(user_id, None)
+            self._invalidated_at[user_id] = now
+            # Ordenado por momento de invalidación: se descartan las vencidas desde el principio
+            while self._invalidated_at and (
+                next(iter(self._invalidated_at.values())) < now - self.invalidation_ttl_seconds
+                or len(self._invalidated_at) > self.max_size
+            ):
+                self._invalidated_at.popitem(last=False)
+
+    def invalidated_since(self, user_id: int, issued_at: float) -> bool:
+        """Indica si el usuario fue modificado después de emitido el token"""
+        with self._lock:
+            invalidated_at = self._invalidated_at.get(user_id)
+        return invalidated_at is not None and invalidated_at >= issued_at
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._invalidated_at.clear()
+
+user_cache = UserCache()
+
+def evict(user_id: int):
+    user_cache.evict(user_id)
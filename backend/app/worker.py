@@ -0,0 +1,248 @@
+"""
+Worker de trabajos en segundo plano de la biblioteca de medios.
+
+La cola es la tabla `media_jobs`: la subida encola el trabajo en la misma
+transacción que crea el blob y este proceso lo toma con
+`SELECT ... FOR UPDATE SKIP LOCKED`, así que se pueden correr varios workers
+sin coordinación extra. Los trabajos que fallan se reintentan con espera
+exponencial; los que quedaron en `running` por un worker caído se retoman
+después de MEDIA_JOB_TIMEOUT_SECONDS, hasta agotar MEDIA_JOB_MAX_ATTEMPTS (ahí
+se marcan `failed`). En cada ciclo también se descartan las subidas
+reanudables vencidas.
+
+Uso:
+    python -m app.worker              # procesar la cola indefinidamente
+    python -m app.worker --once       # vaciar la cola y salir
+    python -m app.worker --backfill   # encolar vistas previas de blobs anteriores
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import logging
+import os
+import signal
+import tempfile
+import time
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+from .media import thumbnail_key
+from .previews import PreviewError, copy_to_file, preview_kind, render_thumbnail
+from .resumable import resumable_path
+from .storage import get_media_storage, MEDIA_ROOT
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_JOB = "thumbnail"
+MEDIA_JOB_MAX_ATTEMPTS = int(os.getenv("MEDIA_JOB_MAX_ATTEMPTS", "5"))
+MEDIA_JOB_TIMEOUT_SECONDS = int(os.getenv("MEDIA_JOB_TIMEOUT_SECONDS", "600"))
+MEDIA_WORKER_POLL_SECONDS = float(os.getenv("MEDIA_WORKER_POLL_SECONDS", "2"))
+RETRY_BASE_SECONDS = 30
+
+def enqueue_preview(db: Session, blob: models.MediaBlob, mime_type: str):
+    """Encolar la miniatura del blob si su tipo la admite (sin commit)"""
+    if preview_kind(mime_type) is None:
+        return None
+    now = datetime.now()
+    blob.preview_status = "pending"
+    job = models.MediaJob(
+        content_hash=blob.sha256,
+        kind=THUMBNAIL_JOB,
+        mime_type=mime_type,
+        status="pending",
+        attempts=0,
+        run_after=now,
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(job)
+    return job
+
+def _stale_running(now: datetime):
+    return and_(
+        models.MediaJob.status == "running",
+        models.MediaJob.updated_at < now - timedelta(seconds=MEDIA_JOB_TIMEOUT_SECONDS),
+    )
+
+def claim_job(db: Session):
+    """Tomar el próximo trabajo disponible y marcarlo como running"""
+    now = datetime.now()
+    job = db.query(models.MediaJob).filter(
+        or_(
+            and_(models.MediaJob.status == "pending", models.MediaJob.run_after <= now),
+            # Un trabajo que tumba al worker en cada intento no se retoma para siempre
+            and_(_stale_running(now), models.MediaJob.attempts < MEDIA_JOB_MAX_ATTEMPTS),
+        )
+    ).order_by(models.MediaJob.run_after).with_for_update(skip_locked=True).first()
+    if job:
+        job.status = "running"
+        job.attempts += 1
+        job.updated_at = now
+        db.commit()
+    return job
+
+def fail_abandoned_jobs(db: Session) -> int:
+    """Marcar failed los trabajos colgados en running que ya agotaron sus intentos"""
+    now = datetime.now()
+    jobs = db.query(models.MediaJob).filter(
+        _stale_running(now), models.MediaJob.attempts >= MEDIA_JOB_MAX_ATTEMPTS
+    ).with_for_update(skip_locked=True).limit(100).all()
+    for job in jobs:
+        job.status = "failed"
+        job.last_error = job.last_error or "El worker se interrumpió en todos los intentos"
+        job.updated_at = now
+        blob = db.get(models.MediaBlob, job.content_hash)
+        if blob:
+            blob.preview_status = "failed"
+    db.commit()
+    return len(jobs)
+
+def _generate_thumbnail(job: models.MediaJob, storage_key: str):
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "source"
+        output = Path(tmp) / "thumb.jpg"
+        stream = get_media_storage().open(storage_key)
+        try:
+            copy_to_file(stream, source)
+        finally:
+            stream.close()
+        render_thumbnail(source, job.mime_type, output)
+        key = thumbnail_key(job.content_hash)
+        get_media_storage().put(output, key)
+    return key
+
+def _finish_thumbnail(db: Session, job: models.MediaJob, key: str):
+    blob = db.query(models.MediaBlob).filter(
+        models.MediaBlob.sha256 == job.content_hash
+    ).with_for_update().first()
+    if blob is None:
+        # El contenido se borró mientras se generaba la miniatura
+        get_media_storage().delete(key)
+    else:
+        blob.thumbnail_path = key
+        blob.preview_status = "ready"
+    db.delete(job)
+    db.commit()
+
+def _fail_job(db: Session, job: models.MediaJob, error: str, retry: bool):
+    job.last_error = error
+    job.updated_at = datetime.now()
+    if retry and job.attempts < MEDIA_JOB_MAX_ATTEMPTS:
+        job.status = "pending"
+        job.run_after = job.updated_at + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+    else:
+        job.status = "failed"
+        blob = db.get(models.MediaBlob, job.content_hash)
+        if blob:
+            blob.preview_status = "failed"
+    db.commit()
+
+def process_job(db: Session, job: models.MediaJob):
+    blob = db.get(models.MediaBlob, job.content_hash)
+    if blob is None or job.kind != THUMBNAIL_JOB:
+        db.delete(job)
+        db.commit()
+        return
+    storage_key = blob.storage_path
+    db.commit()  # no retener locks mientras se renderiza
+    try:
+        key = _generate_thumbnail(job, storage_key)
+    except PreviewError as e:
+        # Archivo inválido o herramienta ausente: reintentar no cambia el resultado
+        logger.warning("Vista previa de %s falló: %s", job.content_hash[:12], e)
+        _fail_job(db, job, str(e), retry=False)
+        return
+    except Exception as e:
+        logger.exception("Error procesando el trabajo %s", job.id)
+        db.rollback()
+        _fail_job(db, job, str(e), retry=True)
+        return
+    _finish_thumbnail(db, job, key)
+    logger.info("Miniatura lista para %s", job.content_hash[:12])
+
+def run_pending(session_factory=SessionLocal, should_stop=lambda: False) -> int:
+    """Procesar trabajos hasta vaciar la cola; devuelve cuántos se procesaron"""
+    processed = 0
+    while not should_stop():
+        db = session_factory()
+        try:
+            job = claim_job(db)
+            if job is None:
+                return processed
+            process_job(db, job)
+            processed += 1
+        finally:
+            db.close()
+    return processed
+
+def purge_expired_uploads(db: Session) -> int:
+    """Borrar las sesiones de subida reanudable vencidas y sus bytes recibidos"""
+    sessions = db.query(models.MediaUploadSession).filter(
+        models.MediaUploadSession.expires_at <= datetime.now()
+    ).with_for_update(skip_locked=True).limit(100).all()
+    for session in sessions:
+        path = resumable_path(MEDIA_ROOT, session.id)
+        if path.exists():
+            os.remove(path)
+        db.delete(session)
+    db.commit()
+    return len(sessions)
+
+def backfill_previews(db: Session) -> int:
+    """Encolar vistas previas para los blobs que no tienen estado"""
+    rows = db.query(models.MediaBlob, models.TeacherMediaFile.mime_type).join(
+        models.TeacherMediaFile, models.TeacherMediaFile.content_hash == models.MediaBlob.sha256
+    ).filter(models.MediaBlob.preview_status.is_(None)).all()
+    queued = set()
+    for blob, mime_type in rows:
+        if blob.sha256 not in queued and enqueue_preview(db, blob, mime_type):
+            queued.add(blob.sha256)
+    db.commit()
+    return len(queued)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="vaciar la cola y salir")
+    parser.add_argument("--backfill", action="store_true", help="encolar vistas previas faltantes y salir")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    if args.backfill:
+        db = SessionLocal()
+        try:
+            logger.info("Encolados %s trabajos", backfill_previews(db))
+        finally:
+            db.close()
+        return
+
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while not stopping:
+        db = SessionLocal()
+        try:
+            purged = purge_expired_uploads(db)
+            if purged:
+                logger.info("Descartadas %s subidas vencidas", purged)
+            abandoned = fail_abandoned_jobs(db)
+            if abandoned:
+                logger.warning("%s trabajos agotaron sus intentos sin terminar", abandoned)
+        finally:
+            db.close()
+        processed = run_pending(should_stop=lambda: stopping)
+        if args.once:
+            logger.info("Procesados %s trabajos", processed)
+            return
+        time.sleep(MEDIA_WORKER_POLL_SECONDS)
+
+if __name__ == "__main__":
+    main()
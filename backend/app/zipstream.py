@@ -0,0 +1,85 @@
+"""
+Exportación de archivos como zip generado al vuelo.
+
+`zipfile` escribe sobre un destino no seekable (usa data descriptors), así que
+cada bloque comprimido se entrega al cliente apenas se produce: el archivo
+completo nunca está en memoria ni en disco. Los formatos que ya vienen
+comprimidos (imágenes, audio, video, pdf, zip) se guardan sin recomprimir.
+"""
+from datetime import datetime
+from pathlib import PurePosixPath
+import io
+import zipfile
+
+ZIP_CHUNK_SIZE = 1024 * 1024
+STORED_MIME_PREFIXES = (
+    "image/", "video/", "audio/", "application/pdf", "application/zip",
+    "application/x-rar", "application/vnd.rar", "application/x-7z",
+)
+
+class _StreamSink(io.RawIOBase):
+    """Destino de escritura que acumula bytes hasta que el generador los entrega"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _compression_for(mime_type: str):
+    if (mime_type or "").startswith(STORED_MIME_PREFIXES):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+def _unique_name(name: str, used: set) -> str:
+    # Sin rutas dentro del zip y sin nombres repetidos: "apunte (2).pdf"
+    name = PurePosixPath(name.replace("\\", "/")).name or "archivo"
+    candidate, counter = name, 1
+    stem, dot, suffix = name.rpartition(".")
+    while candidate.lower() in used:
+        counter += 1
+        candidate = f"{stem} ({counter}).{suffix}" if dot else f"{name} ({counter})"
+    used.add(candidate.lower())
+    return candidate
+
+def zip_stream(entries, open_entry):
+    """Generar el zip por bloques.
+
+    `entries` son objetos con original_filename, mime_type, file_size y
+    uploaded_at; `open_entry(entry)` devuelve un archivo binario para leerlos.
+    """
+    sink = _StreamSink()
+    used_names = set()
+    with zipfile.ZipFile(sink, "w") as archive:
+        for entry in entries:
+            modified = max(entry.uploaded_at or datetime.now(), datetime(1980, 1, 1))
+            info = zipfile.ZipInfo(_unique_name(entry.original_filename, used_names), modified.timetuple()[:6])
+            info.compress_type = _compression_for(entry.mime_type)
+            info.file_size = entry.file_size or 0
+            source = open_entry(entry)
+            try:
+                with archive.open(info, "w", force_zip64=info.file_size >= zipfile.ZIP64_LIMIT) as target:
+                    while True:
+                        chunk = source.read(ZIP_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        target.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            finally:
+                source.close()
+            data = sink.drain()
+            if data:
+                yield data
+    # Directorio central, escrito al cerrar el archivo
+    yield sink.drain()
@@ -0,0 +1,114 @@
+"""
+Regresión de N+1 en las vistas de sqladmin: consultas por página del listado.
+
+Monta el panel (las mismas vistas que setup_admin) sobre una base temporal
+SQLite, genera datos para cada tabla y pide la página del listado con
+pageSize=200 para distintos volúmenes, contando las sentencias con la cabecera
+X-SQL-Query-Count. La cantidad no debe depender del número de filas. Pensado
+para CI: termina con código 1 si alguna vista supera --max-queries o crece con N.
+
+Uso:
+    python benchmarks/admin_queries_benchmark.py
+    python benchmarks/admin_queries_benchmark.py --sizes 20 200 --max-queries 6
+"""
+from datetime import datetime, timedelta
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+warnings.filterwarnings("ignore")
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.admin import setup_admin
+from app.query_counter import QueryCountMiddleware, QUERY_COUNT_HEADER
+
+PAGE_SIZE = 200
+
+def seed(db, rows):
+    teachers = [models.User(name=f"Docente {i}", email=f"docente{i}@example.com", password="x", role=models.UserRole.teacher)
+                for i in range(max(1, rows // 10))]
+    students = [models.User(name=f"Alumno {i}", email=f"alumno{i}@example.com", password="x", role=models.UserRole.student)
+                for i in range(max(1, rows // 4))]
+    subjects = [models.Subject(name=f"Materia {i}", level=models.SubjectLevel.secundaria, description="", department=f"Dto {i % 3}")
+                for i in range(max(1, rows // 20))]
+    db.add_all(teachers + students + subjects)
+    db.flush()
+    db.add_all(models.Professor(id=teacher.id, abstract="", picture="", ranking=0.0) for teacher in teachers)
+    start = datetime(2026, 1, 5, 9, 0)
+    for i in range(rows):
+        teacher, student, subject = teachers[i % len(teachers)], students[i % len(students)], subjects[i % len(subjects)]
+        tutorship = models.Tutorship(
+            professor_id=teacher.id, student_id=student.id, subject_id=subject.id,
+            status=models.TutorshipStatus.pending, start_time=start + timedelta(hours=i),
+            end_time=start + timedelta(hours=i + 1), price_usdt=10.0,
+        )
+        db.add(tutorship)
+        db.flush()
+        db.add_all([
+            models.ProfessorSubject(professor_id=teacher.id, subject_id=subject.id),
+            models.Payment(tutorship_id=tutorship.id, transaction_hash="0x", amount_usdt=10.0, timestamp=start, status="confirmed"),
+            models.Review(student_id=student.id, professor_id=teacher.id, tutorship_id=tutorship.id, rating=5, comment=""),
+            models.Resource(tutorship_id=tutorship.id, title=f"Recurso {i}", uploaded_at=start),
+            models.LiveSession(tutorship_id=tutorship.id, start_time=start, end_time=start, session_url="", whiteboard_url=""),
+            models.TeacherMediaFile(teacher_id=teacher.id, filename=f"f{i}", original_filename=f"apunte {i}.pdf",
+                                    file_path=f"f{i}", file_size=1024, mime_type="application/pdf", uploaded_at=start),
+        ])
+    db.commit()
+
+def measure(rows):
+    path = os.path.join(tempfile.mkdtemp(), "admin.db")
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        seed(db, rows)
+    finally:
+        db.close()
+        engine.dispose()
+
+    app = FastAPI()
+    app.add_middleware(QueryCountMiddleware)
+    admin = setup_admin(app, engine=create_async_engine(f"sqlite+aiosqlite:///{path}"))
+    counts = {}
+    with TestClient(app) as client:
+        for view in admin.views:
+            response = client.get(f"/admin/{view.identity}/list", params={"pageSize": PAGE_SIZE})
+            if response.status_code != 200:
+                raise SystemExit(f"REGRESIÓN: /admin/{view.identity}/list respondió {response.status_code}")
+            counts[view.identity] = int(response.headers[QUERY_COUNT_HEADER])
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 200])
+    parser.add_argument("--max-queries", type=int, default=6)
+    args = parser.parse_args()
+
+    results = {size: measure(size) for size in args.sizes}
+
+    failed = False
+    views = list(results[args.sizes[0]])
+    print(f"{'vista':<22} " + " ".join(f"{f'N={size}':>8}" for size in args.sizes))
+    for view in views:
+        counts = [results[size][view] for size in args.sizes]
+        print(f"{view:<22} " + " ".join(f"{count:>8}" for count in counts))
+        if max(counts) > args.max_queries or len(set(counts)) > 1:
+            failed = True
+
+    if failed:
+        print(f"REGRESIÓN: alguna vista supera {args.max_queries} consultas por página o crece con N")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark de /login bajo carga concurrente.
+
+Lanza N logins en paralelo contra un backend en ejecución y, al mismo tiempo,
+mide la latencia de un endpoint liviano (`POST /logout`, sin base de datos)
+para detectar si el hash de contraseñas bloquea el event loop.
+
+Uso:
+    python benchmarks/login_benchmark.py --base-url http://localhost:8000 \\
+        --email docente@ejemplo.com --password secreto --logins 200
+
+Requiere httpx (`pip install httpx`). El usuario debe existir previamente.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(label, latencies):
+    latencies_ms = [value * 1000 for value in latencies]
+    print(
+        f"{label:<10} n={len(latencies_ms):<5} "
+        f"p50={percentile(latencies_ms, 50):8.1f}ms "
+        f"p99={percentile(latencies_ms, 99):8.1f}ms "
+        f"max={max(latencies_ms, default=0):8.1f}ms "
+        f"mean={statistics.fmean(latencies_ms) if latencies_ms else 0:8.1f}ms"
+    )
+
+
+async def timed_login(client, email, password, latencies, errors):
+    started = time.perf_counter()
+    response = await client.post("/login", json={"email": email, "password": password})
+    latencies.append(time.perf_counter() - started)
+    if response.status_code != 200:
+        errors.append(response.status_code)
+
+
+async def probe(client, stop, latencies, interval):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.post("/logout")
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.logins + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=120) as client:
+        # Calentar conexiones y verificar credenciales
+        await timed_login(client, args.email, args.password, [], [])
+
+        login_latencies, probe_latencies, errors = [], [], []
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, stop, probe_latencies, args.probe_interval))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            timed_login(client, args.email, args.password, login_latencies, errors)
+            for _ in range(args.logins)
+        ))
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        await probe_task
+
+    print(f"{args.logins} logins concurrentes en {elapsed:.2f}s ({args.logins / elapsed:.1f} logins/s), errores: {len(errors)}")
+    report("login", login_latencies)
+    report("probe", probe_latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
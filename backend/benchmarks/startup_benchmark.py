@@ -0,0 +1,93 @@
+"""
+Benchmark del arranque de un worker de la API.
+
+Mide, en procesos nuevos (como un worker de uvicorn recién lanzado), cuánto
+tarda `import app.main` (que incluye create_app()) y el lifespan de arranque,
+y verifica que ninguno de los dos abra conexiones a la base de datos: el
+esquema y los arreglos de datos se aplican con `python -m app.manage`.
+Pensado para CI: termina con código 1 si la mediana supera --max-ms o si el
+arranque se conecta a la base.
+
+Uso:
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --runs 10 --max-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Se ejecuta en un intérprete limpio para medir las importaciones en frío
+PROBE = """
+import asyncio, json, time
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+connections = []
+event.listen(Pool, "connect", lambda *args: connections.append(1))
+
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def run_lifespan():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        pass
+
+asyncio.run(run_lifespan())
+finished = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "lifespan_ms": (finished - imported) * 1000,
+    "connections": len(connections),
+}))
+"""
+
+def probe(env):
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        raise SystemExit("REGRESIÓN: no se pudo importar ni arrancar app.main sin base de datos")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=3000.0, help="presupuesto para la mediana de import + lifespan")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # Sin una base alcanzable: cualquier conexión durante el arranque falla
+    env.update({
+        "POSTGRES_USER": "bench", "POSTGRES_PASSWORD": "bench", "POSTGRES_DB": "bench",
+        "MEDIA_ROOT": tempfile.mkdtemp(), "PYTHONDONTWRITEBYTECODE": "1",
+    })
+    runs = [probe(env) for _ in range(args.runs)]
+
+    imports = [run["import_ms"] for run in runs]
+    lifespans = [run["lifespan_ms"] for run in runs]
+    totals = [run["import_ms"] + run["lifespan_ms"] for run in runs]
+    connections = max(run["connections"] for run in runs)
+    print(f"{'etapa':<16} {'mediana':>10} {'máximo':>10}")
+    print(f"{'import':<16} {statistics.median(imports):>8.0f}ms {max(imports):>8.0f}ms")
+    print(f"{'lifespan':<16} {statistics.median(lifespans):>8.0f}ms {max(lifespans):>8.0f}ms")
+    print(f"{'total':<16} {statistics.median(totals):>8.0f}ms {max(totals):>8.0f}ms  (presupuesto {args.max_ms:.0f}ms)")
+    print(f"conexiones a la base durante el arranque: {connections}")
+
+    if connections:
+        print("REGRESIÓN: el arranque abre conexiones a la base de datos")
+        sys.exit(1)
+    if statistics.median(totals) > args.max_ms:
+        print("REGRESIÓN: el arranque supera el presupuesto de tiempo")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Regresión del ranking materializado de profesores y del listado de reseñas.
+
+Sobre una base temporal SQLite genera docentes y reseñas, aplica altas,
+modificaciones (de nota y de profesor) y bajas de reseñas por el ORM y
+verifica que el agregado de cada profesor (ranking e histograma) coincida con
+recalcularlo desde `reviews`. Después mide la búsqueda de docentes con
+sort=rating, que no debe leer la tabla de reseñas, y la página de reseñas de
+un docente: una sola sentencia cada una, para cualquier volumen.
+Pensado para CI: termina con código 1 si algo de eso no se cumple.
+
+Uso:
+    python benchmarks/teacher_rating_benchmark.py
+    python benchmarks/teacher_rating_benchmark.py --sizes 50 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app import models, crud, crud_async
+from app.query_counter import count_queries
+
+def seed(db, teachers_count):
+    teachers = [models.User(name=f"Docente {i}", email=f"docente{i}@example.com", password="x", role=models.UserRole.teacher)
+                for i in range(teachers_count)]
+    student = models.User(name="Alumno", email="alumno@example.com", password="x", role=models.UserRole.student)
+    db.add_all(teachers + [student])
+    db.flush()
+    db.add_all(models.Professor(id=teacher.id, abstract="", picture="") for teacher in teachers)
+    db.commit()
+    return [teacher.id for teacher in teachers], student.id
+
+def churn(db, teacher_ids, student_id, rng):
+    """Altas, cambios y bajas de reseñas en varios commits"""
+    reviews = [
+        models.Review(student_id=student_id, professor_id=rng.choice(teacher_ids), rating=rng.randint(1, 5), comment="")
+        for _ in range(len(teacher_ids) * 5)
+    ]
+    db.add_all(reviews)
+    db.commit()
+    for review in rng.sample(reviews, len(reviews) // 4):
+        review.rating = rng.randint(1, 5)
+    for review in rng.sample(reviews, len(reviews) // 10):
+        review.professor_id = rng.choice(teacher_ids)
+    db.commit()
+    for review in rng.sample(reviews, len(reviews) // 5):
+        db.delete(review)
+    db.commit()
+
+def aggregates(db):
+    db.expire_all()
+    return {
+        p.id: (p.rating_count, p.rating_sum, round(p.ranking, 9), p.rating_histogram)
+        for p in db.query(models.Professor)
+    }
+
+async def count_reviews_page(path, teacher_id):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    try:
+        async with async_sessionmaker(bind=engine)() as db:
+            with count_queries() as counter:
+                await crud_async.get_teacher_reviews(db, teacher_id, limit=20)
+            return counter.count
+    finally:
+        await engine.dispose()
+
+def measure(teachers_count):
+    path = os.path.join(tempfile.mkdtemp(), "ratings.db")
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        teacher_ids, student_id = seed(db, teachers_count)
+        churn(db, teacher_ids, student_id, random.Random(teachers_count))
+        maintained = aggregates(db)
+        crud.recompute_professor_ratings(db)
+        consistent = maintained == aggregates(db)
+
+        db.expunge_all()
+        with count_queries() as counter:
+            teachers = crud.search_teachers(db, limit=20, sort="rating")
+            ranking = [teacher.professor_profile.ranking for teacher in teachers]
+        reads_reviews = any(re.search(r"\breviews\b", statement) for statement in counter.statements)
+        return {
+            "consistent": consistent,
+            "queries": counter.count,
+            "review_queries": asyncio.run(count_reviews_page(path, teacher_ids[0])),
+            "reads_reviews": reads_reviews,
+            "sorted": ranking == sorted(ranking, reverse=True),
+        }
+    finally:
+        db.close()
+        engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 200])
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'docentes':>8} {'agregado':>9} {'consultas':>9} {'lee reviews':>11} {'ordenado':>8} {'reseñas':>8}")
+    for size in args.sizes:
+        result = measure(size)
+        print(f"{size:>8} {'ok' if result['consistent'] else 'DIFIERE':>9} {result['queries']:>9} "
+              f"{'sí' if result['reads_reviews'] else 'no':>11} {'sí' if result['sorted'] else 'no':>8} "
+              f"{result['review_queries']:>8}")
+        if (not result["consistent"] or result["queries"] != 1 or result["reads_reviews"] or not result["sorted"]
+                or result["review_queries"] != 1):
+            failed = True
+
+    if failed:
+        print("REGRESIÓN: el agregado no coincide con las reseñas, el orden por calificación no usa el ranking "
+              "materializado o la página de reseñas hace más de una consulta")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
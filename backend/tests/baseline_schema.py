@@ -0,0 +1,143 @@
+"""
+Esquema que creaba `create_all` al arrancar la API antes de las migraciones
+de `app.manage setup` (tablas del modelo en BASELINE_REVISION).
+
+Se congela aquí porque app/models.py sigue cambiando; sirve para probar que
+`setup` migra una base existente que no tiene alembic_version.
+"""
+import enum
+
+from sqlalchemy import Boolean, Column, DateTime, Enum, Float, ForeignKey, Integer, MetaData, String, Table, Text
+
+
+class UserRole(str, enum.Enum):
+    student = "student"
+    teacher = "teacher"
+    admin = "admin"
+    mod = "mod"
+
+
+class SubjectLevel(str, enum.Enum):
+    primaria = "primaria"
+    secundaria = "secundaria"
+    terciaria = "terciaria"
+
+
+class TutorshipStatus(str, enum.Enum):
+    pending = "pending"
+    active = "active"
+    finished = "finished"
+    canceled = "canceled"
+
+
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, index=True),
+    Column("email", String, unique=True, index=True),
+    Column("password", String),
+    Column("role", Enum(UserRole), nullable=False),
+)
+Table(
+    "professors", metadata,
+    Column("id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("abstract", Text),
+    Column("picture", String),
+    Column("ranking", Float, default=0.0),
+)
+Table(
+    "subjects", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String, unique=True),
+    Column("description", Text),
+    Column("level", Enum(SubjectLevel), nullable=False),
+    Column("credits", Integer, default=3),
+    Column("department", String, default="Sin asignar"),
+)
+Table(
+    "professor_subjects", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("professor_id", Integer, ForeignKey("professors.id")),
+    Column("subject_id", Integer, ForeignKey("subjects.id")),
+)
+Table(
+    "tutorships", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("professor_id", Integer, ForeignKey("professors.id")),
+    Column("student_id", Integer, ForeignKey("users.id")),
+    Column("subject_id", Integer, ForeignKey("subjects.id")),
+    Column("status", Enum(TutorshipStatus), default=TutorshipStatus.pending),
+    Column("start_time", DateTime),
+    Column("end_time", DateTime),
+    Column("price_usdt", Float),
+    Column("platform_fee_pct", Float, default=5.0),
+)
+Table(
+    "payments", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("tutorship_id", Integer, ForeignKey("tutorships.id")),
+    Column("transaction_hash", String),
+    Column("amount_usdt", Float),
+    Column("timestamp", DateTime),
+    Column("status", String),
+)
+Table(
+    "reviews", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("student_id", Integer, ForeignKey("users.id")),
+    Column("professor_id", Integer, ForeignKey("professors.id")),
+    Column("tutorship_id", Integer, ForeignKey("tutorships.id")),
+    Column("rating", Integer),
+    Column("comment", Text),
+)
+Table(
+    "teacher_media_files", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("teacher_id", Integer, ForeignKey("users.id")),
+    Column("filename", String, nullable=False),
+    Column("original_filename", String, nullable=False),
+    Column("file_path", String, nullable=False),
+    Column("file_size", Integer),
+    Column("mime_type", String),
+    Column("uploaded_at", DateTime),
+    Column("description", Text),
+)
+Table(
+    "resources", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("tutorship_id", Integer, ForeignKey("tutorships.id")),
+    Column("media_file_id", Integer, ForeignKey("teacher_media_files.id"), nullable=True),
+    Column("title", String),
+    Column("file_url", String),
+    Column("uploaded_at", DateTime),
+)
+Table(
+    "live_sessions", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("tutorship_id", Integer, ForeignKey("tutorships.id")),
+    Column("start_time", DateTime),
+    Column("end_time", DateTime),
+    Column("session_url", String),
+    Column("whiteboard_url", String),
+)
+Table(
+    "teacher_availability", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("teacher_id", Integer, ForeignKey("users.id")),
+    Column("day_of_week", Integer),
+    Column("start_time", String),
+    Column("end_time", String),
+    Column("is_available", Boolean, default=True),
+)
+Table(
+    "teacher_schedule", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("teacher_id", Integer, ForeignKey("users.id")),
+    Column("title", String),
+    Column("description", Text),
+    Column("start_datetime", DateTime),
+    Column("end_datetime", DateTime),
+    Column("is_blocked", Boolean, default=False),
+)
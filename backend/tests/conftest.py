@@ -0,0 +1,86 @@
+"""
+Fixtures comunes: la API montada sobre una base SQLite temporal.
+
+Las dependencias `get_db`, `get_async_db` y `get_current_user` se reemplazan
+por sesiones de esa base y por el usuario que el test elija con `api.login`.
+El contenido de la biblioteca de medios va a un MEDIA_ROOT temporal.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# Antes de importar app: app.storage lee MEDIA_ROOT al cargarse
+os.environ.setdefault("MEDIA_ROOT", tempfile.mkdtemp(prefix="media_root_"))
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.auth import get_current_user
+from app.database import get_db, get_async_db
+from app.main import create_app
+from app.user_cache import UserSnapshot
+
+
+class Api:
+    def __init__(self, client, SessionLocal):
+        self.client = client
+        self.SessionLocal = SessionLocal
+        self.current_user = None
+
+    def login(self, user):
+        self.current_user = UserSnapshot.from_user(user)
+
+    def user(self, email, role=models.UserRole.student, name=None):
+        """Crear un usuario (y su perfil de profesor si es docente)"""
+        with self.SessionLocal() as db:
+            user = models.User(name=name or email.split("@")[0], email=email, password="x", role=role)
+            db.add(user)
+            db.flush()
+            if role == models.UserRole.teacher:
+                db.add(models.Professor(id=user.id, abstract="", picture=""))
+            db.commit()
+            db.refresh(user)
+            db.expunge(user)
+            return user
+
+
+@pytest.fixture
+def api(tmp_path):
+    path = tmp_path / "api.db"
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    models.Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    def override_get_db():
+        with SessionLocal() as db:
+            yield db
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app = create_app()
+    api = Api(None, SessionLocal)
+
+    def override_get_current_user():
+        if api.current_user is None:
+            raise HTTPException(status_code=401, detail="No autenticado")
+        return api.current_user
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_current_user] = override_get_current_user
+    with TestClient(app) as client:
+        api.client = client
+        yield api
+    asyncio.run(async_engine.dispose())
+    engine.dispose()
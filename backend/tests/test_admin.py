@@ -0,0 +1,36 @@
+"""
+Acciones del panel de administración que no pasan por la API.
+"""
+from app import admin, models
+from app.storage import get_media_storage
+
+
+def upload(api, teacher, content, filename="apunte.pdf"):
+    response = api.client.post(f"/teachers/{teacher.id}/media", files={"file": (filename, content, "application/pdf")})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_media_delete_releases_blob_and_purges_content(api, monkeypatch):
+    monkeypatch.setattr(admin, "SessionLocal", api.SessionLocal)
+    teacher = api.user("docente@example.com", role=models.UserRole.teacher)
+    api.login(teacher)
+    first = upload(api, teacher, b"%PDF-1.4 contenido compartido")
+    second = upload(api, teacher, b"%PDF-1.4 contenido compartido", "copia.pdf")
+    with api.SessionLocal() as db:
+        blob = db.query(models.MediaBlob).one()
+        assert blob.ref_count == 2
+        storage_key = blob.storage_path
+    storage = get_media_storage()
+
+    admin._delete_media_file(first)
+    with api.SessionLocal() as db:
+        assert db.get(models.TeacherMediaFile, first) is None
+        assert db.query(models.MediaBlob).one().ref_count == 1
+    with storage.open(storage_key) as f:
+        assert f.read() == b"%PDF-1.4 contenido compartido"
+
+    admin._delete_media_file(second)
+    with api.SessionLocal() as db:
+        assert db.query(models.MediaBlob).count() == 0
+    assert not storage.path(storage_key).exists()
@@ -0,0 +1,84 @@
+"""
+`app.manage setup` sobre bases en los tres estados posibles: vacía, creada por
+create_all antes de las migraciones (sin alembic_version) y ya versionada.
+
+Las migraciones usan SQL de PostgreSQL: el recorrido completo hasta head
+corre solo si TEST_POSTGRES_URL apunta a una base descartable; con SQLite se
+verifica en qué revisión queda marcada la base antes de migrar.
+"""
+import os
+
+import pytest
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from app import database, manage, models
+from tests import baseline_schema
+
+HEAD = ScriptDirectory.from_config(manage._alembic_config()).get_current_head()
+
+
+def use_engine(monkeypatch, engine):
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=engine, autoflush=False))
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'setup.db'}")
+    use_engine(monkeypatch, engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def migrations(monkeypatch):
+    """Reemplaza migrate() y anota la revisión en que estaba la base al llamarla"""
+    calls = []
+    monkeypatch.setattr(manage, "migrate", lambda: calls.append(manage.current_revision()))
+    return calls
+
+
+def test_setup_creates_and_stamps_empty_database(sqlite_engine, migrations):
+    manage.setup()
+    assert migrations == []
+    assert manage.current_revision() == HEAD
+    assert set(models.Base.metadata.tables) <= set(inspect(sqlite_engine).get_table_names())
+
+
+def test_setup_stamps_create_all_database_at_baseline_before_migrating(sqlite_engine, migrations):
+    baseline_schema.metadata.create_all(sqlite_engine)
+    manage.setup()
+    assert migrations == [manage.BASELINE_REVISION]
+
+
+def test_setup_migrates_versioned_database_from_its_revision(sqlite_engine, migrations):
+    baseline_schema.metadata.create_all(sqlite_engine)
+    manage.stamp("fd85e7e350c1")
+    manage.setup()
+    assert migrations == ["fd85e7e350c1"]
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="requiere TEST_POSTGRES_URL (PostgreSQL descartable)")
+def test_setup_upgrades_create_all_database_on_postgres(monkeypatch):
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    use_engine(monkeypatch, engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA public CASCADE"))
+        connection.execute(text("CREATE SCHEMA public"))
+    baseline_schema.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO users (id, name, email, password, role) VALUES (1, 'Docente', 'd@example.com', 'x', 'teacher')"
+        ))
+    try:
+        manage.setup()
+        assert manage.current_revision() == HEAD
+        tables = set(inspect(engine).get_table_names())
+        assert set(models.Base.metadata.tables) <= tables
+        with engine.connect() as connection:
+            # fix_professor_profiles completó el perfil del docente existente
+            assert connection.execute(text("SELECT count(*) FROM professors")).scalar() == 1
+    finally:
+        engine.dispose()
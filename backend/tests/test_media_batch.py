@@ -0,0 +1,72 @@
+"""
+Operaciones por lote de la biblioteca: exportación en zip y borrado múltiple.
+"""
+import io
+import zipfile
+
+import pytest
+
+from app import models
+
+FILES = [
+    ("apunte.pdf", b"%PDF-1.4 primer apunte", "application/pdf"),
+    ("apunte.pdf", b"%PDF-1.4 segundo apunte", "application/pdf"),
+    ("notas.txt", b"texto repetido " * 500, "text/plain"),
+]
+
+
+def upload(api, teacher, filename, content, mime_type):
+    response = api.client.post(f"/teachers/{teacher.id}/media", files={"file": (filename, content, mime_type)})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+@pytest.fixture
+def library(api):
+    other = api.user("otro@example.com", role=models.UserRole.teacher)
+    api.login(other)
+    foreign_id = upload(api, other, "ajeno.pdf", b"%PDF-1.4 ajeno", "application/pdf")
+    teacher = api.user("docente@example.com", role=models.UserRole.teacher)
+    api.login(teacher)
+    ids = [upload(api, teacher, *entry) for entry in FILES]
+    return teacher, ids, foreign_id
+
+
+def test_export_streams_a_valid_zip(api, library):
+    teacher, ids, _ = library
+    response = api.client.get(f"/teachers/{teacher.id}/media/export", params={"ids": ids})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.testzip() is None
+        # Los nombres repetidos se desambiguan
+        assert archive.namelist() == ["apunte.pdf", "apunte (2).pdf", "notas.txt"]
+        for name, (_, content, _) in zip(archive.namelist(), FILES):
+            assert archive.read(name) == content
+        # Los pdf van sin recomprimir, el texto comprimido
+        assert archive.getinfo("apunte.pdf").compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo("notas.txt").compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_export_with_foreign_file_returns_404(api, library):
+    teacher, ids, foreign_id = library
+    response = api.client.get(f"/teachers/{teacher.id}/media/export", params={"ids": ids + [foreign_id]})
+    assert response.status_code == 404
+
+
+def test_batch_delete_reports_ids_it_did_not_delete(api, library):
+    teacher, ids, foreign_id = library
+    response = api.client.post(f"/teachers/{teacher.id}/media/batch-delete", json={
+        "ids": [ids[0], foreign_id, 999999, ids[2], ids[0]],
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert sorted(body["deleted"]) == sorted([ids[0], ids[2]])
+    assert body["not_found"] == [foreign_id, 999999]
+
+    with api.SessionLocal() as db:
+        remaining = {media_file.id for media_file in db.query(models.TeacherMediaFile)}
+        # El archivo de otro docente no se toca
+        assert remaining == {ids[1], foreign_id}
+        assert db.query(models.MediaBlob).count() == 2
@@ -0,0 +1,80 @@
+"""
+Descarga de archivos de la biblioteca: validadores (ETag / 304) y Range.
+
+El backend local sirve los bytes con FileResponse, que resuelve Range contra
+el mismo ETag que usa el 304 (ver media.media_file_response).
+"""
+import pytest
+
+from app import models
+
+CONTENT = bytes(range(256)) * 4  # 1024 bytes
+
+
+@pytest.fixture
+def media(api):
+    teacher = api.user("docente@example.com", role=models.UserRole.teacher)
+    api.login(teacher)
+    response = api.client.post(f"/teachers/{teacher.id}/media", files={"file": ("apunte.pdf", CONTENT, "application/pdf")})
+    assert response.status_code == 200, response.text
+    return f"/teachers/{teacher.id}/media/{response.json()['id']}"
+
+
+def test_download_sends_strong_etag_from_content_hash(api, media):
+    response = api.client.get(media)
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    with api.SessionLocal() as db:
+        content_hash = db.query(models.TeacherMediaFile).one().content_hash
+    assert response.headers["etag"] == f'"{content_hash}"'
+    assert response.headers["accept-ranges"] == "bytes"
+
+
+@pytest.mark.parametrize("if_none_match", ["{etag}", "W/{etag}", '"otro", {etag}', "*"])
+def test_if_none_match_returns_304(api, media, if_none_match):
+    etag = api.client.get(media).headers["etag"]
+    response = api.client.get(media, headers={"If-None-Match": if_none_match.format(etag=etag)})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_if_none_match_with_other_etag_returns_content(api, media):
+    response = api.client.get(media, headers={"If-None-Match": '"otro"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+@pytest.mark.parametrize("range_header, start, end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=1000-", 1000, 1023),
+    ("bytes=-24", 1000, 1023),          # sufijo: los últimos 24 bytes
+    ("bytes=1000-5000", 1000, 1023),    # el fin pasado el EOF se recorta
+])
+def test_single_range_returns_206(api, media, range_header, start, end):
+    response = api.client.get(media, headers={"Range": range_header})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert response.content == CONTENT[start:end + 1]
+
+
+def test_multiple_ranges_return_multipart(api, media):
+    response = api.client.get(media, headers={"Range": "bytes=0-9, 100-109"})
+    assert response.status_code == 206
+    assert response.headers["content-type"].startswith("multipart/byteranges; boundary=")
+    assert f"Content-Range: bytes 0-9/{len(CONTENT)}".encode() in response.content
+    assert f"Content-Range: bytes 100-109/{len(CONTENT)}".encode() in response.content
+    assert CONTENT[0:10] in response.content and CONTENT[100:110] in response.content
+
+
+@pytest.mark.parametrize("range_header", ["bytes=1024-", "bytes=2000-3000"])
+def test_unsatisfiable_range_returns_416(api, media, range_header):
+    response = api.client.get(media, headers={"Range": range_header})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_if_range_with_stale_etag_ignores_range(api, media):
+    response = api.client.get(media, headers={"Range": "bytes=0-9", "If-Range": '"otro"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
@@ -0,0 +1,49 @@
+"""
+Validación de los cursores de paginación.
+
+Un cursor adulterado (con valores que no son del tipo de la clave de orden)
+debe responder 400 sin llegar a la base de datos.
+"""
+from datetime import datetime
+
+import pytest
+
+from app import models
+from app.pagination import encode_cursor
+
+
+@pytest.mark.parametrize("sort, values", [
+    ("name", ["x", "abc"]),
+    ("name", [1, 2]),
+    ("rating", ["alto", 1]),
+    ("rating", [True, 1]),
+])
+def test_teachers_rejects_cursor_of_wrong_type(api, sort, values):
+    api.login(api.user("docente@example.com", role=models.UserRole.teacher))
+    response = api.client.get("/teachers", params={"sort": sort, "cursor": encode_cursor(values)})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor inválido"
+
+
+def test_teachers_accepts_cursor_it_issued(api):
+    api.login(api.user("alumno@example.com"))
+    for i in range(3):
+        api.user(f"docente{i}@example.com", role=models.UserRole.teacher)
+    response = api.client.get("/teachers", params={"sort": "rating", "limit": 2})
+    assert response.status_code == 200
+    cursor = response.headers["X-Next-Cursor"]
+    response = api.client.get("/teachers", params={"sort": "rating", "limit": 2, "cursor": cursor})
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+
+
+@pytest.mark.parametrize("values", [
+    [5, 1],
+    ["2026-01-01", 1],
+    [datetime(2026, 1, 1), "abc"],
+])
+def test_teacher_media_rejects_cursor_of_wrong_type(api, values):
+    teacher = api.user("docente@example.com", role=models.UserRole.teacher)
+    api.login(teacher)
+    response = api.client.get(f"/teachers/{teacher.id}/media", params={"cursor": encode_cursor(values)})
+    assert response.status_code == 400
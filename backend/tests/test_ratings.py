@@ -0,0 +1,89 @@
+"""
+Agregado de calificaciones de los profesores.
+
+El agregado se mantiene incrementalmente en cada flush de Review (ver
+models._apply_review_ratings); después de una serie de altas, cambios de
+estrellas y bajas debe coincidir con recalcularlo desde cero.
+"""
+import random
+
+import pytest
+
+from app import crud, models, schemas
+from app.ratings import RATING_STARS, bayesian_average
+
+
+def aggregate(db):
+    db.expire_all()
+    return {
+        professor.id: (professor.rating_count, professor.rating_sum, professor.rating_histogram, professor.ranking)
+        for professor in db.query(models.Professor).order_by(models.Professor.id)
+    }
+
+
+def assert_same(actual, expected):
+    assert actual.keys() == expected.keys()
+    for professor_id, (count, total, histogram, ranking) in actual.items():
+        assert (count, total, histogram) == expected[professor_id][:3], professor_id
+        assert ranking == pytest.approx(expected[professor_id][3]), professor_id
+
+
+def from_scratch(db):
+    """El agregado esperado, calculado en Python desde las reseñas que quedan"""
+    expected = {}
+    for professor in db.query(models.Professor).order_by(models.Professor.id):
+        ratings = [review.rating for review in db.query(models.Review).filter(models.Review.professor_id == professor.id)]
+        expected[professor.id] = (
+            len(ratings), sum(ratings), {stars: ratings.count(stars) for stars in RATING_STARS},
+            bayesian_average(len(ratings), sum(ratings)),
+        )
+    return expected
+
+
+def test_incremental_aggregate_matches_recomputation(api):
+    teachers = [api.user(f"docente{i}@example.com", role=models.UserRole.teacher) for i in range(3)]
+    student = api.user("alumno@example.com")
+    rng = random.Random(7)
+    with api.SessionLocal() as db:
+        subject = models.Subject(name="Matemática", level=models.SubjectLevel.secundaria, description="")
+        db.add(subject)
+        db.flush()
+        tutorships = [
+            models.Tutorship(professor_id=teachers[i % len(teachers)].id, student_id=student.id, subject_id=subject.id)
+            for i in range(40)
+        ]
+        db.add_all(tutorships)
+        db.commit()
+
+        for step in range(120):
+            reviews = db.query(models.Review).all()
+            free = [t for t in tutorships if t.id not in {review.tutorship_id for review in reviews}]
+            operation = rng.choice(["create", "create", "update", "delete", "batch"])
+            if (operation == "create" and free) or not reviews:
+                review = schemas.ReviewCreate(rating=rng.choice(RATING_STARS), comment="")
+                assert crud.create_review(db, rng.choice(free), review) is not None
+            elif operation == "update":
+                rng.choice(reviews).rating = rng.choice(RATING_STARS)
+                db.commit()
+            elif operation == "delete":
+                db.delete(rng.choice(reviews))
+                db.commit()
+            else:
+                # Varios cambios en un mismo flush, incluido cambiar dos veces la misma reseña
+                review = rng.choice(reviews)
+                review.rating = rng.choice(RATING_STARS)
+                db.flush()
+                review.rating = rng.choice(RATING_STARS)
+                for other in rng.sample(reviews, min(3, len(reviews))):
+                    if other is not review:
+                        db.delete(other)
+                db.commit()
+            if step % 20 == 0:
+                assert_same(aggregate(db), from_scratch(db))
+
+        assert db.query(models.Review).count() > 0
+        incremental = aggregate(db)
+        assert_same(incremental, from_scratch(db))
+
+        crud.recompute_professor_ratings(db)
+        assert_same(incremental, aggregate(db))
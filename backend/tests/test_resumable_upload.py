@@ -0,0 +1,119 @@
+"""
+Subidas reanudables: offsets, reanudación, cierre (hash y deduplicación) y
+el lock que impide dos PATCH simultáneos de la misma subida.
+"""
+import hashlib
+
+import pytest
+
+from app import models
+from app.main import UPLOAD_DIR
+from app.resumable import (
+    CHUNK_CONTENT_TYPE, OFFSET_HEADER, UploadLocked, _open_locked, hash_states, resumable_path,
+)
+
+CONTENT = b"%PDF-1.4 " + bytes(range(256)) * 8
+
+
+@pytest.fixture
+def teacher(api):
+    teacher = api.user("docente@example.com", role=models.UserRole.teacher)
+    api.login(teacher)
+    return teacher
+
+
+def create(api, teacher, content=CONTENT, filename="apunte.pdf"):
+    response = api.client.post(f"/teachers/{teacher.id}/uploads", json={
+        "filename": filename, "size": len(content), "mime_type": "application/pdf",
+    })
+    assert response.status_code == 201, response.text
+    assert response.headers[OFFSET_HEADER] == "0"
+    return response.headers["Location"]
+
+
+def patch(api, location, offset, chunk):
+    return api.client.patch(location, content=chunk, headers={
+        "Content-Type": CHUNK_CONTENT_TYPE, OFFSET_HEADER: str(offset),
+    })
+
+
+def test_patch_with_wrong_offset_returns_409_and_current_offset(api, teacher):
+    location = create(api, teacher)
+    assert patch(api, location, 0, CONTENT[:100]).status_code == 204
+    response = patch(api, location, 50, CONTENT[50:200])
+    assert response.status_code == 409
+    assert response.headers[OFFSET_HEADER] == "100"
+    # Nada de lo enviado con el offset equivocado se escribió
+    assert api.client.head(location).headers[OFFSET_HEADER] == "100"
+
+
+def test_resume_after_partial_patch(api, teacher):
+    location = create(api, teacher)
+    response = patch(api, location, 0, CONTENT[:700])
+    assert response.status_code == 204 and response.headers[OFFSET_HEADER] == "700"
+
+    # El cliente perdió la conexión: consulta el offset y retoma desde ahí
+    response = api.client.head(location)
+    assert response.headers[OFFSET_HEADER] == "700"
+    assert response.headers["Upload-Length"] == str(len(CONTENT))
+    # Sin el estado del hash en memoria (reinicio, otra réplica) se recalcula
+    hash_states.discard(location.rsplit("/", 1)[1])
+    response = patch(api, location, 700, CONTENT[700:])
+    assert response.status_code == 204 and response.headers[OFFSET_HEADER] == str(len(CONTENT))
+
+    response = api.client.post(f"{location}/complete")
+    assert response.status_code == 200, response.text
+    assert response.json()["file_size"] == len(CONTENT)
+    with api.SessionLocal() as db:
+        media_file = db.query(models.TeacherMediaFile).one()
+        assert media_file.content_hash == hashlib.sha256(CONTENT).hexdigest()
+
+
+def test_patch_past_declared_length_returns_413(api, teacher):
+    location = create(api, teacher)
+    assert patch(api, location, 0, CONTENT + b"extra").status_code == 413
+
+
+def test_complete_incomplete_upload_returns_409(api, teacher):
+    location = create(api, teacher)
+    patch(api, location, 0, CONTENT[:10])
+    response = api.client.post(f"{location}/complete")
+    assert response.status_code == 409
+    assert response.headers[OFFSET_HEADER] == "10"
+
+
+def test_complete_deduplicates_against_existing_blob(api, teacher):
+    response = api.client.post(f"/teachers/{teacher.id}/media", files={"file": ("original.pdf", CONTENT, "application/pdf")})
+    assert response.status_code == 200, response.text
+
+    location = create(api, teacher, filename="copia.pdf")
+    patch(api, location, 0, CONTENT)
+    upload_id = location.rsplit("/", 1)[1]
+    response = api.client.post(f"{location}/complete")
+    assert response.status_code == 200, response.text
+    assert response.json()["original_filename"] == "copia.pdf"
+
+    with api.SessionLocal() as db:
+        blob = db.query(models.MediaBlob).one()
+        assert blob.sha256 == hashlib.sha256(CONTENT).hexdigest()
+        assert blob.ref_count == 2
+        assert db.query(models.MediaUploadSession).count() == 0
+    # Los bytes recibidos no quedan en el área temporal
+    assert not resumable_path(UPLOAD_DIR, upload_id).exists()
+    # La sesión ya se cerró: repetir el /complete no crea otro archivo
+    assert api.client.post(f"{location}/complete").status_code == 404
+
+
+def test_concurrent_patch_is_rejected_while_locked(api, teacher):
+    location = create(api, teacher)
+    upload_id = location.rsplit("/", 1)[1]
+    handle = _open_locked(resumable_path(UPLOAD_DIR, upload_id))
+    try:
+        with pytest.raises(UploadLocked):
+            _open_locked(resumable_path(UPLOAD_DIR, upload_id))
+        response = patch(api, location, 0, CONTENT)
+        assert response.status_code == 423
+    finally:
+        handle.close()
+    # Liberado el lock, la subida sigue desde donde estaba
+    assert patch(api, location, 0, CONTENT).status_code == 204
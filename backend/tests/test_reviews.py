@@ -0,0 +1,87 @@
+"""
+Reseñas de tutorías: una por tutoría (409 al repetir) e histograma del docente.
+"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app import crud, models, schemas
+from app.ratings import bayesian_average
+
+
+@pytest.fixture
+def tutorship(api):
+    teacher = api.user("docente@example.com", role=models.UserRole.teacher)
+    student = api.user("alumno@example.com")
+    with api.SessionLocal() as db:
+        subject = models.Subject(name="Matemática", level=models.SubjectLevel.secundaria, description="")
+        db.add(subject)
+        db.flush()
+        tutorship = models.Tutorship(
+            professor_id=teacher.id, student_id=student.id, subject_id=subject.id,
+            status=models.TutorshipStatus.finished,
+        )
+        db.add(tutorship)
+        db.commit()
+        db.refresh(tutorship)
+        db.expunge(tutorship)
+    api.login(student)
+    return tutorship
+
+
+def review(api, tutorship, rating):
+    return api.client.post(f"/tutorships/{tutorship.id}/review", json={"rating": rating, "comment": "Muy clara"})
+
+
+def test_second_review_of_a_tutorship_returns_409(api, tutorship):
+    assert review(api, tutorship, 5).status_code == 201
+    response = review(api, tutorship, 1)
+    assert response.status_code == 409
+    with api.SessionLocal() as db:
+        assert db.query(models.Review).count() == 1
+        assert db.get(models.Professor, tutorship.professor_id).rating_count == 1
+
+
+def test_concurrent_duplicate_caught_by_unique_index_returns_409(api, tutorship, monkeypatch):
+    assert review(api, tutorship, 5).status_code == 201
+    # Otra request insertó la reseña entre la verificación previa y el commit
+    real_lookup = crud.get_review_by_tutorship
+    lookups = []
+
+    def racing_lookup(db, tutorship_id):
+        lookups.append(tutorship_id)
+        return None if len(lookups) == 1 else real_lookup(db, tutorship_id)
+
+    monkeypatch.setattr(crud, "get_review_by_tutorship", racing_lookup)
+    response = review(api, tutorship, 1)
+    assert response.status_code == 409
+    assert len(lookups) == 2
+    with api.SessionLocal() as db:
+        professor = db.get(models.Professor, tutorship.professor_id)
+        assert (professor.rating_count, professor.rating_sum) == (1, 5)
+
+
+def test_other_integrity_errors_are_raised(api, tutorship):
+    with api.SessionLocal() as db:
+        db.execute(text("PRAGMA foreign_keys = ON"))
+        # Alumno inexistente: viola la FK, no el índice único de la tutoría
+        orphan = models.Tutorship(id=tutorship.id, professor_id=tutorship.professor_id, student_id=999999)
+        with pytest.raises(IntegrityError):
+            crud.create_review(db, orphan, schemas.ReviewCreate(rating=4))
+        assert db.query(models.Review).count() == 0
+
+
+def test_summary_histogram_follows_star_changes(api, tutorship):
+    assert review(api, tutorship, 5).status_code == 201
+    with api.SessionLocal() as db:
+        db_review = crud.get_review_by_tutorship(db, tutorship.id)
+        db_review.rating = 2
+        db.commit()
+
+    response = api.client.get(f"/teachers/{tutorship.professor_id}/reviews/summary")
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary["rating_histogram"] == {"1": 0, "2": 1, "3": 0, "4": 0, "5": 0}
+    assert summary["rating_count"] == 1
+    assert summary["rating_average"] == 2
+    assert summary["ranking"] == pytest.approx(bayesian_average(1, 2))
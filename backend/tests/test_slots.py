@@ -0,0 +1,130 @@
+"""
+Generación de slots disponibles: horarios de disponibilidad y límites del pedido.
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app import models
+from app.slots import (
+    compute_available_slots, merge_intervals, parse_hhmm, subtract_intervals, SLOTS_MAX_RANGE_DAYS,
+)
+
+
+def availability(day_of_week, start_time, end_time, id=1):
+    return SimpleNamespace(id=id, day_of_week=day_of_week, start_time=start_time, end_time=end_time, is_available=True)
+
+
+def test_parse_hhmm_accepts_end_of_day():
+    assert parse_hhmm("09:30") == timedelta(hours=9, minutes=30)
+    assert parse_hhmm("24:00") == timedelta(hours=24)
+    with pytest.raises(ValueError):
+        parse_hhmm("25:00")
+
+
+def test_availability_until_midnight():
+    monday = datetime(2026, 1, 5)
+    slots = compute_available_slots(
+        [availability(0, "22:00", "24:00")], [], monday, monday.replace(hour=23, minute=59, second=59)
+    )
+    # El fin del pedido (23:59:59) corta la última hora
+    assert [slot["start_datetime"] for slot in slots] == [monday.replace(hour=22)]
+
+    slots = compute_available_slots([availability(0, "22:00", "24:00")], [], monday, monday + timedelta(days=1))
+    assert [slot["end_datetime"] for slot in slots] == [monday.replace(hour=23), monday + timedelta(days=1)]
+
+
+def test_malformed_availability_is_skipped():
+    monday = datetime(2026, 1, 5)
+    slots = compute_available_slots(
+        [availability(0, "9am", "10:00", id=1), availability(0, "10:00", "11:00", id=2)],
+        [], monday, monday + timedelta(days=1)
+    )
+    assert [slot["start_datetime"] for slot in slots] == [monday.replace(hour=10)]
+
+
+def test_teacher_slots_endpoint_bounds_the_request(api):
+    teacher = api.user("docente@example.com", models.UserRole.teacher)
+    url = f"/teachers/{teacher.id}/available-slots"
+
+    response = api.client.get(url, params={"start_date": "2026-01-05", "end_date": "2026-01-05", "duration": 60})
+    assert response.status_code == 200, response.text
+
+    end = (datetime(2026, 1, 5) + timedelta(days=SLOTS_MAX_RANGE_DAYS)).strftime("%Y-%m-%d")
+    response = api.client.get(url, params={"start_date": "2026-01-05", "end_date": end})
+    assert response.status_code == 400
+    response = api.client.get(url, params={"start_date": "2026-01-05", "end_date": "2026-01-06", "duration": 1})
+    assert response.status_code == 400
+    response = api.client.get(url, params={"start_date": "2026-01-06", "end_date": "2026-01-05"})
+    assert response.status_code == 400
+
+
+def test_teacher_slots_endpoint_with_midnight_and_bad_availability(api):
+    teacher = api.user("docente@example.com", models.UserRole.teacher)
+    with api.SessionLocal() as db:
+        db.add_all([
+            models.TeacherAvailability(teacher_id=teacher.id, day_of_week=0, start_time="23:00", end_time="24:00", is_available=True),
+            models.TeacherAvailability(teacher_id=teacher.id, day_of_week=0, start_time="xx", end_time="10:00", is_available=True),
+        ])
+        db.commit()
+    response = api.client.get(f"/teachers/{teacher.id}/available-slots",
+                              params={"start_date": "2026-01-05", "end_date": "2026-01-06", "duration": 60})
+    assert response.status_code == 200, response.text
+    assert [slot["start_datetime"] for slot in response.json()["available_slots"]] == ["2026-01-05T23:00:00"]
+
+
+def test_create_availability_until_midnight(api):
+    teacher = api.user("docente@example.com", models.UserRole.teacher)
+    api.login(teacher)
+    url = f"/teachers/{teacher.id}/availability"
+    response = api.client.post(url, json={"day_of_week": 0, "start_time": "20:00", "end_time": "24:00"})
+    assert response.status_code == 200, response.text
+    response = api.client.post(url, json={"day_of_week": 0, "start_time": "23:00", "end_time": "23:30"})
+    assert response.status_code == 400
+    response = api.client.post(url, json={"day_of_week": 1, "start_time": "7pm", "end_time": "24:00"})
+    assert response.status_code == 400
+
+
+def test_merge_intervals():
+    t = datetime(2026, 1, 5)
+    h = lambda hours: t + timedelta(hours=hours)
+    assert merge_intervals([]) == []
+    # Se tocan: se fusionan en uno
+    assert merge_intervals([(h(1), h(2)), (h(2), h(3))]) == [(h(1), h(3))]
+    # Uno dentro de otro, desordenados
+    assert merge_intervals([(h(2), h(3)), (h(1), h(5))]) == [(h(1), h(5))]
+    # Separados y vacíos (inicio == fin) descartados
+    assert merge_intervals([(h(4), h(5)), (h(1), h(2)), (h(3), h(3))]) == [(h(1), h(2)), (h(4), h(5))]
+
+
+def test_subtract_intervals():
+    t = datetime(2026, 1, 5)
+    h = lambda hours: t + timedelta(hours=hours)
+    windows = [(h(8), h(12)), (h(14), h(18))]
+    assert subtract_intervals(windows, []) == windows
+    assert subtract_intervals([], [(h(9), h(10))]) == []
+    # Ocupado que toca el borde de la ventana no la recorta
+    assert subtract_intervals(windows, [(h(7), h(8)), (h(12), h(14))]) == windows
+    # Ocupado dentro de la ventana la parte en dos
+    assert subtract_intervals(windows, [(h(9), h(10))]) == [(h(8), h(9)), (h(10), h(12)), (h(14), h(18))]
+    # Ocupado que cubre una ventana entera y parte de la siguiente
+    assert subtract_intervals(windows, [(h(7), h(15))]) == [(h(15), h(18))]
+    # Ocupados contiguos al final de una ventana
+    assert subtract_intervals(windows, [(h(10), h(11)), (h(11), h(13))]) == [(h(8), h(10)), (h(14), h(18))]
+
+
+def test_teachers_slots_endpoint_bounds_the_request(api):
+    teacher = api.user("docente@example.com", models.UserRole.teacher)
+    api.login(api.user("alumno@example.com"))
+    params = {"start_date": "2026-01-05", "teacher_ids": [teacher.id]}
+
+    response = api.client.get("/teachers/available-slots", params={**params, "end_date": "2026-01-11"})
+    assert response.status_code == 200, response.text
+    assert [item["teacher_id"] for item in response.json()] == [teacher.id]
+
+    end = (datetime(2026, 1, 5) + timedelta(days=SLOTS_MAX_RANGE_DAYS)).strftime("%Y-%m-%d")
+    response = api.client.get("/teachers/available-slots", params={**params, "end_date": end})
+    assert response.status_code == 400
+    response = api.client.get("/teachers/available-slots", params={**params, "end_date": "2026-01-06", "duration": 5})
+    assert response.status_code == 400
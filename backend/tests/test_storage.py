@@ -0,0 +1,165 @@
+"""
+Backends de almacenamiento de la biblioteca de medios.
+
+S3Storage se prueba contra un bucket simulado con moto (sin red ni
+credenciales reales).
+"""
+from email.utils import formatdate
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.storage import LocalStorage, S3Storage
+
+CONTENT = bytes(range(256)) * 4  # 1024 bytes
+KEY = "blobs/ab/abcdef"
+
+
+def staged(tmp_path, content=CONTENT):
+    path = tmp_path / "staged.bin"
+    path.write_bytes(content)
+    return path
+
+
+@pytest.fixture
+def local(tmp_path):
+    return LocalStorage(tmp_path / "media")
+
+
+def test_local_put_open_delete(local, tmp_path):
+    staged_path = staged(tmp_path)
+    local.put(staged_path, KEY)
+    assert not staged_path.exists()
+    assert local.path(KEY) == tmp_path / "media" / KEY
+    with local.open(KEY) as f:
+        assert f.read() == CONTENT
+    local.delete(KEY)
+    assert not local.path(KEY).exists()
+    # Borrar una clave que no existe no falla
+    local.delete(KEY)
+
+
+def test_local_missing_key(local):
+    with pytest.raises(FileNotFoundError):
+        local.open(KEY)
+    with pytest.raises(HTTPException) as excinfo:
+        local.download_response({}, KEY, "apunte.pdf", "application/pdf")
+    assert excinfo.value.status_code == 404
+
+
+def test_local_keeps_legacy_full_paths(local, tmp_path):
+    legacy = tmp_path / "media" / "legacy.pdf"
+    assert local.path(str(legacy)) == legacy
+
+
+def test_local_download_response_validators(local, tmp_path):
+    local.put(staged(tmp_path), KEY)
+    response = local.download_response({}, KEY, "apunte.pdf", "application/pdf", content_hash="abc")
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"abc"'
+    response = local.download_response({"if-none-match": '"abc"'}, KEY, "apunte.pdf", "application/pdf", content_hash="abc")
+    assert response.status_code == 304
+    response = local.download_response(
+        {"if-modified-since": formatdate(usegmt=True)}, KEY, "apunte.pdf", "application/pdf"
+    )
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize("accel_mode, header", [("nginx", "x-accel-redirect"), ("sendfile", "x-sendfile")])
+def test_local_accel_response_delegates_bytes(tmp_path, accel_mode, header):
+    storage = LocalStorage(tmp_path / "media", accel_mode=accel_mode, accel_prefix="protected-media")
+    storage.put(staged(tmp_path), KEY)
+    response = storage.download_response({"range": "bytes=0-9"}, KEY, "apunte.pdf", "application/pdf", content_hash="abc")
+    assert response.status_code == 200
+    assert response.body == b""
+    expected = f"/protected-media/{KEY}" if accel_mode == "nginx" else str((tmp_path / "media" / KEY).resolve())
+    assert response.headers[header] == expected
+
+
+def test_local_rejects_unknown_accel_mode(tmp_path):
+    with pytest.raises(ValueError):
+        LocalStorage(tmp_path, accel_mode="apache")
+
+
+@pytest.fixture
+def s3():
+    moto = pytest.importorskip("moto")
+    boto3 = pytest.importorskip("boto3")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="media")
+        yield S3Storage("media", prefix="/biblioteca/", presigned_downloads=False, client=client)
+
+
+def s3_body(response):
+    async def collect():
+        return b"".join([chunk async for chunk in response.body_iterator])
+    return asyncio.run(collect())
+
+
+def test_s3_put_open_delete(s3, tmp_path):
+    staged_path = staged(tmp_path)
+    s3.put(staged_path, KEY)
+    assert not staged_path.exists()
+    # El prefijo se aplica a todas las claves
+    s3.client.head_object(Bucket="media", Key=f"biblioteca/{KEY}")
+    assert s3.open(KEY).read() == CONTENT
+    s3.delete(KEY)
+    with pytest.raises(HTTPException) as excinfo:
+        s3.open(KEY)
+    assert excinfo.value.status_code == 404
+
+
+def test_s3_missing_key(s3):
+    with pytest.raises(HTTPException) as excinfo:
+        s3.download_response({}, KEY, "apunte.pdf", "application/pdf")
+    assert excinfo.value.status_code == 404
+
+
+def test_s3_download_full_and_not_modified(s3, tmp_path):
+    s3.put(staged(tmp_path), KEY)
+    response = s3.download_response({}, KEY, "apunte.pdf", "application/pdf", content_hash="abc")
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"abc"'
+    assert response.headers["content-length"] == str(len(CONTENT))
+    assert s3_body(response) == CONTENT
+    response = s3.download_response({"if-none-match": '"abc"'}, KEY, "apunte.pdf", "application/pdf", content_hash="abc")
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize("range_header, start, end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=-24", 1000, 1023),
+    ("bytes=1000-5000", 1000, 1023),
+])
+def test_s3_range_reads(s3, tmp_path, range_header, start, end):
+    s3.put(staged(tmp_path), KEY)
+    response = s3.download_response({"range": range_header}, KEY, "apunte.pdf", "application/pdf", content_hash="abc")
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert s3_body(response) == CONTENT[start:end + 1]
+
+
+def test_s3_range_with_stale_if_range_returns_everything(s3, tmp_path):
+    s3.put(staged(tmp_path), KEY)
+    headers = {"range": "bytes=0-9", "if-range": '"otro"'}
+    response = s3.download_response(headers, KEY, "apunte.pdf", "application/pdf", content_hash="abc")
+    assert response.status_code == 200
+    assert s3_body(response) == CONTENT
+
+
+def test_s3_unsatisfiable_range(s3, tmp_path):
+    s3.put(staged(tmp_path), KEY)
+    with pytest.raises(HTTPException) as excinfo:
+        s3.download_response({"range": "bytes=2000-3000"}, KEY, "apunte.pdf", "application/pdf")
+    assert excinfo.value.status_code == 416
+
+
+def test_s3_presigned_download_redirects(s3, tmp_path):
+    s3.put(staged(tmp_path), KEY)
+    s3.presigned_downloads = True
+    response = s3.download_response({}, KEY, "apunte.pdf", "application/pdf")
+    assert response.status_code == 307
+    location = response.headers["location"]
+    assert f"/biblioteca/{KEY}" in location and "response-content-disposition" in location
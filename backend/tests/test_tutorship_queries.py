@@ -0,0 +1,143 @@
+"""
+Cantidad de consultas SQL de los endpoints de tutorías.
+
+Cada endpoint se llama por HTTP (con la respuesta serializada como
+TutorshipDetailOut) sobre una base SQLite temporal con pocas y con muchas
+tutorías; la cantidad de sentencias debe ser la misma en ambos casos y no
+superar el presupuesto de cada request (ver también
+benchmarks/tutorship_queries_benchmark.py, que mide las funciones de crud).
+
+Uso:
+    python -m pytest tests
+"""
+from datetime import datetime, timedelta
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.auth import get_current_user
+from app.database import get_db, get_async_db
+from app.main import create_app
+from app.query_counter import count_queries
+from app.user_cache import UserSnapshot
+
+SIZES = (5, 60)
+
+# Consultas máximas por request; crear incluye validar docente y materia
+BUDGETS = {
+    "list": 3,
+    "list_next_page": 3,
+    "status_update": 3,
+    "create": 4,
+}
+
+
+def seed(db, tutorships):
+    teacher = models.User(name="Docente", email="docente@example.com", password="x", role=models.UserRole.teacher)
+    db.add(teacher)
+    db.flush()
+    db.add(models.Professor(id=teacher.id, abstract="", picture=""))
+    students = [
+        models.User(name=f"Alumno {i}", email=f"alumno{i}@example.com", password="x", role=models.UserRole.student)
+        for i in range(max(1, tutorships // 2))
+    ]
+    subjects = [
+        models.Subject(name=f"Materia {i}", level=models.SubjectLevel.secundaria, description="")
+        for i in range(max(1, tutorships // 5))
+    ]
+    db.add_all(students + subjects)
+    db.flush()
+    start = datetime(2026, 1, 5, 9, 0)
+    db.add_all(
+        models.Tutorship(
+            professor_id=teacher.id,
+            student_id=students[i % len(students)].id,
+            subject_id=subjects[i % len(subjects)].id,
+            status=models.TutorshipStatus.pending,
+            start_time=start + timedelta(hours=i),
+            end_time=start + timedelta(hours=i, minutes=60),
+            price_usdt=10.0,
+        )
+        for i in range(tutorships)
+    )
+    db.commit()
+    return UserSnapshot.from_user(teacher), UserSnapshot.from_user(students[0]), subjects[0].id
+
+
+async def count_requests(tmp_path, tutorships):
+    """Cantidad de consultas de cada request contra una base con `tutorships` tutorías"""
+    path = tmp_path / f"tutorships_{tutorships}.db"
+    engine = create_engine(f"sqlite:///{path}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    models.Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    with SessionLocal() as db:
+        teacher, student, subject_id = seed(db, tutorships)
+
+    def override_get_db():
+        with SessionLocal() as db:
+            yield db
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    current = {"user": teacher}
+    app = create_app()
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_current_user] = lambda: current["user"]
+
+    counts = {}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            async def request(name, method, url, **kwargs):
+                with count_queries() as counter:
+                    response = await client.request(method, url, **kwargs)
+                assert response.status_code == 200, response.text
+                counts[name] = counter.count
+                return response
+
+            response = await request("list", "GET", f"/teachers/{teacher.id}/tutorships", params={"limit": 3})
+            listed = response.json()
+            assert len(listed) == 3 and all(item["student"] and item["subject"] for item in listed)
+            await request("list_next_page", "GET", f"/teachers/{teacher.id}/tutorships",
+                          params={"limit": 3, "status": "pending", "cursor": response.headers["X-Next-Cursor"]})
+
+            response = await request("status_update", "PUT", f"/teachers/{teacher.id}/tutorships/{listed[0]['id']}/status",
+                                     json={"status": "active"})
+            assert response.json()["status"] == "active"
+
+            current["user"] = student
+            response = await request("create", "POST", "/tutorships", json={
+                "professor_id": teacher.id, "student_id": student.id, "subject_id": subject_id,
+                "start_time": "2027-01-01T10:00:00", "end_time": "2027-01-01T11:00:00", "price_usdt": 10.0,
+            })
+            assert response.json()["student"]["id"] == student.id
+    finally:
+        await async_engine.dispose()
+        engine.dispose()
+    return counts
+
+
+@pytest.fixture(scope="module")
+def counts_by_size(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("tutorship_queries")
+    return {size: asyncio.run(count_requests(tmp_path, size)) for size in SIZES}
+
+
+@pytest.mark.parametrize("operation", BUDGETS)
+def test_query_count_is_constant(counts_by_size, operation):
+    counts = [counts_by_size[size][operation] for size in SIZES]
+    assert len(set(counts)) == 1, f"{operation}: la cantidad de consultas crece con N ({counts})"
+    assert counts[0] <= BUDGETS[operation], f"{operation}: {counts[0]} consultas, presupuesto {BUDGETS[operation]}"
@@ -0,0 +1,51 @@
+"""
+Cola de trabajos del worker de medios.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models, worker
+
+STALE = timedelta(seconds=worker.MEDIA_JOB_TIMEOUT_SECONDS + 60)
+
+
+@pytest.fixture
+def db(api):
+    with api.SessionLocal() as db:
+        yield db
+
+
+def add_job(db, sha256, status, attempts, updated_at):
+    db.add(models.MediaBlob(sha256=sha256, storage_path=f"blobs/{sha256}", ref_count=1, preview_status="pending"))
+    job = models.MediaJob(
+        content_hash=sha256, kind=worker.THUMBNAIL_JOB, mime_type="image/png", status=status,
+        attempts=attempts, run_after=updated_at, created_at=updated_at, updated_at=updated_at,
+    )
+    db.add(job)
+    db.commit()
+    return job.id
+
+
+def test_claim_job_retakes_stale_running_job(db):
+    job_id = add_job(db, "a" * 64, "running", 1, datetime.now() - STALE)
+    job = worker.claim_job(db)
+    assert job.id == job_id
+    assert job.status == "running" and job.attempts == 2
+
+
+def test_claim_job_skips_fresh_running_job(db):
+    add_job(db, "a" * 64, "running", 1, datetime.now())
+    assert worker.claim_job(db) is None
+
+
+def test_stale_job_out_of_attempts_is_failed_not_retaken(db):
+    job_id = add_job(db, "a" * 64, "running", worker.MEDIA_JOB_MAX_ATTEMPTS, datetime.now() - STALE)
+    assert worker.claim_job(db) is None
+
+    assert worker.fail_abandoned_jobs(db) == 1
+    job = db.get(models.MediaJob, job_id)
+    assert job.status == "failed" and job.last_error
+    assert db.get(models.MediaBlob, "a" * 64).preview_status == "failed"
+    assert worker.fail_abandoned_jobs(db) == 0
+    assert worker.claim_job(db) is None